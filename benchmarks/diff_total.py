@@ -0,0 +1,92 @@
+"""
+Compare diff_total() against the previous implementation, which substituted sp.Function(v)(t) for every variable.
+
+Times the total derivatives taken by dynamics_lagrange(): the velocity of every centre of mass, and
+d/dt(dL/dqd) for every joint. The chain rule is timed without a cache, and with one cache shared by all the
+expressions as dynamics_lagrange() does, reporting how many terms were found in the cache. Run from the repository
+root with
+
+    python -m benchmarks.diff_total
+"""
+import random
+import time
+import sympy as sp
+from sympy.core.cache import clear_cache
+import roboticstoolkit as rtk
+from benchmarks.manipulators import serial_manipulator, rr_manipulator, rp_manipulator
+
+
+def diff_total_substitution(expr, diffby, diffmap):
+    # The previous implementation of diff_total(), kept for comparison
+    funcmap = {v:sp.Function(v)(diffby) for v in diffmap}
+    fnexpr = expr.subs(funcmap)
+    diffexpr = sp.diff(fnexpr, diffby)
+    derivmap = {sp.Derivative(funcmap[v], diffby):dv for v, dv in diffmap.items()}
+    finaldiff = diffexpr.subs(derivmap)
+    return finaldiff.subs({funcmap[v]:sp.Symbol(f'{v}') for v in diffmap})
+
+
+def derivative_workload(manipulator):
+    """
+    Build the expressions that dynamics_lagrange() differentiates, without simplifying them
+
+    The equations are derived lazily, so the joint forces (which take the derivatives being benchmarked) are never
+    computed. This keeps the setup for a 6-DOF arm to seconds.
+
+    Return:
+        3-tuple (expressions, t, diff_map)
+    """
+    equations = rtk.dynamics_lagrange(manipulator['transforms'], manipulator['pos_coms'], manipulator['masses'],
+                                      manipulator['inertias'], manipulator['joint_types'], manipulator['gravity'],
+                                      manipulator['variables'], simplification='none', lazy=True)
+    variables = manipulator['variables']
+    variables_vel, variables_accel = rtk.joint_symbols(manipulator['joint_types'])
+    diff_map = {variables[i]:variables_vel[i] for i in range(len(variables))}
+    diff_map.update({variables_vel[i]:variables_accel[i] for i in range(len(variables))})
+
+    expressions = [element for p_c in equations['p_c'][1:] for element in p_c]
+    expressions += [equations['L'].diff(v) for v in variables_vel]
+    return expressions, sp.symbols('t'), diff_map
+
+
+def time_derivatives(func, expressions, t, diff_map, *args):
+    # Start from an empty sympy cache, so no run reuses derivatives taken before it
+    clear_cache()
+    start = time.perf_counter()
+    derivatives = [func(expr, t, diff_map, *args) for expr in expressions]
+    return time.perf_counter() - start, derivatives
+
+
+def check_equal(first, second, symbols):
+    # Compare at a random point, since simplifying the difference of large expressions is too slow
+    point = {symbol: random.uniform(0.5, 1.5) for symbol in symbols}
+    return all(abs(sp.N(a.xreplace(point) - b.xreplace(point))) < 1e-9 for a, b in zip(first, second))
+
+
+def main():
+    random.seed(0)
+    manipulators = {
+        'RR': rr_manipulator(),
+        'RP': rp_manipulator(),
+        '3R': serial_manipulator(['R'] * 3, symbolic=False),
+        '6R': serial_manipulator(['R'] * 6, symbolic=False)
+    }
+    print(f'{"arm":<6}{"expressions":>12}{"substitution (s)":>18}{"chain rule (s)":>16}{"speedup":>10}'
+          f'{"cached (s)":>12}{"speedup":>10}{"terms":>8}{"hits":>7}')
+    for name, manipulator in manipulators.items():
+        expressions, t, diff_map = derivative_workload(manipulator)
+        time_old, derivatives_old = time_derivatives(diff_total_substitution, expressions, t, diff_map)
+        time_new, derivatives_new = time_derivatives(rtk.diff_total, expressions, t, diff_map)
+        cache = dict()
+        time_cached, derivatives_cached = time_derivatives(rtk.diff_total, expressions, t, diff_map, cache)
+        symbols = set().union(*(expr.free_symbols for expr in derivatives_old + derivatives_new))
+        assert check_equal(derivatives_old, derivatives_new, symbols), f'Derivatives differ for {name}'
+        assert check_equal(derivatives_old, derivatives_cached, symbols), f'Cached derivatives differ for {name}'
+        # Every term of every expression is looked up once, and the cache holds one entry per miss
+        terms = sum(len(sp.Add.make_args(expr)) for expr in expressions)
+        print(f'{name:<6}{len(expressions):>12}{time_old:>18.3f}{time_new:>16.3f}{time_old / time_new:>10.1f}'
+              f'{time_cached:>12.3f}{time_old / time_cached:>10.1f}{terms:>8}{terms - len(cache):>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the time taken to import the package, and what each import path pulls in.
+
+Every scenario runs in a fresh interpreter, so nothing is cached between runs. Run from the repository root with
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 20 --max-time package=0.05 numeric=0.3
+
+With --max-time, exits with an error if a scenario is slower than its limit, so it can guard against slow imports
+creeping back in.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+# Statements timed in each scenario
+SCENARIOS = {
+    'baseline': 'pass',
+    'numpy': 'import numpy',
+    'sympy': 'import sympy',
+    'package': 'import roboticstoolkit',
+    'numeric': 'import roboticstoolkit.numeric',
+    'numeric_function': 'from roboticstoolkit import link_transforms_numeric',
+    'symbolic_function': 'from roboticstoolkit import dynamics_newton_euler',
+    'everything': 'from roboticstoolkit import *'
+}
+
+# Scenarios that must not import sympy
+SYMPY_FREE = {'baseline', 'numpy', 'package', 'numeric', 'numeric_function'}
+
+_TEMPLATE = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, 'sympy' in sys.modules)
+'''
+
+
+def time_import(statement, repeat=5):
+    """
+    Time a statement in fresh interpreters
+
+    Args:
+        statement - Python source, e.g. 'import roboticstoolkit'
+        repeat - Number of interpreters to start. The fastest is reported
+    Return:
+        2-tuple (time, sympy_imported)
+    """
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _TEMPLATE.format(statement=statement)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        sympy_imported = output[1] == 'True'
+    return min(times), sympy_imported
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark the import time of roboticstoolkit')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-time', nargs='+', default=[], metavar='SCENARIO=SECONDS',
+                        help='Fail if a scenario takes longer than this')
+    parser.add_argument('--output', help='Save the results to a JSON file')
+    args = parser.parse_args(args)
+
+    limits = dict()
+    for item in args.max_time:
+        name, value = item.split('=')
+        limits[name] = float(value)
+
+    failures = []
+    results = []
+    print(f'{"scenario":<20}{"time (ms)":>12}{"sympy":>8}')
+    for name in args.scenarios:
+        elapsed, sympy_imported = time_import(SCENARIOS[name], args.repeat)
+        results.append({'scenario': name, 'time': elapsed, 'sympy': sympy_imported})
+        print(f'{name:<20}{elapsed * 1e3:>12.1f}{"yes" if sympy_imported else "no":>8}')
+        if sympy_imported and name in SYMPY_FREE:
+            failures.append(f'{name} imported sympy')
+        if name in limits and elapsed > limits[name]:
+            failures.append(f'{name} took {elapsed:.3f} s, over the limit of {limits[name]} s')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if failures:
+        sys.exit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
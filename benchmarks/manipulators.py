@@ -0,0 +1,111 @@
+import sympy as sp
+import roboticstoolkit as rtk
+
+
+# Twist angles of successive DH rows, chosen so the joint axes alternate like a typical spatial arm
+_TWISTS = [0, sp.pi/2, 0, -sp.pi/2, sp.pi/2, -sp.pi/2, sp.pi/2]
+
+
+def serial_manipulator(joint_types, symbolic=True):
+    """
+    Generate a serial manipulator with the given joint types, for benchmarking
+
+    Links have a length L_i, which is used as a DH link length or offset, a mass m_i with the centre of mass
+    half way along the link, and the inertia of a slender rod.
+
+    Args:
+        joint_types - List with 'R' or 'P' for each joint. At most 7 joints.
+        symbolic - If False, numerical values are substituted for all link parameters and gravity
+    Return:
+        Dictionary with entries 'dh_table', 'transforms', 'pos_coms', 'masses', 'inertias', 'joint_types' (with the
+        ground frame), 'gravity', 'variables' and 'parameters' (numerical values of the link parameters)
+    """
+    num_joints = len(joint_types)
+    if num_joints > len(_TWISTS):
+        raise ValueError(f'At most {len(_TWISTS)} joints are supported')
+
+    variables = list(sp.symbols(f'q1:{num_joints + 1}'))
+    lengths = sp.symbols(f'L1:{num_joints + 2}')
+    masses = sp.symbols(f'm1:{num_joints + 1}')
+    g = sp.symbols('g')
+
+    # Alternate between link lengths and offsets so every joint contributes to the geometry
+    dh_table = []
+    for i, joint_type in enumerate(joint_types):
+        length = lengths[i - 1] if i % 2 == 0 and i > 0 else 0
+        offset = lengths[i] if i % 2 == 1 else 0
+        if joint_type == 'P':
+            offset = offset + variables[i]
+        angle = variables[i] if joint_type == 'R' else 0
+        dh_table.append([length, _TWISTS[i], offset, angle])
+    dh_table.append([lengths[num_joints], 0, 0, 0])
+
+    pos_coms = [sp.zeros(3, 1)] + [sp.Matrix([lengths[i]/2, 0, 0]) for i in range(num_joints)]
+    inertias = [sp.zeros(3)] + [sp.diag(0, 1, 1) * masses[i] * lengths[i]**2 / 12 for i in range(num_joints)]
+    gravity = sp.Matrix([0, 0, -g])
+
+    parameters = {length: sp.Rational(3, 10) + sp.Rational(i, 20) for i, length in enumerate(lengths)}
+    parameters.update({mass: 1 + sp.Rational(i, 2) for i, mass in enumerate(masses)})
+    parameters[g] = sp.Rational(981, 100)
+
+    manipulator = {
+        'dh_table': dh_table,
+        'pos_coms': pos_coms,
+        'masses': [0, *masses],
+        'inertias': inertias,
+        'gravity': gravity
+    }
+    if not symbolic:
+        manipulator = {name: _substitute(value, parameters) for name, value in manipulator.items()}
+    manipulator['transforms'] = rtk.link_transforms(manipulator['dh_table'])
+    manipulator['joint_types'] = [0, *joint_types]
+    manipulator['variables'] = variables
+    manipulator['parameters'] = parameters
+    return manipulator
+
+
+def _substitute(value, parameters):
+    if isinstance(value, list):
+        return [_substitute(v, parameters) for v in value]
+    return sp.sympify(value).subs(parameters)
+
+
+def rr_manipulator():
+    """
+    The planar RR manipulator from rr_manipulator_dynamics.py, in the same format as serial_manipulator()
+    """
+    manipulator = serial_manipulator(['R', 'R'])
+    theta1, theta2 = manipulator['variables']
+    L1, L2 = sp.symbols('L1, L2')
+    manipulator['dh_table'] = [
+        [0,  0, 0, theta1],
+        [L1, 0, 0, theta2],
+        [L2, 0, 0, 0]
+    ]
+    manipulator['transforms'] = rtk.link_transforms(manipulator['dh_table'])
+    manipulator['gravity'] = sp.Matrix([0, -sp.symbols('g'), 0])
+    return manipulator
+
+
+def rp_manipulator():
+    """
+    The RP manipulator from rp_manipulator_dynamics.py, in the same format as serial_manipulator()
+    """
+    manipulator = serial_manipulator(['R', 'P'])
+    theta1, d2 = manipulator['variables']
+    L1, L2 = sp.symbols('L1, L2')
+    m1, m2 = sp.symbols('m1, m2')
+    manipulator['dh_table'] = [
+        [0,       0,  0, theta1],
+        [0, sp.pi/2, d2,      0],
+        [0,       0,  0,      0]
+    ]
+    manipulator['transforms'] = rtk.link_transforms(manipulator['dh_table'])
+    manipulator['pos_coms'] = [sp.zeros(3, 1), sp.Matrix([0, -L1/2, 0]), sp.zeros(3, 1)]
+    manipulator['inertias'] = [
+        sp.zeros(3),
+        sp.diag(1, 0, 1) * m1 * L1 * L1 / 12,
+        sp.diag(1, 1, 0) * m2 * L2 * L2 / 12
+    ]
+    manipulator['gravity'] = sp.Matrix([0, -sp.symbols('g'), 0])
+    return manipulator
@@ -0,0 +1,286 @@
+"""
+Benchmark suite for the symbolic derivations and numerical evaluators, across manipulator sizes.
+
+Times link_transforms/base_transforms, jacobian, dynamics_newton_euler and dynamics_lagrange on serial manipulators
+with 1 to 7 joints, with symbolic or numerical link parameters, as well as the batched numerical evaluators. For each
+benchmark the wall time, the peak memory allocated (with tracemalloc) and the size of the resulting expressions
+(sp.count_ops) are reported. Run from the repository root with
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output new.json --compare results.json
+
+See python -m benchmarks.suite --help for the options.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import sympy as sp
+import roboticstoolkit as rtk
+from benchmarks.manipulators import serial_manipulator
+
+
+# Arms covering 1 to 7 joints, with prismatic joints mixed in
+DEFAULT_ARMS = ['R', 'RP', 'RRP', 'RRPR', 'RRRRR', 'RRRRRR', 'RRPRRRR']
+
+# Largest number of joints each benchmark is run for by default. The symbolic dynamics grow very quickly.
+DEFAULT_MAX_JOINTS = {
+    'base_transforms': 7,
+    'jacobian': 7,
+    'dynamics_newton_euler': 3,
+    'dynamics_lagrange': 2,
+    'link_transforms_numeric': 7,
+    'jacobian_numeric': 7,
+    'dynamics_newton_euler_numeric': 7,
+    'mass_matrix_numeric': 7,
+    'compiled_newton_euler': 3
+}
+
+NUMERIC_BENCHMARKS = {'link_transforms_numeric', 'jacobian_numeric', 'dynamics_newton_euler_numeric',
+                      'mass_matrix_numeric', 'compiled_newton_euler'}
+
+
+def _expression_ops(result):
+    # Total operation count of the symbolic outputs of a benchmark
+    if isinstance(result, dict):
+        return sum(_expression_ops(value) for value in result.values())
+    if isinstance(result, (list, tuple)):
+        return sum(_expression_ops(value) for value in result)
+    if isinstance(result, (sp.Basic, sp.MatrixBase)):
+        return rtk.expression_size(result)
+    return 0
+
+
+def _symbolic_benchmarks(manipulator, simplification):
+    # Each benchmark is a function of no arguments returning its (symbolic) result
+    joint_types = manipulator['joint_types'][1:]
+    zero = sp.zeros(3, 1)
+
+    def newton_euler():
+        return rtk.dynamics_newton_euler(manipulator['transforms'], manipulator['pos_coms'], manipulator['masses'],
+                                         manipulator['inertias'], manipulator['joint_types'], manipulator['gravity'],
+                                         zero, zero, simplification=simplification)
+
+    def lagrange():
+        return rtk.dynamics_lagrange(manipulator['transforms'], manipulator['pos_coms'], manipulator['masses'],
+                                     manipulator['inertias'], manipulator['joint_types'], manipulator['gravity'],
+                                     manipulator['variables'], simplification=simplification)
+
+    base_transforms = rtk.base_transforms(manipulator['transforms'])
+    return {
+        'base_transforms': lambda: rtk.base_transforms(rtk.link_transforms(manipulator['dh_table'])),
+        'jacobian': lambda: rtk.jacobian(base_transforms, joint_types, simplification=simplification),
+        'dynamics_newton_euler': newton_euler,
+        'dynamics_lagrange': lagrange
+    }
+
+
+def _numeric_benchmarks(manipulator, batch_size):
+    # Numerical evaluators for a batch of random states. Needs numerical link parameters.
+    # Each entry sets up the evaluator and returns the function to time.
+    rng = np.random.default_rng(0)
+    dh_table = manipulator['dh_table']
+    joint_types = manipulator['joint_types'][1:]
+    dof = len(joint_types)
+    q, qd, qdd = (rng.uniform(-1, 1, size=(batch_size, dof)) for _ in range(3))
+    arguments = (dh_table, manipulator['pos_coms'], manipulator['masses'], manipulator['inertias'], manipulator['joint_types'])
+
+    def compiled_newton_euler():
+        # Derivation and compilation are not timed
+        zero = sp.zeros(3, 1)
+        equations = rtk.dynamics_newton_euler(manipulator['transforms'], manipulator['pos_coms'], manipulator['masses'],
+                                              manipulator['inertias'], manipulator['joint_types'], manipulator['gravity'],
+                                              zero, zero, simplification='none')
+        velocities, accelerations = rtk.joint_symbols(manipulator['joint_types'])
+        compiled = rtk.compile_equations_dict(equations, [manipulator['variables'], velocities, accelerations], keys=['tau'])
+        return lambda: compiled(q, qd, qdd)
+
+    return {
+        'link_transforms_numeric': lambda: lambda: rtk.base_transforms_numeric(rtk.link_transforms_numeric(dh_table, joint_types, q)),
+        'jacobian_numeric': lambda: lambda: rtk.jacobian_numeric(
+            rtk.base_transforms_numeric(rtk.link_transforms_numeric(dh_table, joint_types, q)), joint_types),
+        'dynamics_newton_euler_numeric': lambda: lambda: rtk.dynamics_newton_euler_numeric(*arguments, manipulator['gravity'], q, qd, qdd),
+        'mass_matrix_numeric': lambda: lambda: rtk.mass_matrix_numeric(*arguments, q),
+        'compiled_newton_euler': compiled_newton_euler
+    }
+
+
+def measure(func, repeat=1, memory=True, setup=None):
+    """
+    Time a function, and measure the peak memory it allocates
+
+    Args:
+        func - Function of no arguments
+        repeat - Number of timed calls. The fastest is reported
+        memory - If True, make one more call under tracemalloc to measure the peak memory. Skipped otherwise,
+            since tracing slows everything down.
+        setup - Function of no arguments called (untimed) before every call of func, e.g. to empty caches
+    Return:
+        3-tuple (time, peak_memory, result). peak_memory is in bytes, or None if not measured
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    peak_memory = None
+    if memory:
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return min(times), peak_memory, result
+
+
+def run_suite(arms=DEFAULT_ARMS, parameters=('symbolic', 'numeric'), benchmarks=None, max_joints=None,
+              simplification='none', batch_size=1000, repeat=3, memory=True, transform_cache=0, log=print):
+    """
+    Run the benchmark suite
+
+    Args:
+        arms - List of joint type strings, e.g. 'RRP'
+        parameters - Which link parameters to use: 'symbolic', 'numeric' or both. Numerical evaluators only run with
+            numeric parameters.
+        benchmarks - Names of the benchmarks to run. Defaults to all
+        max_joints - Dict overriding DEFAULT_MAX_JOINTS
+        simplification - Simplification policy for the symbolic derivations
+        batch_size - Number of states evaluated at once by the numerical evaluators
+        repeat - Number of timed calls of the numerical evaluators. Symbolic derivations are timed once
+        memory - If True, measure peak memory with an extra call of each benchmark
+        transform_cache - Size of the base_transforms() prefix cache during the run, or 0 to disable it. The cache
+            is emptied before every timed call either way, so no benchmark reuses products from its setup or
+            from an earlier call.
+        log - Function called with a line of text after each benchmark, or None
+    Return:
+        List of result dicts
+    """
+    limits = dict(DEFAULT_MAX_JOINTS, **(max_joints or {}))
+    previous_cache_size = rtk.transform_cache_info()['max_size']
+    rtk.set_transform_cache_size(transform_cache)
+    try:
+        return _run_benchmarks(arms, parameters, benchmarks, limits, simplification, batch_size, repeat, memory, log)
+    finally:
+        rtk.set_transform_cache_size(previous_cache_size)
+        rtk.clear_transform_cache()
+
+
+def _run_benchmarks(arms, parameters, benchmarks, limits, simplification, batch_size, repeat, memory, log):
+    results = []
+    for arm in arms:
+        for parameter_type in parameters:
+            manipulator = serial_manipulator(list(arm), symbolic=(parameter_type == 'symbolic'))
+            candidates = _symbolic_benchmarks(manipulator, simplification)
+            if parameter_type == 'numeric':
+                candidates.update(_numeric_benchmarks(manipulator, batch_size))
+
+            for name, func in candidates.items():
+                if (benchmarks is not None and name not in benchmarks) or len(arm) > limits[name]:
+                    continue
+                numeric = name in NUMERIC_BENCHMARKS
+                if numeric:
+                    func = func()
+                elapsed, peak_memory, result = measure(func, repeat=repeat if numeric else 1, memory=memory,
+                                                       setup=rtk.clear_transform_cache)
+                entry = {
+                    'benchmark': name,
+                    'arm': arm,
+                    'dof': len(arm),
+                    'parameters': parameter_type,
+                    'time': elapsed,
+                    'peak_memory': peak_memory,
+                    'ops': None if numeric else _expression_ops(result)
+                }
+                results.append(entry)
+                if log is not None:
+                    log(_format_entry(entry))
+    return results
+
+
+def _format_entry(entry, reference=None):
+    memory = '-' if entry['peak_memory'] is None else f'{entry["peak_memory"] / 1024**2:.2f}'
+    ops = '-' if entry['ops'] is None else str(entry['ops'])
+    line = f'{entry["benchmark"]:<32}{entry["arm"]:<9}{entry["parameters"]:<10}{entry["time"]:>12.4f}{memory:>12}{ops:>10}'
+    if reference is not None:
+        line += f'{reference["time"] / entry["time"]:>10.2f}x'
+    return line
+
+
+def _metadata(simplification, batch_size):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sympy': sp.__version__,
+        'numpy': np.__version__,
+        'simplification': simplification,
+        'batch_size': batch_size
+    }
+
+
+def compare(results, reference_results, log=print):
+    """
+    Print each result next to its speedup over a reference run (reference time / new time)
+    """
+    key = lambda entry: (entry['benchmark'], entry['arm'], entry['parameters'])
+    reference = {key(entry): entry for entry in reference_results}
+    for entry in results:
+        log(_format_entry(entry, reference.get(key(entry))))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark symbolic derivations and numerical evaluators')
+    parser.add_argument('--arms', nargs='+', default=DEFAULT_ARMS, help='Joint type strings, e.g. RRP')
+    parser.add_argument('--parameters', nargs='+', default=['symbolic', 'numeric'], choices=['symbolic', 'numeric'])
+    parser.add_argument('--benchmarks', nargs='+', default=None, choices=list(DEFAULT_MAX_JOINTS))
+    parser.add_argument('--max-joints', nargs='+', default=[], metavar='BENCHMARK=N',
+                        help='Override the largest arm a benchmark runs for, e.g. dynamics_lagrange=3')
+    parser.add_argument('--simplification', default='none', choices=rtk.SIMPLIFICATION_POLICIES)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory measurement')
+    parser.add_argument('--transform-cache', type=int, default=0, metavar='SIZE',
+                        help='Enable the base_transforms prefix cache with this many entries (emptied before each call)')
+    parser.add_argument('--output', help='Save the results to a JSON file')
+    parser.add_argument('--compare', help='JSON file from a previous run to compare against')
+    args = parser.parse_args(args)
+
+    max_joints = {}
+    for item in args.max_joints:
+        name, value = item.split('=')
+        max_joints[name] = int(value)
+
+    print(f'{"benchmark":<32}{"arm":<9}{"params":<10}{"time (s)":>12}{"peak (MB)":>12}{"ops":>10}')
+    results = run_suite(args.arms, args.parameters, args.benchmarks, max_joints, args.simplification,
+                        args.batch_size, args.repeat, not args.no_memory, args.transform_cache)
+
+    if args.compare:
+        with open(args.compare) as file:
+            reference = json.load(file)
+        print(f'\nCompared with {args.compare} (commit {reference["metadata"].get("commit")}):')
+        compare(results, reference['results'])
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'metadata': _metadata(args.simplification, args.batch_size), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
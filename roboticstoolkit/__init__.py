@@ -1,6 +1,84 @@
-from roboticstoolkit.core import *
-from roboticstoolkit.transforms import *
-from roboticstoolkit.kinematics import *
-from roboticstoolkit.jacobian import *
-from roboticstoolkit.propagations import *
-from roboticstoolkit.dynamics import *
+import importlib
+import sys
+import types
+
+
+# Submodules are only imported when one of their names is first used (PEP 562), so importing the package is cheap,
+# and using only the numerical functions never imports sympy. See also roboticstoolkit.numeric.
+_SUBMODULE_NAMES = {
+    'core': ('diff_total', 'flatten_equations_dict', 'free_symbols_equations_dict', 'func_equations_dict',
+             'joint_rates', 'joint_symbols', 'print_equation', 'print_equations_dict', 'print_latex',
+             'round_equations_dict', 'substitute_equations_dict', 'x_vec', 'y_vec', 'z_vec'),
+    'transforms': ('axis_x', 'axis_y', 'axis_z', 'cross_matrix', 'dh_transform', 'four_vector', 'inverse_transform',
+                   'rot_x', 'rot_y', 'rot_z', 'rotation', 'screw_x', 'screw_y', 'screw_z', 'three_vector', 'trans',
+                   'translation'),
+    'kinematics': ('angle_axis', 'angle_axis_inverse', 'base_transforms', 'clear_transform_cache', 'end_transform',
+                   'euler_ZYX', 'euler_ZYX_inverse', 'link_transforms', 'set_transform_cache_size',
+                   'transform_cache_info'),
+    'inverse_kinematics': ('compile_inverse_kinematics', 'inverse_kinematics_closed_form',
+                           'inverse_kinematics_planar', 'inverse_kinematics_spherical_wrist',
+                           'inverse_kinematics_target'),
+    'jacobian': ('end_effector_acceleration', 'jacobian', 'jacobian_derivative', 'jacobian_planar'),
+    'propagations': ('accel_curr_frame', 'accel_next_frame', 'alpha_next_frame', 'force_com_curr_frame',
+                     'force_curr_frame', 'moment_com_curr_frame', 'moment_curr_frame', 'omega_next_frame',
+                     'vel_curr_frame', 'vel_next_frame'),
+    'dynamics': ('dynamics_lagrange', 'dynamics_matrix_form', 'dynamics_newton_euler',
+                 'NewtonEulerModel'),
+    'evaluate': ('compile_equations_dict', 'evaluate_equations_dict'),
+    'numeric_kinematics': ('base_transforms_numeric', 'dh_transform_numeric', 'end_transform_numeric',
+                           'link_transforms_numeric'),
+    'numeric_transforms': ('cross_matrix_numeric', 'SE3', 'SO3'),
+    'numeric_rotations': ('angle_axis_inverse_numeric', 'angle_axis_numeric', 'euler_ZYX_inverse_numeric',
+                          'euler_ZYX_numeric', 'quaternion_conjugate', 'quaternion_from_euler_ZYX',
+                          'quaternion_from_rotation', 'quaternion_from_rotation_vector', 'quaternion_multiply',
+                          'quaternion_to_euler_ZYX', 'quaternion_to_rotation', 'quaternion_to_rotation_vector',
+                          'rotation_vector_from_rotation', 'rotation_vector_to_rotation', 'slerp'),
+    'numeric_dynamics': ('dynamics_newton_euler_numeric', 'forward_dynamics_numeric', 'mass_matrix_numeric'),
+    'numeric_jacobian': ('end_effector_acceleration_numeric', 'jacobian_derivative_numeric', 'jacobian_numeric',
+                         'jacobian_planar_numeric'),
+    'numeric_inverse_kinematics': ('inverse_kinematics_numeric',),
+    'cache': ('DynamicsCache',),
+    'simulation': ('forward_dynamics_compiled', 'simulate', 'simulate_iter'),
+    'identification': ('base_parameters', 'base_parameters_numeric', 'identify_parameters',
+                       'inertial_parameter_symbols', 'INERTIAL_PARAMETERS', 'inertial_parameters',
+                       'inertial_parameters_numeric', 'link_parameters_numeric', 'regressor', 'regressor_numeric'),
+    'simplification': ('expression_size', 'final_simplification', 'get_simplification',
+                       'intermediate_simplification', 'LazyEquationsDict', 'map_expressions', 'map_parallel',
+                       'parallel_executor', 'resolve_simplification', 'set_simplification',
+                       'SIMPLIFICATION_POLICIES', 'simplification_report', 'SimplificationReport', 'simplify_all',
+                       'simplify_expression'),
+    'profiling': ('profile', 'profile_stage', 'profiled', 'Profiler'),
+    'codegen': ('compile_equations_dict_c', 'generate_c', 'write_c'),
+}
+
+_NAMES = {name: module for module, names in _SUBMODULE_NAMES.items() for name in names}
+
+__all__ = list(_NAMES)
+
+
+def __getattr__(name):
+    if name in _NAMES:
+        value = getattr(importlib.import_module(f'{__name__}.{_NAMES[name]}'), name)
+    elif name in _SUBMODULE_NAMES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    # Cache the attribute, so __getattr__ is only called once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAMES) | set(_SUBMODULE_NAMES))
+
+
+class _Package(types.ModuleType):
+    # Importing a submodule binds it as an attribute of the package. Where a function has the same name as its
+    # submodule (jacobian), keep the function, as the star imports of the package used to.
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and _NAMES.get(name) == name and value.__name__ == f'{__name__}.{name}':
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import sympy as sp
+from roboticstoolkit.dynamics import dynamics_newton_euler, dynamics_lagrange
+from roboticstoolkit.simplification import resolve_simplification, LazyEquationsDict
+
+
+# Bump when the layout of cached files or the output of the dynamics functions changes
+_CACHE_FORMAT = 1
+
+# Keyword arguments of the dynamics functions that don't change their output
+_IGNORED_KWARGS = {'workers'}
+
+
+class DynamicsCache:
+    """
+    Persistent on-disk cache of derived equations of motion.
+
+    Entries are keyed on the content of every input to the derivation (transforms, pos_coms, masses, inertias,
+    joint_types, gravity, ...) and the method used, so the cache can be shared between processes. Each entry is
+    a pickled equations dict. When the total size of the cache goes over max_bytes, the least recently used entries
+    are deleted.
+
+    Example:
+
+        cache = DynamicsCache()
+        equations = cache.dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravity, variables)
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 1024**2):
+        """
+        Args:
+            directory - Directory to store the cache in. Defaults to ~/.cache/roboticstoolkit
+            max_bytes - Maximum total size of the cache files
+        """
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'roboticstoolkit')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, method, *args, **kwargs):
+        """
+        Get the cache key for a derivation
+
+        Args:
+            method - Name of the derivation method
+            args, kwargs - Inputs to the derivation. Must be sympy objects, or lists/tuples of them
+        Return:
+            Hex digest string
+        """
+        # Hash the policy the derivation will use, so passing the global policy explicitly gives the same key as
+        # leaving it out
+        kwargs = dict(kwargs)
+        policy = resolve_simplification(kwargs.pop('simplification', None))
+        digest = hashlib.sha256(f'{_CACHE_FORMAT}:{sp.__version__}:{policy}:{method}'.encode())
+        for arg in args:
+            digest.update(sp.srepr(arg).encode())
+            digest.update(b'\0')
+        for name in sorted(kwargs.keys() - _IGNORED_KWARGS):
+            digest.update(f'{name}={sp.srepr(kwargs[name])}'.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def load(self, key):
+        """
+        Load an equations dict from the cache
+
+        Return:
+            The cached equations dict, or None if there is no usable entry for the key. Entries that can't be
+            unpickled, e.g. written by an older version of the package or sympy, are deleted.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                equations = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Truncated, corrupt or stale entry (ImportError includes ModuleNotFoundError)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return equations
+
+    def store(self, key, equations):
+        """
+        Store an equations dict in the cache, evicting old entries if the cache is too large
+
+        Every entry of a LazyEquationsDict (e.g. from lazy=True) is evaluated first, so loading it never repeats any of
+        the derivation.
+        """
+        if isinstance(equations, LazyEquationsDict):
+            for name in equations:
+                equations[name]
+        # Write to a temporary file first, so other processes never see a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                pickle.dump(equations, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._evict()
+
+    def _entries(self):
+        # List (last_used, size, path) for all cache entries
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        # Delete least recently used entries until the cache fits in max_bytes
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def size(self):
+        """
+        Return:
+            Total size of the cache files in bytes
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """
+        Delete all entries from the cache
+        """
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def cached(self, method, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), or load its result from the cache if it has been computed before
+
+        Args:
+            method - Name identifying func in the cache key
+            func - Function returning an equations dict
+        """
+        key = self.key(method, *args, **kwargs)
+        equations = self.load(key)
+        if equations is None:
+            equations = func(*args, **kwargs)
+            self.store(key, equations)
+        return equations
+
+    def dynamics_newton_euler(self, *args, **kwargs):
+        """
+        Cached version of dynamics_newton_euler(). Takes the same arguments.
+        """
+        return self.cached('newton_euler', dynamics_newton_euler, *args, **kwargs)
+
+    def dynamics_lagrange(self, *args, **kwargs):
+        """
+        Cached version of dynamics_lagrange(). Takes the same arguments.
+        """
+        return self.cached('lagrange', dynamics_lagrange, *args, **kwargs)
@@ -0,0 +1,241 @@
+import ctypes
+import hashlib
+import os
+import re
+import subprocess
+import tempfile
+import numpy as np
+import sympy as sp
+from roboticstoolkit.evaluate import _flatten_arguments, _flatten_outputs
+
+
+def _c_identifier(name):
+    # Turn an arbitrary name (e.g. a latex symbol name) into a valid C identifier
+    identifier = re.sub(r'\W+', '_', str(name)).strip('_')
+    if not identifier or identifier[0].isdigit():
+        identifier = f'_{identifier}'
+    return identifier
+
+
+def _as_equations_dict(name, equations):
+    # Allow a single Matrix or expression in place of an equations dict
+    if isinstance(equations, dict):
+        return equations
+    return {name: equations}
+
+
+def _argument_names(symbols, arg_names):
+    # Every argument is prefixed with arg_, and everything else generated with rtk_, so symbol names can never clash
+    # with the generated parameters, loop variable or temporaries (or with C keywords and math.h)
+    if arg_names is None:
+        return [f'arg_{i}' for i in range(len(symbols))]
+    if len(arg_names) != len(symbols):
+        raise ValueError(f'Expected {len(symbols)} argument names, got {len(arg_names)}')
+    names = [f'arg_{_c_identifier(name)}' for name in arg_names]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Argument names are not unique as C identifiers: {names}')
+    return names
+
+
+def generate_c(name, equations, symbols, keys=None, arg_names=None):
+    """
+    Generate self-contained, allocation-free C code evaluating a set of equations
+
+    Common subexpressions are eliminated across all outputs. Two functions are generated:
+
+        void name(<arguments>, double *rtk_out)
+            Evaluate one sample. Grouped arguments are passed as `const double *`, single symbols as `double`.
+        void name_batch(int rtk_n, <arguments>, double *rtk_out)
+            Evaluate rtk_n samples. Every argument is an array with one row per sample.
+
+    The outputs are written to rtk_out in the order of keys, each entry flattened in row-major order, as in
+    compile_equations_dict(). The header defines the offset and size of each key in out.
+
+    Args:
+        name - Name of the generated function, and prefix of everything else it defines
+        equations - A dictionary of equations, as for compile_equations_dict(), or a single sympy Matrix or expression
+        symbols - Ordered list of arguments, as for compile_equations_dict()
+        keys - A list of keys to generate code for. If omitted, all equations are included
+        arg_names - Names of the C arguments, each given the prefix arg_. Defaults to arg_<i> for the i-th argument.
+    Return:
+        2-tuple (source, header) of strings
+    """
+    name = _c_identifier(name)
+    equations = _as_equations_dict(name, equations)
+    if keys is None:
+        keys = list(equations.keys())
+    flat_symbols, group_sizes = _flatten_arguments(symbols)
+    expressions, layout = _flatten_outputs(equations, keys)
+    names = _argument_names(symbols, arg_names)
+
+    # Replace every symbol with the C expression that reads it
+    single_args = []
+    batch_args = []
+    replacements = dict()
+    position = 0
+    for arg_name, size in zip(names, group_sizes):
+        if size is None:
+            single_args.append(f'double {arg_name}')
+            batch_args.append(f'const double *{arg_name}')
+            replacements[flat_symbols[position]] = sp.Symbol(arg_name)
+            position += 1
+        else:
+            single_args.append(f'const double *{arg_name}')
+            batch_args.append(f'const double *{arg_name}')
+            for j in range(size):
+                replacements[flat_symbols[position]] = sp.Symbol(f'{arg_name}[{j}]')
+                position += 1
+    expressions = [sp.sympify(expr).xreplace(replacements) for expr in expressions]
+
+    missing = set().union(*(expr.free_symbols for expr in expressions)) - set(replacements.values())
+    if missing:
+        raise ValueError(f'Equations depend on symbols not given as arguments: {sorted(missing, key=str)}')
+
+    # Common subexpression elimination across all outputs
+    subexpressions, reduced = sp.cse(expressions, symbols=sp.numbered_symbols('rtk_cse'))
+    body = [f'    const double {symbol} = {sp.ccode(expr)};' for symbol, expr in subexpressions]
+    body += [f'    rtk_out[{i}] = {sp.ccode(expr)};' for i, expr in enumerate(reduced)]
+
+    # Each batch row is offset by the size of one sample of that argument
+    row_args = []
+    for arg_name, size in zip(names, group_sizes):
+        row_args.append(f'{arg_name}[rtk_i]' if size is None else f'{arg_name} + rtk_i*{size}')
+
+    macro = name.upper()
+    header_lines = [
+        f'#ifndef {macro}_H',
+        f'#define {macro}_H',
+        '',
+        f'#define {macro}_OUTPUT_SIZE {len(expressions)}',
+    ]
+    for key, shape, start, stop in layout:
+        header_lines.append(f'#define {macro}_{_c_identifier(key).upper()}_OFFSET {start}')
+        header_lines.append(f'#define {macro}_{_c_identifier(key).upper()}_SIZE {stop - start}')
+    header_lines += [
+        '',
+        f'void {name}({", ".join(single_args)}, double *rtk_out);',
+        f'void {name}_batch(int rtk_n, {", ".join(batch_args)}, double *rtk_out);',
+        '',
+        f'#endif',
+        ''
+    ]
+
+    source_lines = [
+        f'#include <math.h>',
+        f'#include "{name}.h"',
+        '',
+        '#ifndef M_PI',
+        '#define M_PI 3.14159265358979323846',
+        '#endif',
+        '',
+        f'void {name}({", ".join(single_args)}, double *rtk_out) {{',
+        *body,
+        '}',
+        '',
+        f'void {name}_batch(int rtk_n, {", ".join(batch_args)}, double *rtk_out) {{',
+        '    for (int rtk_i = 0; rtk_i < rtk_n; rtk_i++) {',
+        f'        {name}({", ".join(row_args)}, rtk_out + rtk_i*{macro}_OUTPUT_SIZE);',
+        '    }',
+        '}',
+        ''
+    ]
+    return '\n'.join(source_lines), '\n'.join(header_lines)
+
+
+def write_c(directory, name, equations, symbols, keys=None, arg_names=None):
+    """
+    Generate C code with generate_c() and write it to name.c and name.h in a directory
+
+    Return:
+        2-tuple (source_path, header_path)
+    """
+    source, header = generate_c(name, equations, symbols, keys=keys, arg_names=arg_names)
+    name = _c_identifier(name)
+    os.makedirs(directory, exist_ok=True)
+    source_path = os.path.join(directory, f'{name}.c')
+    header_path = os.path.join(directory, f'{name}.h')
+    with open(source_path, 'w') as file:
+        file.write(source)
+    with open(header_path, 'w') as file:
+        file.write(header)
+    return source_path, header_path
+
+
+def compile_equations_dict_c(equations, symbols, keys=None, directory=None, compiler='cc', flags=('-O2',)):
+    """
+    Compile equations to a native shared library with the local C compiler, and load it with ctypes
+
+    The returned function is called exactly like the output of compile_equations_dict(), but evaluates the
+    generated C code in a single call for the whole batch.
+
+    The kernel and library are named after a hash of the equations, arguments and compiler settings, so compiling
+    different equations into the same directory never reuses an already loaded library. Compiling the same equations
+    again reuses the existing library.
+
+    Args:
+        equations - A dictionary of equations, or a single sympy Matrix or expression (returned under the key 'out')
+        symbols - Ordered list of arguments, as for compile_equations_dict()
+        keys - A list of keys to compile. If omitted, all equations are compiled
+        directory - Directory for the generated source and library. Defaults to a new temporary directory
+        compiler - C compiler command
+        flags - Extra compiler flags
+    Return:
+        Function taking one array per entry of symbols and returning a dict of NumPy arrays
+    """
+    equations = _as_equations_dict('out', equations)
+    if keys is None:
+        keys = list(equations.keys())
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix='roboticstoolkit_')
+
+    # A library that is already loaded is returned by ctypes.CDLL() instead of being reloaded, so every distinct
+    # kernel needs its own library file and symbol names
+    digest = hashlib.sha256(sp.srepr([(key, equations[key]) for key in keys]).encode())
+    digest.update(sp.srepr(list(symbols)).encode())
+    digest.update(repr((compiler, tuple(flags))).encode())
+    name = f'rtk_kernel_{digest.hexdigest()[:16]}'
+
+    library_path = os.path.join(directory, f'lib{name}.so')
+    if not os.path.exists(library_path):
+        source_path, _ = write_c(directory, name, equations, symbols, keys=keys)
+        # Build under a temporary name, so a failed or concurrent build never leaves a partial library behind
+        temp_path = f'{library_path}.{os.getpid()}.tmp'
+        try:
+            subprocess.run([compiler, *flags, '-shared', '-fPIC', '-o', temp_path, source_path, '-lm'],
+                           check=True, capture_output=True)
+            os.replace(temp_path, library_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    library = ctypes.CDLL(library_path)
+    batch_function = getattr(library, f'{name}_batch')
+    _, group_sizes = _flatten_arguments(symbols)
+    _, layout = _flatten_outputs(equations, keys)
+    output_size = layout[-1][3] if layout else 0
+    pointer = ctypes.POINTER(ctypes.c_double)
+
+    def compiled(*args):
+        if len(args) != len(group_sizes):
+            raise TypeError(f'Expected {len(group_sizes)} arguments, got {len(args)}')
+
+        # Broadcast every argument to the batch shape, as contiguous rows
+        args = [np.asarray(arg, dtype=float) for arg in args]
+        batch_shape = np.broadcast_shapes(*(arg.shape if size is None else arg.shape[:-1] for arg, size in zip(args, group_sizes)))
+        rows = []
+        for arg, size in zip(args, group_sizes):
+            if size is not None and arg.shape[-1:] != (size,):
+                raise ValueError(f'Expected an argument with last dimension {size}, got shape {arg.shape}')
+            shape = batch_shape if size is None else (*batch_shape, size)
+            rows.append(np.ascontiguousarray(np.broadcast_to(arg, shape)))
+
+        num_samples = int(np.prod(batch_shape))
+        output = np.empty((num_samples, output_size))
+        batch_function(ctypes.c_int(num_samples), *(row.ctypes.data_as(pointer) for row in rows), output.ctypes.data_as(pointer))
+
+        return {key: output[:, start:stop].reshape((*batch_shape, *shape)) for key, shape, start, stop in layout}
+
+    # Keep the library loaded for as long as the function exists
+    compiled.library = library
+    compiled.directory = directory
+    return compiled
@@ -9,16 +9,19 @@ z_vec = sp.Matrix([0, 0, 1])
 
 
 # Define some general-purpose functions
-def diff_total(expr, diffby, diffmap):
+def diff_total(expr, diffby, diffmap, cache=None):
     """
     Take the total derivative with respect to a variable.
 
-    Based on https://robotfantastic.org/total-derivatives-in-sympy.html
+    Applies the chain rule directly: d expr/d diffby = partial expr/partial diffby + sum(partial expr/partial v * diffmap[v])
 
     Args:
-        expr - expression to differentiate
+        expr - expression to differentiate. Can also be a sympy Matrix, which is differentiated element-wise
         diffby - differentiate with respect to this variable
         diffmap - dictionary mapping all variables that depend on diffby to their symbolic derivative
+        cache - Optional dictionary to memoise the derivatives of the terms of sums in. Pass the same dictionary to
+            calls with the same diffmap on related expressions (e.g. the centre of mass positions and the Lagrangian
+            of one manipulator), so terms they share are only differentiated once
     Return:
         A sympy expression
 
@@ -32,17 +35,80 @@ def diff_total(expr, diffby, diffmap):
 
         -theta_dot*sin(theta)
     """
-    # Create functional forms of all symbols in the diffmap
-    funcmap = {v:sp.Function(v)(diffby) for v in diffmap}
-    # Replace symbols in the expression by their functional forms
-    fnexpr = expr.subs(funcmap)
-    # Do the differentiation
-    diffexpr = sp.diff(fnexpr, diffby)
-    # Replace the Derivatives with the variables in diffmap
-    derivmap = {sp.Derivative(funcmap[v], diffby):dv for v, dv in diffmap.items()}
-    finaldiff = diffexpr.subs(derivmap)
-    # Replace the functional forms with their original form
-    return finaldiff.subs({funcmap[v]:sp.Symbol(f'{v}') for v in diffmap})
+    if isinstance(expr, sp.MatrixBase):
+        return expr.applyfunc(lambda element: diff_total(element, diffby, diffmap, cache))
+
+    expr = sp.sympify(expr)
+    if cache is None:
+        return _diff_total_term(expr, diffby, diffmap)
+
+    # Differentiate each term of a sum separately, so terms shared between expressions are only differentiated once
+    derivatives = []
+    for term in sp.Add.make_args(expr):
+        key = (term, diffby)
+        derivative = cache.get(key)
+        if derivative is None:
+            derivative = cache[key] = _diff_total_term(term, diffby, diffmap)
+        derivatives.append(derivative)
+    return sp.Add(*derivatives)
+
+
+def _diff_total_term(expr, diffby, diffmap):
+    # Explicit dependence on diffby, then the chain rule through every dependent variable in the expression
+    free_symbols = expr.free_symbols
+    terms = [expr.diff(diffby)] if diffby in free_symbols else []
+    for v, dv in diffmap.items():
+        if v in free_symbols:
+            terms.append(expr.diff(v) * dv)
+    return sp.Add(*terms)
+
+
+def joint_symbols(joint_types):
+    """
+    Get the symbols used for the joint-space velocities and accelerations in the equations of motion.
+
+    Args:
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+    Return:
+        2-tuple (velocities, accelerations). Each is a list of symbols with one entry per joint, ground frame excluded.
+    """
+    velocities = []
+    accelerations = []
+    for i in range(1, len(joint_types)):
+        if joint_types[i] == 'R':
+            velocities.append(sp.symbols(f'\dot{{\\theta_{i}}}'))
+            accelerations.append(sp.symbols(f'\ddot{{\\theta_{i}}}'))
+        else:
+            velocities.append(sp.symbols(f'\dot{{d_{i}}}'))
+            accelerations.append(sp.symbols(f'\ddot{{d_{i}}}'))
+    return velocities, accelerations
+
+
+def joint_rates(joint_types, num_frames):
+    """
+    Get the joint-space velocities and accelerations of every frame, split by joint type, as used by the propagations
+
+    Args:
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+        num_frames - Number of frames, including the ground and end effector frames
+    Return:
+        4-tuple (theta_vel, theta_accel, d_vel, d_accel). Each is a list with one entry per frame except the end
+        effector: the symbol of joint_symbols() where the joint is of that type, 0 otherwise.
+    """
+    # Use lists (as opposed to sympy matrices) since these are always accessed individually
+    theta_vel = [sp.S(0)] * (num_frames - 1)
+    theta_accel = [sp.S(0)] * (num_frames - 1)
+    d_vel = [sp.S(0)] * (num_frames - 1)
+    d_accel = [sp.S(0)] * (num_frames - 1)
+    velocities, accelerations = joint_symbols(joint_types)
+    for i, velocity, acceleration in zip(range(1, len(joint_types)), velocities, accelerations):
+        if joint_types[i] == 'R':
+            theta_vel[i] = velocity
+            theta_accel[i] = acceleration
+        elif joint_types[i] == 'P':
+            d_vel[i] = velocity
+            d_accel[i] = acceleration
+    return theta_vel, theta_accel, d_vel, d_accel
 
 
 def print_latex(expr):
@@ -82,16 +148,18 @@ def func_equations_dict(equations_dict, func, *args, output=True, keys=None, **k
         keys - A list of keys to operate on. If omitted, all keys are operated on
         kwargs - Additional keyword arguments for func
     Return:
-        A new equation dict with the same structure as the original, with the outputs of func
+        A new equation dict with the same structure as the original, with the outputs of func. Entries that were not
+        operated on are shared with the original rather than copied.
     """
 
     if output:
-        # Generate output dict that is different from the input one
-        equations_dict = copy.deepcopy(equations_dict)
+        # Generate output dict that is different from the input one. Only the dict itself is copied, since every
+        # entry operated on is replaced by the outputs of func.
+        output_dict = copy.copy(equations_dict)
 
     if keys is None:
         # Operate on all equations by deafult
-        keys = equations_dict.keys()
+        keys = list(equations_dict.keys())
 
     for name in keys:
         # Apply the given function to each of the equations
@@ -99,12 +167,12 @@ def func_equations_dict(equations_dict, func, *args, output=True, keys=None, **k
         if isinstance(equations, list):
             func_output = [func(f'{name}{i}', eq, *args, **kwargs) for i, eq in enumerate(equations)]
         else:
-            func_output = func(name, equations_dict[name], *args, **kwargs)
+            func_output = func(name, equations, *args, **kwargs)
         if output:
-            equations_dict[name] = func_output
+            output_dict[name] = func_output
 
     if output:
-        return equations_dict
+        return output_dict
 
 
 def print_equations_dict(equations_dict, keys=None, latex=False):
@@ -121,7 +189,22 @@ def print_equations_dict(equations_dict, keys=None, latex=False):
     func_equations_dict(equations_dict, print_equation, output=False, keys=keys, latex=latex)
 
 
-def substitute_equations_dict(equations_dict, subs_map, keys=None):
+def _replace_cached(expr, replacements, cache):
+    # Structural replacement like expr.xreplace(replacements), memoising every subtree in cache
+    if expr in cache:
+        return cache[expr]
+    if expr in replacements:
+        result = replacements[expr]
+    elif not expr.args:
+        result = expr
+    else:
+        args = [_replace_cached(arg, replacements, cache) for arg in expr.args]
+        result = expr.func(*args) if any(new is not old for new, old in zip(args, expr.args)) else expr
+    cache[expr] = result
+    return result
+
+
+def substitute_equations_dict(equations_dict, subs_map, keys=None, batch=False):
     """
     Substitute into all equations in a dictionary
 
@@ -130,10 +213,24 @@ def substitute_equations_dict(equations_dict, subs_map, keys=None):
             Each expression can be a single expression or a list of expressions.
         subs_map - A dictionary of substitutions, as you would use for expr.subs(subs_map)
         keys - A list of keys to substitute. If omitted, all equations are substituted
+        batch - If True, replace in all equations in one pass, like expr.xreplace(subs_map). Subexpressions shared
+            between equations (e.g. the intermediates of the dynamics) are only rebuilt once. Much faster than subs
+            for large dicts, but only replaces exact matches of the keys of subs_map, usually symbols.
     Return:
         An equation dict with all values substituted
     """
-    return func_equations_dict(equations_dict, lambda _, eq: eq.subs(subs_map), keys=keys)
+    if not batch:
+        return func_equations_dict(equations_dict, lambda _, eq: eq.subs(subs_map), keys=keys)
+
+    replacements = {sp.sympify(old): sp.sympify(new) for old, new in subs_map.items()}
+    cache = dict()
+
+    def replace(_, eq):
+        if isinstance(eq, sp.MatrixBase):
+            return eq.applyfunc(lambda element: _replace_cached(element, replacements, cache))
+        return _replace_cached(sp.sympify(eq), replacements, cache)
+
+    return func_equations_dict(equations_dict, replace, keys=keys)
 
 
 def free_symbols_equations_dict(equations_dict, keys=None):
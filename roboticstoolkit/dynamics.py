@@ -1,11 +1,129 @@
+import functools
 import sympy as sp
 from roboticstoolkit.transforms import rotation, translation, three_vector, four_vector
 from roboticstoolkit.propagations import *
 from roboticstoolkit.kinematics import base_transforms
-from roboticstoolkit.core import diff_total
+from roboticstoolkit.core import diff_total, joint_symbols, joint_rates
+from roboticstoolkit.simplification import parallel_executor, map_parallel, simplify_all
+from roboticstoolkit.simplification import resolve_simplification, intermediate_simplification, final_simplification
+from roboticstoolkit.simplification import LazyEquationsDict
+from roboticstoolkit.profiling import profiled, profile_stage
 
 
-def dynamics_newton_euler(transforms, pos_coms, masses, inertias, joint_types, gravity, f_end_effector, n_end_effector):
+def _collect_joint_force(force, accelerations):
+    # Collect the terms of a joint force by the joint accelerations
+    return sp.collect(sp.expand(force), accelerations)
+
+
+def _euler_lagrange_force(variable_and_vel, lagrangian, t, diff_map, derivative_cache=None):
+    # Apply the Euler-Lagrange equation for one generalised variable
+    variable, variable_vel = variable_and_vel
+    return diff_total(lagrangian.diff(variable_vel), t, diff_map, derivative_cache) - lagrangian.diff(variable)
+
+
+def _newton_euler_intermediates(num_frames, gravity, f_end_effector, n_end_effector):
+    # Task-space vectors for all frames, with the boundary conditions set
+    intermediates = {key: [sp.zeros(3,1) for _ in range(num_frames - 1)] for key in ('omega', 'alpha', 'a', 'a_c', 'f_c', 'n_c')}
+    intermediates['f'] = [sp.zeros(3,1) for _ in range(num_frames)]
+    intermediates['n'] = [sp.zeros(3,1) for _ in range(num_frames)]
+    intermediates['a'][0] = sp.Matrix(-gravity)
+    intermediates['f'][-1] = sp.Matrix(f_end_effector)
+    intermediates['n'][-1] = sp.Matrix(n_end_effector)
+    return intermediates
+
+
+def _outward_kinematics_step(intermediates, i, rotations, translations, rates, executor, policy, function):
+    # Angular velocity and acceleration, and linear acceleration of frame i from those of frame i-1
+    # Quantities that don't depend on each other are simplified together, so they can be spread across workers
+    omega, alpha, accel = intermediates['omega'], intermediates['alpha'], intermediates['a']
+    theta_vel, theta_accel, d_vel, d_accel = rates
+    with profile_stage(function, 'outward_kinematics', link=i) as record:
+        omega[i], alpha[i], accel[i] = simplify_all([
+            omega_next_frame(rotations[i-1], omega[i-1], theta_vel[i]),
+            alpha_next_frame(rotations[i-1], alpha[i-1], omega[i-1], theta_vel[i], theta_accel[i]),
+            accel_next_frame(rotations[i-1], accel[i-1], alpha[i-1], omega[i-1], translations[i-1], d_vel[i], d_accel[i])
+        ], executor, policy)
+        record.outputs = [omega[i], alpha[i], accel[i]]
+
+
+def _outward_com_step(intermediates, i, pos_coms, masses, inertias, executor, policy, function):
+    # Acceleration of, and force and moment acting at, the centre of mass of link i
+    omega, alpha, accel = intermediates['omega'], intermediates['alpha'], intermediates['a']
+    accel_com, force_com, moment_com = intermediates['a_c'], intermediates['f_c'], intermediates['n_c']
+    with profile_stage(function, 'outward_com', link=i) as record:
+        accel_com[i], moment_com[i] = simplify_all([
+            accel_curr_frame(accel[i], alpha[i], omega[i], pos_coms[i]),
+            moment_com_curr_frame(inertias[i], alpha[i], omega[i])
+        ], executor, policy)
+        force_com[i], = simplify_all([force_com_curr_frame(masses[i], accel_com[i])], executor, policy)
+        record.outputs = [accel_com[i], moment_com[i], force_com[i]]
+
+
+def _inward_step(intermediates, i, rotations, translations, pos_coms, executor, policy, function):
+    # Force and moment exerted on link i by link i-1, from those exerted on link i+1
+    force_com, moment_com = intermediates['f_c'], intermediates['n_c']
+    force_link, moment_link = intermediates['f'], intermediates['n']
+    with profile_stage(function, 'inward', link=i) as record:
+        force_link[i], moment_link[i] = simplify_all([
+            force_curr_frame(rotations[i], force_link[i+1], force_com[i]),
+            moment_curr_frame(rotations[i], moment_link[i+1], moment_com[i], translations[i], force_link[i+1], pos_coms[i], force_com[i])
+        ], executor, policy)
+        record.outputs = [force_link[i], moment_link[i]]
+
+
+def _joint_forces(intermediates, links, joint_types, accelerations, executor, policy, function):
+    # Generalised joint-space forces of the given links, collected by the joint accelerations
+    force_link, moment_link = intermediates['f'], intermediates['n']
+    with profile_stage(function, 'simplify_forces') as record:
+        forces = [(moment_link[i] if joint_types[i] == 'R' else force_link[i]).dot(z_vec) for i in links]
+        forces = simplify_all(forces, executor, policy)
+        record.outputs = forces
+    with profile_stage(function, 'collect') as record:
+        forces = map_parallel(functools.partial(_collect_joint_force, accelerations=accelerations), forces, executor)
+        record.outputs = forces
+    return forces
+
+
+def _lagrange_joint_forces(lagrangian, variables, variables_vel, variables_accel, t, diff_map, executor, policy, derivative_cache=None):
+    # Apply the Euler-Lagrange equation for each joint, collect the forces by the joint accelerations
+    # Share the derivatives of common terms between joints, unless they are split across workers
+    euler_lagrange = functools.partial(_euler_lagrange_force, lagrangian=lagrangian, t=t, diff_map=diff_map,
+                                       derivative_cache=derivative_cache if executor is None else None)
+    with profile_stage('dynamics_lagrange', 'euler_lagrange') as record:
+        forces = map_parallel(euler_lagrange, [*zip(variables, variables_vel)], executor)
+        record.outputs = forces
+    with profile_stage('dynamics_lagrange', 'simplify_forces') as record:
+        forces = simplify_all(forces, executor, policy)
+        record.outputs = forces
+    with profile_stage('dynamics_lagrange', 'collect') as record:
+        forces = map_parallel(functools.partial(_collect_joint_force, accelerations=[*variables_accel]), forces, executor)
+        record.outputs = forces
+    return forces
+
+
+def _deferred_joint_forces(func, workers, *args, **kwargs):
+    # Joint forces for a LazyEquationsDict entry, with the ground frame's 0 in front
+    with parallel_executor(workers) as executor:
+        return [sp.S(0), *func(*args, executor=executor, **kwargs)]
+
+
+def _lazy_equations(intermediates, joint_forces, policy, workers):
+    # Equations dict with the joint forces deferred and the intermediates simplified on first access
+    equations = LazyEquationsDict(simplification=intermediate_simplification(policy), workers=workers)
+    equations.defer('tau', joint_forces)
+    for key, value in intermediates.items():
+        equations.set_unsimplified(key, value)
+    return equations
+
+
+def _force_policies(simplification):
+    # Simplification of the intermediate quantities, and of the joint forces
+    policy = resolve_simplification(simplification)
+    return intermediate_simplification(policy), 'full' if policy == 'final' else 'none'
+
+
+@profiled
+def dynamics_newton_euler(transforms, pos_coms, masses, inertias, joint_types, gravity, f_end_effector, n_end_effector, workers=None, simplification=None, lazy=False):
     """
     Compute the equations of motion of a serial manipulator.
     
@@ -21,6 +139,13 @@ def dynamics_newton_euler(transforms, pos_coms, masses, inertias, joint_types, g
         gravity - 3-vector. Acceleration due to gravity.
         f_end_effector - 3-vector. Force applied by end effector to the environment, in frame of end effector.
         n_end_effector - 3-vector. Moment applied by end effector to the environment, in frame of end effector.
+        workers - Number of worker processes to simplify independent vector components in. By default everything runs
+            in the calling process.
+        simplification - Simplification policy, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
+            With 'final', only the joint forces are simplified.
+        lazy - If True, return a LazyEquationsDict. The intermediate quantities are derived without simplification, and
+            each entry is only simplified when it is first read, so reading just 'tau' skips simplifying the rest.
+            The joint forces are then simplified once at the end, as with 'final'.
     Return:
         Dictionary of symbolic equations
     """
@@ -28,74 +153,49 @@ def dynamics_newton_euler(transforms, pos_coms, masses, inertias, joint_types, g
     # Unpack transformation matrices
     rotations, translations = zip(*((rotation(T), translation(T)) for T in transforms))
 
+    # Choose how to simplify the intermediate quantities, and whether to simplify the joint forces
+    policy = resolve_simplification(simplification)
+    step_policy, force_policy = _force_policies(policy)
+    if lazy:
+        step_policy = 'none'
+
     # Get number of frames. Includes base frame, all links, and end effector frame
     num_frames = len(transforms) + 1
     
-    # Define joint-space symbolic variables for all frames
-    # Use lists (as opposed to sympy matrices) since these are always accessed individually
-    theta_vel = [sp.S(0)] * (num_frames - 1)
-    theta_accel = [sp.S(0)] * (num_frames - 1)
-    d_vel = [sp.S(0)] * (num_frames - 1)
-    d_accel = [sp.S(0)] * (num_frames - 1)
-    for i in range(len(joint_types)):
-        if joint_types[i] == 'R':
-            theta_vel[i] = sp.symbols(f'\dot{{\\theta_{i}}}')
-            theta_accel[i] = sp.symbols(f'\ddot{{\\theta_{i}}}')
-        elif joint_types[i] == 'P':
-            d_vel[i] = sp.symbols(f'\dot{{d_{i}}}')
-            d_accel[i] = sp.symbols(f'\ddot{{d_{i}}}')
-    
-    # Define task-space vectors for all frames
-    omega = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    alpha = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    accel = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    accel_com = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    force_com = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    moment_com = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    force_link = [sp.zeros(3,1) for _ in range(num_frames)]
-    moment_link = [sp.zeros(3,1) for _ in range(num_frames)]
+    # Define joint-space symbolic variables and task-space vectors for all frames
+    rates = joint_rates(joint_types, num_frames)
+    intermediates = _newton_euler_intermediates(num_frames, gravity, f_end_effector, n_end_effector)
+    function = 'dynamics_newton_euler'
 
     # Define the output list of joint generalised forces
     joint_force = [sp.S(0)] * (num_frames - 1)
 
-    # Set boundary conditions
-    accel[0] = sp.Matrix(-gravity)
-    force_link[-1] = sp.Matrix(f_end_effector)
-    moment_link[-1] = sp.Matrix(n_end_effector)
-
-    # Outward propagation
-    for i in range(1, num_frames - 1):
-        omega[i] = sp.simplify(omega_next_frame(rotations[i-1], omega[i-1], theta_vel[i]))
-        alpha[i] = sp.simplify(alpha_next_frame(rotations[i-1], alpha[i-1], omega[i-1], theta_vel[i], theta_accel[i]))
-        accel[i] = sp.simplify(accel_next_frame(rotations[i-1], accel[i-1], alpha[i-1], omega[i-1], translations[i-1], d_vel[i], d_accel[i]))
-        accel_com[i] = sp.simplify(accel_curr_frame(accel[i], alpha[i], omega[i], pos_coms[i]))
-        force_com[i] = sp.simplify(force_com_curr_frame(masses[i], accel_com[i]))
-        moment_com[i] = sp.simplify(moment_com_curr_frame(inertias[i], alpha[i], omega[i]))
-
-    # Inward propagation
-    for i in range(num_frames - 2, 0, -1):
-        force_link[i] = sp.simplify(force_curr_frame(rotations[i], force_link[i+1], force_com[i]))
-        moment_link[i] = sp.simplify(moment_curr_frame(rotations[i], moment_link[i+1], moment_com[i], translations[i], force_link[i+1], pos_coms[i], force_com[i]))
-
-        # Get the generalised joint-space force, construct the output equation
-        force = moment_link[i] if joint_types[i] == 'R' else force_link[i]
-        joint_force[i] = sp.collect(sp.expand(force.dot(z_vec)), [*theta_accel, *d_accel])
+    with parallel_executor(workers) as executor:
+        # Outward propagation
+        for i in range(1, num_frames - 1):
+            _outward_kinematics_step(intermediates, i, rotations, translations, rates, executor, step_policy, function)
+            _outward_com_step(intermediates, i, pos_coms, masses, inertias, executor, step_policy, function)
+
+        # Inward propagation
+        for i in range(num_frames - 2, 0, -1):
+            _inward_step(intermediates, i, rotations, translations, pos_coms, executor, step_policy, function)
+
+        # Get the generalised joint-space forces, construct the output equations
+        if not lazy:
+            joint_force[1:] = _joint_forces(intermediates, range(1, num_frames - 1), joint_types, [*rates[1], *rates[3]],
+                                            executor, force_policy, function)
+
+    if lazy:
+        joint_forces = functools.partial(_deferred_joint_forces, _joint_forces, workers, intermediates, range(1, num_frames - 1),
+                                         joint_types, [*rates[1], *rates[3]], policy=final_simplification(policy), function=function)
+        return _lazy_equations(intermediates, joint_forces, policy, workers)
 
     # Construct dictionary of equations
-    return {
-        'tau': joint_force,
-        'omega': omega,
-        'alpha': alpha,
-        'a': accel,
-        'a_c': accel_com,
-        'f_c': force_com,
-        'n_c': moment_com,
-        'f': force_link,
-        'n': moment_link
-    }
+    return {'tau': joint_force, **intermediates}
 
 
-def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravity, variables):
+@profiled
+def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravity, variables, workers=None, simplification=None, lazy=False):
     """
     Compute the equations of motion of a serial manipulator.
     
@@ -110,6 +210,13 @@ def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravi
         joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
         gravity - 3-vector. Acceleration due to gravity.
         variables - List of symbols, representing the time-dependent generalised variables
+        workers - Number of worker processes to simplify independent links and vector components in, and to apply the
+            Euler-Lagrange equation for each joint in. By default everything runs in the calling process.
+        simplification - Simplification policy, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
+            With 'final', only the joint forces are simplified.
+        lazy - If True, return a LazyEquationsDict. The intermediate quantities are derived without simplification, and
+            each entry is only simplified when it is first read, so reading just 'tau' skips simplifying the rest.
+            The joint forces are then simplified once at the end, as with 'final'.
     Return:
         Dictionary of symbolic equations
     """
@@ -117,16 +224,14 @@ def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravi
     # Unpack transformation matrices
     rotations = [rotation(T) for T in transforms]
 
+    # Choose how to simplify the intermediate quantities, and whether to simplify the joint forces
+    policy = resolve_simplification(simplification)
+    step_policy, force_policy = _force_policies(policy)
+    if lazy:
+        step_policy = 'none'
+
     # Construct mapping for symbolic derivatives
-    variables_vel = [0] * len(variables)
-    variables_accel = [0] *len(variables)
-    for i in range(1, len(joint_types)):
-        if joint_types[i] == 'R':
-            variables_vel[i - 1] = sp.symbols(f'\dot{{\\theta_{i}}}')
-            variables_accel[i - 1] = sp.symbols(f'\ddot{{\\theta_{i}}}')
-        else:
-            variables_vel[i - 1] = sp.symbols(f'\dot{{d_{i}}}')
-            variables_accel[i - 1] = sp.symbols(f'\ddot{{d_{i}}}')
+    variables_vel, variables_accel = joint_symbols(joint_types)
 
     diff_map = {variables[i]:variables_vel[i] for i in range(len(variables))}
     diff_map.update({variables_vel[i]:variables_accel[i] for i in range(len(variables))})
@@ -134,42 +239,58 @@ def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravi
     # Get number of frames. Includes base frame, all links, and end effector frame
     num_frames = len(transforms) + 1
 
-    # Find positions and velocities of CoM of each link in the ground frame
-    pos_com_ground = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    vel_com_ground = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    t = sp.symbols('t')
-    base_transform_matrices = base_transforms(transforms)
-    for i in range(1, num_frames - 1):
-        pos_com_ground[i] = sp.simplify(three_vector(base_transform_matrices[i-1] * four_vector(pos_coms[i])))
-        vel_com_ground[i] = sp.simplify(diff_total(pos_com_ground[i], t, diff_map))
-    
-    # Find angular velocities of each link using propagation law
-    omega = [sp.zeros(3,1) for _ in range(num_frames - 1)]
-    theta_vel = [sp.symbols(f'\dot{{\\theta_{i}}}') if joint_types[i] == 'R' else 0 for i in range(len(joint_types))]
-    for i in range(1, num_frames - 1):
-        omega[i] = sp.simplify(omega_next_frame(rotations[i-1], omega[i-1], theta_vel[i]))
-
-    # Find kinetic and potential energies
-    kinetic_energies = [sp.S(0)] * (num_frames - 1)
-    potential_energies = [sp.S(0)] * (num_frames - 1)
-    for i in range(1, num_frames - 1):
-        kinetic_energies[i] = sp.simplify(sp.S(1)/2 * masses[i] * vel_com_ground[i].dot(vel_com_ground[i]) + sp.S(1)/2 * omega[i].dot(inertias[i] * omega[i]))
-        potential_energies[i] = sp.simplify(-masses[i] * gravity.dot(pos_com_ground[i]))
-
-    # Find total kinetic and potential energies, find lagrangian
-    kinetic_energy_total = sp.simplify(sum(kinetic_energies))
-    potential_energy_total = sp.simplify(sum(potential_energies))
-    lagrangian = kinetic_energy_total - potential_energy_total
-
-    # Apply the Euler-Lagrange equation to find the equations of motion
-    joint_force = [sp.S(0)] * (num_frames - 1)
-    for i in range(1, num_frames - 1):
-        force = diff_total(lagrangian.diff(variables_vel[i-1]), t, diff_map) - lagrangian.diff(variables[i-1])
-        joint_force[i] = sp.collect(sp.expand(force), [*variables_accel])
+    # Each link is independent until the energies are summed, so all links are simplified together
+    with parallel_executor(workers) as executor:
+        # Find positions and velocities of CoM of each link in the ground frame
+        pos_com_ground = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+        vel_com_ground = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+        t = sp.symbols('t')
+        derivative_cache = dict()
+        base_transform_matrices = base_transforms(transforms)
+        with profile_stage('dynamics_lagrange', 'com_positions') as record:
+            pos_com_ground[1:] = simplify_all([three_vector(base_transform_matrices[i-1] * four_vector(pos_coms[i])) for i in range(1, num_frames - 1)], executor, step_policy)
+            record.outputs = pos_com_ground
+        for i in range(1, num_frames - 1):
+            with profile_stage('dynamics_lagrange', 'com_velocity_diff_total', link=i) as record:
+                vel_com_ground[i] = diff_total(pos_com_ground[i], t, diff_map, derivative_cache)
+                record.outputs = vel_com_ground[i]
+        with profile_stage('dynamics_lagrange', 'simplify_com_velocities') as record:
+            vel_com_ground[1:] = simplify_all(vel_com_ground[1:], executor, step_policy)
+            record.outputs = vel_com_ground
 
-    # Construct dictionary of equations
-    return {
-        'tau': joint_force,
+        # Find angular velocities of each link using propagation law
+        omega = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+        theta_vel, _, _, _ = joint_rates(joint_types, num_frames)
+        for i in range(1, num_frames - 1):
+            with profile_stage('dynamics_lagrange', 'angular_velocity', link=i) as record:
+                omega[i], = simplify_all([omega_next_frame(rotations[i-1], omega[i-1], theta_vel[i])], executor, step_policy)
+                record.outputs = omega[i]
+
+        # Find kinetic and potential energies
+        kinetic_energies = [sp.S(0)] * (num_frames - 1)
+        potential_energies = [sp.S(0)] * (num_frames - 1)
+        with profile_stage('dynamics_lagrange', 'simplify_energies') as record:
+            energies = simplify_all([
+                *(sp.S(1)/2 * masses[i] * vel_com_ground[i].dot(vel_com_ground[i]) + sp.S(1)/2 * omega[i].dot(inertias[i] * omega[i]) for i in range(1, num_frames - 1)),
+                *(-masses[i] * gravity.dot(pos_com_ground[i]) for i in range(1, num_frames - 1))
+            ], executor, step_policy)
+            record.outputs = energies
+        kinetic_energies[1:] = energies[:num_frames - 2]
+        potential_energies[1:] = energies[num_frames - 2:]
+
+        # Find total kinetic and potential energies, find lagrangian
+        with profile_stage('dynamics_lagrange', 'simplify_total_energies') as record:
+            kinetic_energy_total, potential_energy_total = simplify_all([sum(kinetic_energies), sum(potential_energies)], executor, step_policy)
+            record.outputs = [kinetic_energy_total, potential_energy_total]
+        lagrangian = kinetic_energy_total - potential_energy_total
+
+        # Apply the Euler-Lagrange equation to find the equations of motion
+        joint_force = [sp.S(0)] * (num_frames - 1)
+        if not lazy:
+            joint_force[1:] = _lagrange_joint_forces(lagrangian, variables, variables_vel, variables_accel, t, diff_map,
+                                                     executor, force_policy, derivative_cache)
+
+    intermediates = {
         'p_c': pos_com_ground,
         'v_c': vel_com_ground,
         'omega': omega,
@@ -179,3 +300,225 @@ def dynamics_lagrange(transforms, pos_coms, masses, inertias, joint_types, gravi
         'V_total': potential_energy_total,
         'L': lagrangian,
     }
+    if lazy:
+        joint_forces = functools.partial(_deferred_joint_forces, _lagrange_joint_forces, workers, lagrangian, variables,
+                                         variables_vel, variables_accel, t, diff_map, policy=final_simplification(policy))
+        return _lazy_equations(intermediates, joint_forces, policy, workers)
+
+    # Construct dictionary of equations
+    return {'tau': joint_force, **intermediates}
+
+
+def dynamics_matrix_form(equations, joint_types, variables, simplification=None):
+    """
+    Split the equations of motion into the form tau = M(q) * qdd + C(q, qd) * qd + G(q)
+
+    If the equations come from dynamics_lagrange(), M and G are found from the kinetic and potential energies.
+    Otherwise they are read off the joint forces, which must not include any end effector loads.
+    C is constructed from the Christoffel symbols of M.
+
+    The result can be compiled with compile_equations_dict(), e.g. to evaluate only M in a computed-torque controller:
+
+        matrices = dynamics_matrix_form(equations, joint_types, variables)
+        mass_matrix = compile_equations_dict(matrices, [variables], keys=['M'])
+
+    Args:
+        equations - Dictionary of equations from dynamics_newton_euler() or dynamics_lagrange()
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+        variables - List of symbols, representing the time-dependent generalised variables
+        simplification - Simplification policy for the matrices, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
+    Return:
+        Dictionary of symbolic matrices. 'M' and 'C' are dof x dof, 'G' is dof x 1.
+    """
+    variables_vel, variables_accel = joint_symbols(joint_types)
+    num_joints = len(variables)
+    policy = final_simplification(resolve_simplification(simplification))
+    joint_force = equations['tau'][1:]
+
+    # Mass matrix
+    if 'K_total' in equations:
+        kinetic_energy = equations['K_total']
+        mass_matrix = sp.Matrix(num_joints, num_joints, lambda i, j: kinetic_energy.diff(variables_vel[i], variables_vel[j]))
+    else:
+        mass_matrix = sp.Matrix(num_joints, num_joints, lambda i, j: joint_force[i].diff(variables_accel[j]))
+    mass_matrix, = simplify_all([mass_matrix], policy=policy)
+
+    # Gravity terms
+    if 'V_total' in equations:
+        potential_energy = equations['V_total']
+        gravity_terms = sp.Matrix([potential_energy.diff(v) for v in variables])
+    else:
+        rest = {v: 0 for v in [*variables_vel, *variables_accel]}
+        gravity_terms = sp.Matrix([force.subs(rest) for force in joint_force])
+    gravity_terms, = simplify_all([gravity_terms], policy=policy)
+
+    # Coriolis and centrifugal terms, from the Christoffel symbols of the mass matrix
+    mass_matrix_diff = [mass_matrix.diff(v) for v in variables]
+    coriolis_matrix = sp.zeros(num_joints, num_joints)
+    for i in range(num_joints):
+        for j in range(num_joints):
+            coriolis_matrix[i, j] = sum(
+                sp.S(1)/2 * (mass_matrix_diff[k][i, j] + mass_matrix_diff[j][i, k] - mass_matrix_diff[i][j, k]) * variables_vel[k]
+                for k in range(num_joints)
+            )
+    coriolis_matrix, = simplify_all([coriolis_matrix], policy=policy)
+
+    return {
+        'M': mass_matrix,
+        'C': coriolis_matrix,
+        'G': gravity_terms
+    }
+
+
+class NewtonEulerModel:
+    """
+    Newton-Euler equations of motion that can be updated one link at a time
+
+    Keeps the intermediate quantities of every frame, so editing a link only repeats the propagation steps that depend
+    on it: the outward steps from the edited link onwards and the inward steps from the end effector down to it.
+    Editing the mass, centre of mass or inertia of a link leaves the outward kinematics untouched.
+
+    Example:
+
+        model = NewtonEulerModel(transforms, pos_coms, masses, inertias, joint_types, gravity, f_end_effector, n_end_effector)
+        equations = model.equations()
+        model.update_link(2, mass=sp.Symbol('m_2'))
+        equations = model.equations()
+    """
+
+    def __init__(self, transforms, pos_coms, masses, inertias, joint_types, gravity, f_end_effector, n_end_effector, workers=None, simplification=None):
+        """
+        Args:
+            Same as dynamics_newton_euler(). The equations are derived on the first call of equations().
+            simplification defaults to the global policy at construction time, and is kept for every later update,
+            so all the intermediate quantities are simplified the same way.
+        """
+        self.transforms = list(transforms)
+        self.pos_coms = list(pos_coms)
+        self.masses = list(masses)
+        self.inertias = list(inertias)
+        self.joint_types = list(joint_types)
+        self.workers = workers
+        self.simplification = resolve_simplification(simplification)
+
+        self.num_frames = len(self.transforms) + 1
+        self.rates = joint_rates(self.joint_types, self.num_frames)
+        self.intermediates = _newton_euler_intermediates(self.num_frames, gravity, f_end_effector, n_end_effector)
+        self.joint_force = [sp.S(0)] * (self.num_frames - 1)
+        self._rotations = [rotation(T) for T in self.transforms]
+        self._translations = [translation(T) for T in self.transforms]
+
+        # Everything is out of date until the first derivation
+        num_links = self.num_frames - 2
+        self._outward_from = 1
+        self._com_links = set()
+        self._inward_from = num_links
+
+        # Number of each kind of propagation step repeated by the last call of equations()
+        self.last_update = dict()
+
+    def update_link(self, i, transform=None, pos_com=None, mass=None, inertia=None):
+        """
+        Replace some of the parameters of a link. Arguments left as None are kept.
+
+        Args:
+            i - Index of the link, from 1 to the number of joints
+            transform - Incremental transformation matrix from frame i-1 to frame i, e.g. dh_transform() of the link's
+                DH row
+            pos_com - 3-vector. Position of the centre of mass, as in dynamics_newton_euler()
+            mass - Scalar
+            inertia - 3x3 tensor, about the centre of mass
+        """
+        if not 1 <= i <= self.num_frames - 2:
+            raise IndexError(f'Link index {i} out of range 1 to {self.num_frames - 2}')
+        if transform is not None:
+            self._set_transform(i - 1, transform)
+        if pos_com is not None:
+            self.pos_coms[i] = pos_com
+            self._com_links.add(i)
+        if mass is not None:
+            self.masses[i] = mass
+            self._com_links.add(i)
+        if inertia is not None:
+            self.inertias[i] = inertia
+            self._com_links.add(i)
+
+    def update_end_effector(self, transform=None, f_end_effector=None, n_end_effector=None):
+        """
+        Replace the end effector frame or the load applied by the end effector. Arguments left as None are kept.
+
+        Args:
+            transform - Incremental transformation matrix from the last link's frame to the end effector frame
+            f_end_effector - 3-vector. Force applied by end effector to the environment, in frame of end effector.
+            n_end_effector - 3-vector. Moment applied by end effector to the environment, in frame of end effector.
+        """
+        if transform is not None:
+            self._set_transform(self.num_frames - 2, transform)
+        if f_end_effector is not None:
+            self.intermediates['f'][-1] = sp.Matrix(f_end_effector)
+            self._inward_from = self.num_frames - 2
+        if n_end_effector is not None:
+            self.intermediates['n'][-1] = sp.Matrix(n_end_effector)
+            self._inward_from = self.num_frames - 2
+
+    def update_gravity(self, gravity):
+        """
+        Replace the acceleration due to gravity. Every outward step is repeated.
+        """
+        self.intermediates['a'][0] = sp.Matrix(-gravity)
+        self._outward_from = 1
+
+    def _set_transform(self, k, transform):
+        # transforms[k] takes frame k to frame k+1. It moves frame k+1 and everything beyond it (outward), and the
+        # point where the forces on link k+1 act on link k (inward).
+        self.transforms[k] = transform
+        self._rotations[k] = rotation(transform)
+        self._translations[k] = translation(transform)
+        if k + 1 <= self.num_frames - 2:
+            self._outward_from = min(self._outward_from, k + 1)
+        if k >= 1:
+            self._inward_from = max(self._inward_from, k)
+
+    def equations(self):
+        """
+        Bring the equations up to date with the edits made since the last call
+
+        Return:
+            Dictionary of symbolic equations, as returned by dynamics_newton_euler()
+        """
+        num_links = self.num_frames - 2
+        step_policy, force_policy = _force_policies(self.simplification)
+        function = 'NewtonEulerModel'
+        outward = range(self._outward_from, num_links + 1)
+        com_links = sorted(self._com_links.union(outward))
+        # Any change to a link's centre of mass terms changes the forces on it and on every link below it.
+        # Outward changes reach the last link, so the inward pass then starts from the top.
+        inward_from = max([self._inward_from, *com_links]) if com_links else self._inward_from
+        inward = range(inward_from, 0, -1)
+
+        with parallel_executor(self.workers) as executor:
+            for i in outward:
+                _outward_kinematics_step(self.intermediates, i, self._rotations, self._translations, self.rates,
+                                         executor, step_policy, function)
+            for i in com_links:
+                _outward_com_step(self.intermediates, i, self.pos_coms, self.masses, self.inertias, executor,
+                                  step_policy, function)
+            for i in inward:
+                _inward_step(self.intermediates, i, self._rotations, self._translations, self.pos_coms, executor,
+                             step_policy, function)
+            if inward:
+                self.joint_force[1:inward_from + 1] = _joint_forces(self.intermediates, range(1, inward_from + 1),
+                                                                    self.joint_types, [*self.rates[1], *self.rates[3]],
+                                                                    executor, force_policy, function)
+
+        self.last_update = {
+            'outward_kinematics': len(outward),
+            'outward_com': len(com_links),
+            'inward': len(inward)
+        }
+        self._outward_from = num_links + 1
+        self._com_links = set()
+        self._inward_from = 0
+
+        # Copy the lists, so later edits don't change equations already handed out
+        return {'tau': list(self.joint_force), **{key: list(value) for key, value in self.intermediates.items()}}
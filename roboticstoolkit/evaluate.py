@@ -0,0 +1,183 @@
+import numpy as np
+import sympy as sp
+from roboticstoolkit.core import free_symbols_equations_dict, flatten_equations_dict
+
+
+def _flatten_arguments(symbols):
+    """
+    Split the argument specification of a compiled function into a flat list of symbols
+
+    Args:
+        symbols - List of arguments. Each argument is either a single symbol or a list of symbols
+    Return:
+        2-tuple (flat_symbols, group_sizes). group_sizes has None for single symbols, else the number of symbols in the group
+    """
+    flat_symbols = []
+    group_sizes = []
+    for argument in symbols:
+        if isinstance(argument, (list, tuple, sp.MatrixBase)):
+            flat_symbols.extend(argument)
+            group_sizes.append(len(argument))
+        else:
+            flat_symbols.append(argument)
+            group_sizes.append(None)
+    return flat_symbols, group_sizes
+
+
+def _flatten_outputs(equations_dict, keys):
+    """
+    Collect all scalar expressions from a dictionary of equations into a single list
+
+    Args:
+        equations_dict - A dictionary of equations
+        keys - A list of keys to collect
+    Return:
+        2-tuple (expressions, layout). layout has one entry (name, shape, start, stop) per key, where shape is
+        the shape of the output array (excluding batch dimensions) and start:stop indexes into expressions
+    """
+    expressions = []
+    layout = []
+    for name in keys:
+        equations = equations_dict[name]
+        entries = equations if isinstance(equations, list) else [equations]
+
+        # All entries of a list must have the same shape so they can be stacked
+        entry_shape = None
+        start = len(expressions)
+        for eq in entries:
+            if isinstance(eq, sp.MatrixBase):
+                shape = eq.shape
+                expressions.extend(eq)
+            else:
+                shape = ()
+                expressions.append(sp.sympify(eq))
+            if entry_shape is not None and shape != entry_shape:
+                raise ValueError(f'Entries of {name} do not all have the same shape')
+            entry_shape = shape
+
+        entry_shape = entry_shape or ()
+        shape = (len(entries), *entry_shape) if isinstance(equations, list) else entry_shape
+        layout.append((name, shape, start, len(expressions)))
+    return expressions, layout
+
+
+def compile_equations_dict(equations_dict, symbols, keys=None):
+    """
+    Compile equations from a dictionary into a single vectorised numerical function
+
+    All expressions are lambdified together with common subexpression elimination, so work is shared between every
+    output. The function is evaluated with NumPy, so every argument can be an array holding a whole batch of samples.
+
+    Example:
+
+        compiled = compile_equations_dict(equations, [[theta1, theta2], joint_velocities, joint_accelerations], keys=['tau'])
+        compiled(q, qd, qdd)['tau']
+
+    with q, qd and qdd of shape (N, 2) returns an (N, 3) array, with one column for the ground frame and each joint.
+
+    Args:
+        equations_dict - A dictionary of equations. Has entries of the form 'symbolic_name': expression.
+            Each expression can be a single expression, a sympy Matrix, or a list of either.
+        symbols - Ordered list of arguments of the compiled function. Each argument is either a single symbol, or a list
+            of symbols that is passed as one array with the symbols stacked along its last axis.
+        keys - A list of keys to compile. If omitted, all equations are compiled
+    Return:
+        Function taking one array per entry of symbols. Returns a dict of NumPy arrays with the compiled keys. Each array
+        has the broadcast shape of the arguments as leading dimensions, then the list length (for list entries), then
+        the matrix shape (for Matrix entries).
+    """
+    if keys is None:
+        keys = list(equations_dict.keys())
+
+    flat_symbols, group_sizes = _flatten_arguments(symbols)
+    expressions, layout = _flatten_outputs(equations_dict, keys)
+
+    # Check every free symbol is supplied, rather than failing with a NameError when called
+    missing = free_symbols_equations_dict(equations_dict, keys=keys) - set(flat_symbols)
+    if missing:
+        raise ValueError(f'Equations depend on symbols not given as arguments: {sorted(missing, key=str)}')
+
+    func = sp.lambdify(flat_symbols, expressions, modules='numpy', cse=True)
+
+    def compiled(*args):
+        if len(args) != len(group_sizes):
+            raise TypeError(f'Expected {len(group_sizes)} arguments, got {len(args)}')
+
+        # Unpack grouped arguments into one array per symbol
+        flat_args = []
+        for arg, size in zip(args, group_sizes):
+            arg = np.asarray(arg, dtype=float)
+            if size is None:
+                flat_args.append(arg)
+            else:
+                if arg.shape[-1:] != (size,):
+                    raise ValueError(f'Expected an argument with last dimension {size}, got shape {arg.shape}')
+                flat_args.extend(arg[..., j] for j in range(size))
+        batch_shape = np.broadcast_shapes(*(a.shape for a in flat_args))
+
+        # Evaluate everything at once, then arrange the outputs into arrays
+        values = func(*flat_args)
+        outputs = dict()
+        for name, shape, start, stop in layout:
+            output = np.empty((*batch_shape, stop - start))
+            for j in range(start, stop):
+                output[..., j - start] = values[j]
+            outputs[name] = output.reshape((*batch_shape, *shape))
+        return outputs
+
+    return compiled
+
+
+def _parameter_columns(parameters):
+    # Dictionary mapping symbol names to arrays, from a dict of arrays or a NumPy structured array
+    if isinstance(parameters, np.ndarray):
+        if parameters.dtype.names is None:
+            raise ValueError('Expected a structured array with one field per symbol')
+        return {name: parameters[name] for name in parameters.dtype.names}
+    columns = dict()
+    for symbol, values in parameters.items():
+        name = symbol if isinstance(symbol, str) else str(symbol)
+        if name in columns:
+            raise ValueError(f'Parameter {name} given more than once')
+        columns[name] = values
+    return columns
+
+
+def evaluate_equations_dict(equations_dict, parameters, keys=None):
+    """
+    Evaluate equations for many sets of values at once
+
+    Instead of substituting each set of values (e.g. the link lengths and masses of every robot variant) with
+    substitute_equations_dict(), the equations are compiled once with compile_equations_dict() and evaluated on whole
+    arrays of values.
+
+    Example:
+
+        variants = {L1: [1.0, 1.2, 1.5], L2: [0.5, 0.5, 0.8], m1: 2.0, m2: 1.0, g: 9.81}
+        values = evaluate_equations_dict(matrices, variants, keys=['M', 'G'])
+
+    returns arrays of shape (3, 2, 2) for 'M' and (3, 2, 1) for 'G', provided these only depend on the given symbols.
+    States can be given as arrays too, e.g. q of shape (variants, 1) and (1, samples) for every state of every variant.
+
+    Args:
+        equations_dict - A dictionary of equations. Has entries of the form 'symbolic_name': expression.
+            Each expression can be a single expression, a sympy Matrix, or a list of either.
+        parameters - Values of every free symbol of the equations. Either a dictionary mapping symbols (or their names)
+            to arrays, or a NumPy structured array with one field per symbol name. All arrays are broadcast together.
+        keys - A list of keys to evaluate. If omitted, all equations are evaluated
+    Return:
+        Dictionary of NumPy arrays with the same keys as flatten_equations_dict(). Each array has the broadcast shape of
+        the parameters as leading dimensions, then the matrix shape for Matrix entries.
+    """
+    flat_dict = flatten_equations_dict(equations_dict, keys=keys)
+    columns = _parameter_columns(parameters)
+
+    # Match the columns to the free symbols by name. Unused columns still set the shape of the outputs.
+    symbols_by_name = {str(symbol): symbol for symbol in free_symbols_equations_dict(flat_dict)}
+    missing = symbols_by_name.keys() - columns.keys()
+    if missing:
+        raise ValueError(f'No values given for symbols: {sorted(missing)}')
+    symbols = [symbols_by_name.get(name, sp.Symbol(name)) for name in columns]
+
+    compiled = compile_equations_dict(flat_dict, symbols)
+    return compiled(*columns.values())
@@ -0,0 +1,356 @@
+import numpy as np
+import sympy as sp
+from roboticstoolkit.transforms import rotation, translation, cross_matrix
+from roboticstoolkit.propagations import omega_next_frame, alpha_next_frame, accel_next_frame
+from roboticstoolkit.core import joint_rates
+from roboticstoolkit.simplification import resolve_simplification, final_simplification, simplify_all
+from roboticstoolkit import numeric_propagations as prop
+from roboticstoolkit.numeric_kinematics import link_transforms_numeric
+from roboticstoolkit.numeric_transforms import cross_matrix_numeric
+
+
+# The joint forces are linear in 10 inertial parameters per link, all represented in the link's frame:
+#   m                  - mass
+#   mx, my, mz         - first moment of mass, m * p_com
+#   Ixx, Ixy, Ixz, Iyy, Iyz, Izz - inertia tensor about the link's frame origin (not the centre of mass)
+INERTIAL_PARAMETERS = ('m', 'mx', 'my', 'mz', 'Ixx', 'Ixy', 'Ixz', 'Iyy', 'Iyz', 'Izz')
+
+# Entries of the symmetric inertia tensor, in the order of INERTIAL_PARAMETERS
+_INERTIA_INDICES = ((0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2))
+
+
+def inertial_parameter_symbols(num_links):
+    """
+    Get symbols for the inertial parameters of every link, e.g. m1, mx1, ..., Izz1, m2, ...
+
+    Return:
+        List of 10 * num_links symbols, ordered as INERTIAL_PARAMETERS for each link in turn
+    """
+    return [sp.Symbol(f'{name}{i}') for i in range(1, num_links + 1) for name in INERTIAL_PARAMETERS]
+
+
+def inertial_parameters(pos_coms, masses, inertias):
+    """
+    Stack the inertial parameters of every link, from the link parameters used by the dynamics functions
+
+    Moves the inertias to the frame origins with the parallel axis theorem. Works with symbolic or numerical values.
+    Args:
+        pos_coms, masses, inertias - As in dynamics_newton_euler(), with 0 for the ground frame
+    Return:
+        Column Matrix of 10 * links parameters, ordered as inertial_parameter_symbols()
+    """
+    parameters = []
+    for i in range(1, len(masses)):
+        pos_com, mass, inertia = sp.Matrix(pos_coms[i]), masses[i], sp.Matrix(inertias[i])
+        inertia_origin = inertia + mass * (pos_com.dot(pos_com) * sp.eye(3) - pos_com * pos_com.T)
+        parameters.extend([mass, *(mass * pos_com), *(inertia_origin[j, k] for j, k in _INERTIA_INDICES)])
+    return sp.Matrix(parameters)
+
+
+def inertial_parameters_numeric(pos_coms, masses, inertias):
+    """
+    Numerical equivalent of inertial_parameters()
+
+    Return:
+        Array of shape (10 * links,)
+    """
+    pos_coms = prop.stack_vectors(pos_coms, 3)[1:]
+    masses = np.asarray(masses, dtype=float)[1:]
+    inertias = prop.stack_vectors(inertias, (3, 3))[1:]
+    inertias_origin = inertias + masses[:, None, None] * (
+        np.einsum('...i,...i', pos_coms, pos_coms)[:, None, None] * np.eye(3) - pos_coms[:, :, None] * pos_coms[:, None, :])
+    rows, columns = zip(*_INERTIA_INDICES)
+    return np.concatenate([masses[:, None], masses[:, None] * pos_coms, inertias_origin[:, rows, columns]], axis=1).reshape(-1)
+
+
+def link_parameters_numeric(parameters):
+    """
+    Inverse of inertial_parameters_numeric(). Only meaningful for a full set of parameters, not base parameters.
+
+    Args:
+        parameters - Array of shape (10 * links,)
+    Return:
+        3-tuple (pos_coms, masses, inertias) of lists with 0 for the ground frame, as used by the dynamics functions
+    """
+    parameters = np.asarray(parameters, dtype=float).reshape(-1, 10)
+    pos_coms, masses, inertias = [np.zeros(3)], [0.0], [np.zeros((3, 3))]
+    for link in parameters:
+        mass = link[0]
+        pos_com = link[1:4] / mass
+        inertia_origin = np.empty((3, 3))
+        for value, (j, k) in zip(link[4:], _INERTIA_INDICES):
+            inertia_origin[j, k] = inertia_origin[k, j] = value
+        pos_coms.append(pos_com)
+        masses.append(mass)
+        inertias.append(inertia_origin - mass * (pos_com.dot(pos_com) * np.eye(3) - np.outer(pos_com, pos_com)))
+    return pos_coms, masses, inertias
+
+
+def _inertia_product(vector):
+    # Matrix L with L * [Ixx, Ixy, Ixz, Iyy, Iyz, Izz] = I * vector
+    x, y, z = vector
+    return sp.Matrix([
+        [x, y, z, 0, 0, 0],
+        [0, x, 0, y, z, 0],
+        [0, 0, x, 0, y, z]
+    ])
+
+
+def _inertia_product_numeric(vector):
+    # Batched _inertia_product(), shape (..., 3, 6)
+    x, y, z = vector[..., 0], vector[..., 1], vector[..., 2]
+    zero = np.zeros_like(x)
+    return np.stack([
+        np.stack([x, y, z, zero, zero, zero], axis=-1),
+        np.stack([zero, x, zero, y, z, zero], axis=-1),
+        np.stack([zero, zero, x, zero, y, z], axis=-1)
+    ], axis=-2)
+
+
+def regressor(transforms, joint_types, gravity, simplification=None):
+    """
+    Rewrite the joint forces of a serial manipulator as tau = Y(q, qd, qdd) * pi
+
+    Uses the Newton-Euler propagation of dynamics_newton_euler(), with the link wrenches written about the frame
+    origins, so every term is linear in the inertial parameters. No end effector load is included.
+    Args:
+        transforms - List of incremental transformation matrices. Include all links and the end effector frame.
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+        gravity - 3-vector. Acceleration due to gravity.
+        simplification - Simplification policy for the regressor, one of SIMPLIFICATION_POLICIES. Defaults to the global
+            policy. The (linear) propagation is never simplified on the way.
+    Return:
+        Dictionary with entries:
+            'Y' - dof x (10 * links) Matrix, in terms of the joint variables and their derivatives
+            'pi' - Column Matrix of the inertial parameter symbols, ordered as inertial_parameter_symbols()
+        Compile 'Y' with compile_equations_dict() to evaluate it, or use regressor_numeric()
+    """
+    rotations = [rotation(T) for T in transforms]
+    translations = [translation(T) for T in transforms]
+    num_frames = len(transforms) + 1
+    num_links = num_frames - 2
+    theta_vel, theta_accel, d_vel, d_accel = joint_rates(joint_types, num_frames)
+
+    # Outward propagation of the frame origins' motion, as in dynamics_newton_euler()
+    omega = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+    alpha = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+    accel = [sp.zeros(3,1) for _ in range(num_frames - 1)]
+    accel[0] = sp.Matrix(-gravity)
+    link_wrenches = [None] * (num_frames - 1)
+    for i in range(1, num_frames - 1):
+        omega[i] = omega_next_frame(rotations[i-1], omega[i-1], theta_vel[i])
+        alpha[i] = alpha_next_frame(rotations[i-1], alpha[i-1], omega[i-1], theta_vel[i], theta_accel[i])
+        accel[i] = accel_next_frame(rotations[i-1], accel[i-1], alpha[i-1], omega[i-1], translations[i-1], d_vel[i], d_accel[i])
+
+        # Force and moment about the origin acting on link i, as a 6x10 matrix times its inertial parameters
+        omega_cross = cross_matrix(omega[i])
+        wrench = sp.zeros(6, 10)
+        wrench[0:3, 0] = accel[i]
+        wrench[0:3, 1:4] = cross_matrix(alpha[i]) + omega_cross * omega_cross
+        wrench[3:6, 1:4] = -cross_matrix(accel[i])
+        wrench[3:6, 4:10] = _inertia_product(alpha[i]) + omega_cross * _inertia_product(omega[i])
+        link_wrenches[i] = wrench
+
+    # Inward propagation of the wrench on each link, with one column per inertial parameter
+    rows = [None] * num_links
+    wrench = sp.zeros(6, 10 * num_links)
+    for i in range(num_frames - 2, 0, -1):
+        force, moment = rotations[i] * wrench[0:3, :], rotations[i] * wrench[3:6, :]
+        wrench = sp.Matrix.vstack(force, moment + cross_matrix(translations[i]) * force)
+        wrench[:, 10 * (i-1):10 * i] += link_wrenches[i]
+        # Moment about (or force along) the joint axis
+        rows[i-1] = wrench[5, :] if joint_types[i] == 'R' else wrench[2, :]
+
+    policy = final_simplification(resolve_simplification(simplification))
+    rows = simplify_all(rows, policy=policy)
+    return {
+        'Y': sp.Matrix.vstack(*rows),
+        'pi': sp.Matrix(inertial_parameter_symbols(num_links))
+    }
+
+
+def regressor_numeric(dh_table, joint_types, gravity, q, qd, qdd):
+    """
+    Numerically evaluate the regressor Y of regressor() for a batch of joint states, so tau = Y @ pi
+
+    Args:
+        dh_table - List of DH parameters, as in dynamics_newton_euler_numeric(). Include all links and the end effector frame.
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+        gravity - 3-vector. Acceleration due to gravity.
+        q, qd, qdd - Arrays of shape (..., dof). Joint positions, velocities and accelerations.
+    Return:
+        Array of shape (..., dof, 10 * links)
+    """
+    transforms = link_transforms_numeric(dh_table, joint_types[1:], q)
+    rotations = transforms[..., :3, :3]
+    translations = transforms[..., :3, 3]
+
+    num_frames = len(dh_table) + 1
+    num_links = num_frames - 2
+    batch_shape = np.broadcast_shapes(np.shape(q)[:-1], np.shape(qd)[:-1], np.shape(qdd)[:-1])
+    vector_shape = (*batch_shape, 3)
+    gravity = np.asarray(gravity, dtype=float).reshape(3)
+    theta_vel, d_vel = prop.joint_rates(joint_types, qd, batch_shape)
+    theta_accel, d_accel = prop.joint_rates(joint_types, qdd, batch_shape)
+
+    # Outward propagation, as in dynamics_newton_euler_numeric()
+    omega = alpha = np.zeros(vector_shape)
+    accel = np.broadcast_to(-gravity, vector_shape)
+    link_wrenches = [None] * (num_frames - 1)
+    for i in range(1, num_frames - 1):
+        rot, trans = rotations[..., i-1, :, :], translations[..., i-1, :]
+        omega, alpha, accel = (
+            prop.omega_next_frame(rot, omega, theta_vel[i]),
+            prop.alpha_next_frame(rot, alpha, omega, theta_vel[i], theta_accel[i]),
+            prop.accel_next_frame(rot, accel, alpha, omega, trans, d_vel[i], d_accel[i])
+        )
+        omega_cross = cross_matrix_numeric(omega)
+        wrench = np.zeros((*batch_shape, 6, 10))
+        wrench[..., 0:3, 0] = accel
+        wrench[..., 0:3, 1:4] = cross_matrix_numeric(alpha) + omega_cross @ omega_cross
+        wrench[..., 3:6, 1:4] = -cross_matrix_numeric(accel)
+        wrench[..., 3:6, 4:10] = _inertia_product_numeric(alpha) + omega_cross @ _inertia_product_numeric(omega)
+        link_wrenches[i] = wrench
+
+    # Inward propagation
+    output = np.empty((*batch_shape, num_links, 10 * num_links))
+    wrench = np.zeros((*batch_shape, 6, 10 * num_links))
+    for i in range(num_frames - 2, 0, -1):
+        rot = rotations[..., i, :, :]
+        force, moment = rot @ wrench[..., 0:3, :], rot @ wrench[..., 3:6, :]
+        wrench = np.concatenate([force, moment + cross_matrix_numeric(translations[..., i, :]) @ force], axis=-2)
+        wrench[..., 10 * (i-1):10 * i] += link_wrenches[i]
+        output[..., i-1, :] = wrench[..., 5 if joint_types[i] == 'R' else 2, :]
+    return output
+
+
+def _pivoted_qr(matrix):
+    # Householder QR with column pivoting. Returns R and the column permutation.
+    matrix = np.array(matrix, dtype=float)
+    num_rows, num_columns = matrix.shape
+    permutation = np.arange(num_columns)
+    for k in range(min(num_rows, num_columns)):
+        # Move the remaining column with the largest norm to position k
+        pivot = k + np.argmax(np.einsum('ij,ij->j', matrix[k:, k:], matrix[k:, k:]))
+        matrix[:, [k, pivot]] = matrix[:, [pivot, k]]
+        permutation[[k, pivot]] = permutation[[pivot, k]]
+
+        # Reflect column k onto the k-th axis
+        column = matrix[k:, k]
+        norm = np.linalg.norm(column)
+        if norm == 0:
+            break
+        reflector = column.copy()
+        reflector[0] += np.copysign(norm, column[0])
+        reflector /= np.linalg.norm(reflector)
+        matrix[k:, k:] -= 2 * np.outer(reflector, reflector @ matrix[k:, k:])
+    return np.triu(matrix[:num_columns]), permutation
+
+
+def _coefficient(value):
+    # Readable sympy number for a combination coefficient
+    return sp.Integer(int(value)) if value == int(value) else sp.Float(value, 12)
+
+
+def base_parameters(dh_table, joint_types, gravity, num_samples=100, tolerance=1e-8, seed=0):
+    """
+    Find a minimal set of base parameters, the combinations of inertial parameters that the joint forces depend on
+
+    Many inertial parameters have no effect on the joint forces, or only appear in fixed combinations, so they can't
+    be identified individually. The regressor is evaluated at random joint states, and a QR decomposition with column
+    pivoting selects a maximal set of independent columns. Every other column is a fixed linear combination of these,
+    and is folded into their parameters.
+    Args:
+        dh_table, joint_types, gravity - As in regressor_numeric(). Link lengths etc. must be numerical.
+        num_samples - Number of random joint states to evaluate the regressor at
+        tolerance - Columns whose remaining norm is below tolerance times the largest are taken as dependent
+        seed - Seed for the random joint states
+    Return:
+        Dictionary with entries:
+            'independent' - Indices of the regressor columns kept, i.e. the base regressor is Y[..., independent]
+            'dependent' - Indices of the other columns
+            'combination' - Array of shape (base, dependent). Y[..., dependent] = Y[..., independent] @ combination
+            'expressions' - List of sympy expressions of the base parameters, in terms of inertial_parameter_symbols()
+    """
+    num_links = len(dh_table) - 1
+    dof = len(joint_types) - 1
+    rng = np.random.default_rng(seed)
+    q = rng.uniform(-np.pi, np.pi, size=(num_samples, dof))
+    qd, qdd = (rng.uniform(-1, 1, size=(num_samples, dof)) for _ in range(2))
+    stacked = regressor_numeric(dh_table, joint_types, gravity, q, qd, qdd).reshape(-1, 10 * num_links)
+
+    upper, permutation = _pivoted_qr(stacked)
+    diagonal = np.abs(np.diag(upper))
+    rank = int(np.sum(diagonal > tolerance * diagonal[0])) if diagonal[0] > 0 else 0
+    combination = np.linalg.solve(upper[:rank, :rank], upper[:rank, rank:])
+    combination[np.abs(combination) < tolerance] = 0
+
+    # Keep the independent columns in their original order
+    order = np.argsort(permutation[:rank])
+    independent = permutation[:rank][order]
+    combination = combination[order]
+    dependent = permutation[rank:]
+
+    symbols = inertial_parameter_symbols(num_links)
+    expressions = []
+    for row, index in zip(combination, independent):
+        expressions.append(symbols[index] + sum(_coefficient(value) * symbols[j] for value, j in zip(row, dependent) if value != 0))
+    return {
+        'independent': independent,
+        'dependent': dependent,
+        'combination': combination,
+        'expressions': expressions
+    }
+
+
+def base_parameters_numeric(parameters, base):
+    """
+    Evaluate the base parameters from a full set of inertial parameters
+
+    Args:
+        parameters - Array of shape (..., 10 * links), e.g. from inertial_parameters_numeric()
+        base - Dictionary from base_parameters()
+    Return:
+        Array of shape (..., base)
+    """
+    parameters = np.asarray(parameters, dtype=float)
+    return parameters[..., base['independent']] + parameters[..., base['dependent']] @ base['combination'].T
+
+
+def identify_parameters(dh_table, joint_types, gravity, q, qd, qdd, tau, base=None, chunk_size=10000):
+    """
+    Least-squares fit of the base parameters to logged joint forces
+
+    Solves tau = Y_base(q, qd, qdd) @ pi_base for all samples at once. The regressor is built chunk by chunk and
+    reduced with a QR decomposition after each, so memory stays bounded for millions of samples.
+    Args:
+        dh_table, joint_types, gravity - As in regressor_numeric()
+        q, qd, qdd - Arrays of shape (..., dof). Logged joint positions, velocities and accelerations.
+        tau - Array of shape (..., dof). Logged joint forces.
+        base - Dictionary from base_parameters(). Computed if not given.
+        chunk_size - Number of samples to evaluate the regressor for at once
+    Return:
+        2-tuple (parameters, rms_error). parameters is an array of base parameters, ordered as base['independent'].
+        rms_error is the root mean square residual joint force.
+    """
+    if base is None:
+        base = base_parameters(dh_table, joint_types, gravity)
+    independent = base['independent']
+    dof = len(joint_types) - 1
+    q, qd, qdd, tau = (np.asarray(value, dtype=float).reshape(-1, dof) for value in (q, qd, qdd, tau))
+
+    # Running reduction: the least squares problem so far is equivalent to upper @ x = projected
+    upper = np.zeros((0, len(independent)))
+    projected = np.zeros(0)
+    sum_squares = 0.0
+    for start in range(0, len(q), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        rows = regressor_numeric(dh_table, joint_types, gravity, q[chunk], qd[chunk], qdd[chunk])[..., independent]
+        forces = tau[chunk].reshape(-1)
+        orthogonal, upper = np.linalg.qr(np.concatenate([upper, rows.reshape(-1, len(independent))]))
+        projected = orthogonal.T @ np.concatenate([projected, forces])
+        sum_squares += forces @ forces
+
+    parameters = np.linalg.solve(upper, projected)
+    residual = max(sum_squares - projected @ projected, 0.0)
+    return parameters, np.sqrt(residual / tau.size)
@@ -0,0 +1,290 @@
+import numpy as np
+import sympy as sp
+from roboticstoolkit.transforms import dh_transform, rot_x, rotation, translation, inverse_transform
+from roboticstoolkit.evaluate import compile_equations_dict
+
+
+# Closed-form inverse kinematics for common geometries.
+# Every solution branch is returned as a row of a single symbolic matrix, which can be compiled with
+# compile_equations_dict() to solve all branches for a whole batch of targets at once.
+
+def inverse_kinematics_target():
+    """
+    Symbolic end effector target for the closed-form inverse kinematics
+
+    Return:
+        4x4 sympy Matrix with symbols r_{ij} for the rotation and p_x, p_y, p_z for the position
+    """
+    target = sp.eye(4)
+    for i in range(3):
+        for j in range(3):
+            target[i, j] = sp.Symbol(f'r_{{{i+1}{j+1}}}')
+    target[:3, 3] = sp.Matrix(sp.symbols('p_x p_y p_z'))
+    return target
+
+
+def _is_zero(expr):
+    # Allow for rounding errors in DH tables with float entries
+    expr = sp.simplify(expr)
+    return expr == 0 or (expr.is_number and abs(complex(expr)) < 1e-9)
+
+
+def _joint_angles(dh_table, joint_types):
+    """
+    Split the joint entries of a DH table with only revolute joints into angle symbols and constant offsets
+
+    Return:
+        3-tuple (dh_table, angles, offsets). The returned dh_table has angles[i] in place of each joint entry,
+        and offsets[i] is the constant part of the original entry
+    """
+    num_joints = len(dh_table) - 1
+    if len(joint_types) < num_joints or any(joint_types[i] != 'R' for i in range(num_joints)):
+        raise ValueError('Closed-form inverse kinematics needs a revolute joint in every row except the end effector')
+
+    angles = sp.symbols(f'theta_1:{num_joints + 1}')
+    offsets = []
+    table = []
+    for i, row in enumerate(dh_table):
+        row = [sp.sympify(value) for value in row]
+        if i < num_joints:
+            # Same convention as link_transforms_numeric(): the joint value is added to the constant part
+            offsets.append(row[3].subs(dict.fromkeys(row[3].free_symbols, 0)))
+            row[3] = angles[i]
+        table.append(row)
+    return table, angles, offsets
+
+
+def _planar_branches(x, y, length1, length2):
+    # Both (elbow down, elbow up) solutions of a planar 2R arm reaching (x, y)
+    cos_2 = (x**2 + y**2 - length1**2 - length2**2) / (2 * length1 * length2)
+    branches = []
+    for sign in (1, -1):
+        angle_2 = sp.atan2(sign * sp.sqrt(1 - cos_2**2), cos_2)
+        angle_1 = sp.atan2(y, x) - sp.atan2(length2 * sp.sin(angle_2), length1 + length2 * sp.cos(angle_2))
+        branches.append([angle_1, angle_2])
+    return branches
+
+
+def inverse_kinematics_planar(dh_table, joint_types, target):
+    """
+    Closed-form inverse kinematics of a planar 2R or 3R arm. All twist angles must be 0.
+
+    For a 2R arm only the end effector position is matched. For a 3R arm the orientation in the plane is matched too,
+    by first solving for the origin of the last joint frame.
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). The last row is the end effector frame.
+        joint_types - List with 'R' for each joint
+        target - Symbolic 4x4 end effector transform, such as inverse_kinematics_target()
+    Return:
+        Equations dict with entry 'q', a Matrix with one row of joint values per branch: elbow down, then elbow up.
+        Unreachable targets give nan.
+    """
+    table, angles, offsets = _joint_angles(dh_table, joint_types)
+    num_joints = len(angles)
+    if num_joints not in (2, 3):
+        raise ValueError(f'Planar closed-form inverse kinematics needs 2 or 3 joints, got {num_joints}')
+    if not all(_is_zero(row[1]) for row in table):
+        raise ValueError('All twist angles of a planar arm must be 0')
+
+    # Position relative to the first joint axis, and the angle of the end effector in the plane
+    x = target[0, 3] - table[0][0]
+    y = target[1, 3]
+    end_length, end_angle = table[-1][0], table[-1][3]
+
+    branches = []
+    if num_joints == 2:
+        for angle_1, angle_2 in _planar_branches(x, y, table[1][0], end_length):
+            branches.append([angle_1, angle_2])
+    else:
+        # Frame 3 has the end effector orientation, less the fixed end effector rotation
+        frame_angle = sp.atan2(target[1, 0], target[0, 0]) - end_angle
+        wrist_x = x - end_length * sp.cos(frame_angle)
+        wrist_y = y - end_length * sp.sin(frame_angle)
+        for angle_1, angle_2 in _planar_branches(wrist_x, wrist_y, table[1][0], table[2][0]):
+            branches.append([angle_1, angle_2, frame_angle - angle_1 - angle_2])
+
+    q = sp.Matrix([[angle - offset for angle, offset in zip(branch, offsets)] for branch in branches])
+    return {'q': q}
+
+
+def _harmonic_coefficients(expr, angle):
+    """
+    Write expr as A + B cos(angle) + C sin(angle)
+
+    Return:
+        3-tuple (A, B, C)
+    Raise:
+        ValueError if expr doesn't have that form
+    """
+    at_0, at_half_pi, at_pi = (expr.subs(angle, value) for value in (0, sp.pi/2, sp.pi))
+    constant = (at_0 + at_pi) / 2
+    cos_coefficient = (at_0 - at_pi) / 2
+    sin_coefficient = at_half_pi - constant
+    residual = expr - constant - cos_coefficient * sp.cos(angle) - sin_coefficient * sp.sin(angle)
+    if not all(_is_zero(residual.subs(angle, value)) for value in (1, 2, 3)):
+        raise ValueError(f'Expected an expression of the form A + B cos({angle}) + C sin({angle})')
+    return sp.simplify(constant), sp.simplify(cos_coefficient), sp.simplify(sin_coefficient)
+
+
+def _zyz_branches(matrix, tolerance=0):
+    """
+    Both solutions of matrix = rot_z(phi) * rot_y(beta) * rot_z(psi), with beta >= 0 first
+
+    At beta = 0 or pi only phi + psi or phi - psi is defined, so phi is set to 0. This is detected when sin(beta), read
+    from the third column, is at most tolerance.
+    """
+    sin_beta = sp.sqrt(matrix[2, 0]**2 + matrix[2, 1]**2)
+    degenerate = matrix[0, 2]**2 + matrix[1, 2]**2 <= sp.sympify(tolerance)**2
+    branches = []
+    for sign in (1, -1):
+        beta = sp.atan2(sign * sin_beta, matrix[2, 2])
+        phi = sp.Piecewise((0, degenerate), (sp.atan2(sign * matrix[1, 2], sign * matrix[0, 2]), True))
+        psi = sp.Piecewise((sp.atan2(matrix[1, 0], matrix[1, 1]), degenerate),
+                           (sp.atan2(sign * matrix[2, 1], -sign * matrix[2, 0]), True))
+        branches.append((phi, beta, psi))
+    return branches
+
+
+def inverse_kinematics_spherical_wrist(dh_table, joint_types, target, tolerance=0):
+    """
+    Closed-form inverse kinematics of a 6R arm with a spherical wrist, such as the PUMA 560
+
+    The position of the wrist centre is solved with the first three joints, following Craig's solution of the PUMA 560,
+    then the wrist orientation is decomposed into ZYZ Euler angles. The geometry must satisfy:
+        - alpha_0 = 0 and alpha_1 = +-pi/2
+        - The wrist centre is the origin of frame 4: a_4 = a_5 = 0 and d_5 = d_6 = 0
+        - alpha_4 = +-pi/2 and alpha_5 = -alpha_4, so the last three axes intersect
+        - Joint 3 moves the wrist centre in the plane of joints 2 and 3, e.g. alpha_2 = 0
+    Any fixed tool transform can follow in the end effector row.
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). The last row is the end effector frame.
+        joint_types - List with 'R' for each joint
+        target - Symbolic 4x4 end effector transform, such as inverse_kinematics_target()
+        tolerance - Wrist singularity threshold. When |sin(theta_5)| is at most this, only theta_4 + theta_6 is
+            defined, so theta_4 is set to its offset. The default of 0 is exact, for symbolic or exact targets.
+            Pass a small float (see compile_inverse_kinematics()) for the solutions to be evaluated in floating point.
+    Return:
+        Equations dict with entry 'q', a Matrix with one row of joint values per branch. The 8 branches combine
+        shoulder (joint 1), elbow (joint 3) and wrist (joint 5) solutions, with the wrist varying fastest, then the elbow.
+        Unreachable targets give nan.
+    """
+    table, angles, offsets = _joint_angles(dh_table, joint_types)
+    if len(angles) != 6:
+        raise ValueError(f'Spherical wrist closed-form inverse kinematics needs 6 joints, got {len(angles)}')
+
+    twists = [row[1] for row in table]
+    if not _is_zero(twists[0]) or not _is_zero(sp.cos(twists[1])):
+        raise ValueError('Spherical wrist closed-form inverse kinematics needs alpha_0 = 0 and alpha_1 = +-pi/2')
+    if not all(_is_zero(value) for value in (table[4][0], table[5][0], table[4][2], table[5][2])):
+        raise ValueError('Spherical wrist closed-form inverse kinematics needs a_4 = a_5 = 0 and d_5 = d_6 = 0')
+    if not _is_zero(sp.cos(twists[4])) or not _is_zero(twists[4] + twists[5]):
+        raise ValueError('Spherical wrist closed-form inverse kinematics needs alpha_4 = +-pi/2 and alpha_5 = -alpha_4')
+
+    # The wrist centre is at the origin of frames 4, 5 and 6
+    wrist_transform = target * inverse_transform(dh_transform(*table[6]))
+    wrist_centre = translation(wrist_transform)
+
+    # Wrist centre relative to the frame 2 origin before joint 2 rotates, and its position h in frame 2
+    frame_1_origin = sp.Matrix([table[0][0], 0, table[0][2]])
+    offset_2 = sp.Matrix([table[1][0], 0, 0])
+    h = (dh_transform(*table[2]) * dh_transform(*table[3]))[:3, 3] + sp.Matrix([0, 0, table[1][2]])
+    if h[2].has(angles[2]):
+        raise ValueError('Joint 3 must move the wrist centre in the plane of joints 2 and 3')
+    h_norm_squared = sp.expand(h[0]**2 + h[1]**2 + h[2]**2)
+
+    # In frame 1 (after joint 1), the wrist centre is offset_2 + rot_x(alpha_1) * rot_z(theta_2) * h. The component
+    # along y_1 is therefore constant, which gives joint 1.
+    sin_alpha_1 = sp.sin(twists[1])
+    offset_y = -sin_alpha_1 * h[2]
+    x, y, z = wrist_centre - frame_1_origin
+    rho_squared = x**2 + y**2
+
+    branches = []
+    for sign_1 in (1, -1):
+        angle_1 = sp.atan2(y, x) - sp.atan2(offset_y, sign_1 * sp.sqrt(rho_squared - offset_y**2))
+
+        # Wrist centre in frame 1, and its distance from the joint 2 axis gives joint 3
+        in_frame_1 = sp.Matrix([
+            sp.cos(angle_1) * x + sp.sin(angle_1) * y,
+            -sp.sin(angle_1) * x + sp.cos(angle_1) * y,
+            z
+        ])
+        u = rotation(rot_x(twists[1])).T * (in_frame_1 - offset_2)
+        constant, cos_coefficient, sin_coefficient = _harmonic_coefficients(h_norm_squared, angles[2])
+        rhs = u[0]**2 + u[1]**2 + h[2]**2 - constant
+
+        for sign_3 in (1, -1):
+            amplitude = sp.sqrt(cos_coefficient**2 + sin_coefficient**2 - rhs**2)
+            angle_3 = sp.atan2(sin_coefficient, cos_coefficient) + sp.atan2(sign_3 * amplitude, rhs)
+
+            # Joint 2 rotates h onto u in the plane of the arm
+            h_solved = h.subs(angles[2], angle_3)
+            angle_2 = sp.atan2(u[1], u[0]) - sp.atan2(h_solved[1], h_solved[0])
+
+            # Remaining rotation for the wrist: rot_z(theta_4) * rot_y(-+theta_5) * rot_z(theta_6)
+            arm_transform = dh_transform(*table[0]) * dh_transform(*table[1]) * dh_transform(*table[2]) * dh_transform(*table[3])
+            arm_rotation = rotation(arm_transform).subs({angles[0]: angle_1, angles[1]: angle_2, angles[2]: angle_3, angles[3]: 0})
+            wrist_rotation = arm_rotation.T * rotation(wrist_transform)
+            wrist_sign = -sp.sign(sp.sin(twists[4]))
+            for angle_4, beta, angle_6 in _zyz_branches(wrist_rotation, tolerance):
+                branches.append([angle_1, angle_2, angle_3, angle_4, wrist_sign * beta, angle_6])
+
+    q = sp.Matrix([[angle - offset for angle, offset in zip(branch, offsets)] for branch in branches])
+    return {'q': q}
+
+
+def inverse_kinematics_closed_form(dh_table, joint_types, target=None, tolerance=0):
+    """
+    Closed-form inverse kinematics of a DH table, choosing the solver from the geometry
+
+    Planar 2R and 3R arms use inverse_kinematics_planar(), 6R arms with a spherical wrist use
+    inverse_kinematics_spherical_wrist().
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). The last row is the end effector frame.
+        joint_types - List with 'R' for each joint
+        target - Symbolic 4x4 end effector transform. Defaults to inverse_kinematics_target()
+        tolerance - Wrist singularity threshold of inverse_kinematics_spherical_wrist(). Unused by planar arms
+    Return:
+        Equations dict with entry 'q', a Matrix with one row of joint values per branch
+    Raise:
+        ValueError if there is no closed-form solver for the geometry
+    """
+    if target is None:
+        target = inverse_kinematics_target()
+    num_joints = len(dh_table) - 1
+    if num_joints in (2, 3) and all(_is_zero(row[1]) for row in dh_table):
+        return inverse_kinematics_planar(dh_table, joint_types, target)
+    if num_joints == 6:
+        return inverse_kinematics_spherical_wrist(dh_table, joint_types, target, tolerance)
+    raise ValueError('No closed-form inverse kinematics for this geometry. Use inverse_kinematics_numeric() instead')
+
+
+def compile_inverse_kinematics(dh_table, joint_types, tolerance=1e-12):
+    """
+    Compile the closed-form inverse kinematics of a DH table into a vectorised numerical function
+
+    All DH parameters must be numeric, except the joint entries. Joint values follow the same convention as
+    link_transforms_numeric(), so solutions can be checked with end_transform_numeric().
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). The last row is the end effector frame.
+        joint_types - List with 'R' for each joint
+        tolerance - Wrist singularity threshold on |sin(theta_5)| for 6R arms (see inverse_kinematics_spherical_wrist()).
+            Targets closer to the singularity than this are solved with theta_4 at its offset. Scale it with the
+            rounding error expected in the target rotations.
+    Return:
+        Function taking end effector transforms of shape (..., 4, 4) and returning joint values of shape
+        (..., branches, dof)
+    """
+    target = inverse_kinematics_target()
+    equations = inverse_kinematics_closed_form(dh_table, joint_types, target, tolerance)
+    compiled = compile_equations_dict(equations, [list(target[:3, :])])
+
+    def solve(transforms):
+        transforms = np.asarray(transforms, dtype=float)
+        return compiled(transforms[..., :3, :].reshape(*transforms.shape[:-2], 12))['q']
+
+    return solve
@@ -1,10 +1,12 @@
-from multiprocessing.sharedctypes import Value
 import sympy as sp
 from roboticstoolkit.core import *
 from roboticstoolkit.transforms import axis_z, translation
+from roboticstoolkit.simplification import simplify_all, resolve_simplification, final_simplification
+from roboticstoolkit.profiling import profiled, profile_stage
 
 
-def jacobian(base_transforms, joint_types, position_only=False):
+@profiled
+def jacobian(base_transforms, joint_types, position_only=False, simplification=None):
     """
     Compute the jacobian of a manipulator using the Plucker coordinates.
 
@@ -15,9 +17,11 @@ def jacobian(base_transforms, joint_types, position_only=False):
             Can use the output from base_transforms() directly
         joint_types - List with 'R' or 'P' for each joint depending on the joint type.
         position_only - If True, only include first 3 rows in Jacobian as opposed to usual 6.
+        simplification - Simplification policy for the columns, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
     Return:
         Jacobian matrix as a sympy Matrix
     """
+    policy = final_simplification(resolve_simplification(simplification))
     num_joints = len(base_transforms) - 1
     
     # Prepare output data structure
@@ -26,20 +30,22 @@ def jacobian(base_transforms, joint_types, position_only=False):
     # Construct jacobian using Plucker coordinates
     end_effector_position = translation(base_transforms[-1])
     for i in range(num_joints):
-        joint_axis = axis_z(base_transforms[i])
-        if joint_types[i] == 'R':
-            moment_arm = end_effector_position - translation(base_transforms[i])
-            jacobian[0:3, i] = sp.simplify(joint_axis.cross(moment_arm))
-            if not position_only:
-                jacobian[3:6, i] = joint_axis
-        elif joint_types[i] == 'P':
-            jacobian[0:3, i] = joint_axis
-            # If not position only, rotational portion of Jacobian column already has all 0s
+        with profile_stage('jacobian', 'column', link=i) as record:
+            joint_axis = axis_z(base_transforms[i])
+            if joint_types[i] == 'R':
+                moment_arm = end_effector_position - translation(base_transforms[i])
+                jacobian[0:3, i], = simplify_all([joint_axis.cross(moment_arm)], policy=policy)
+                if not position_only:
+                    jacobian[3:6, i] = joint_axis
+            elif joint_types[i] == 'P':
+                jacobian[0:3, i] = joint_axis
+                # If not position only, rotational portion of Jacobian column already has all 0s
+            record.outputs = jacobian[:, i]
     
     return jacobian
 
 
-def jacobian_planar(plane_axis, base_transforms, joint_types, position_only=False):
+def jacobian_planar(plane_axis, base_transforms, joint_types, position_only=False, simplification=None):
     """
     Computes jacobian as in jacobian() but then discards rows corresponding to out-of-plane movements
 
@@ -48,10 +54,11 @@ def jacobian_planar(plane_axis, base_transforms, joint_types, position_only=Fals
 
     Args:
         plane_axis - Either x_vec, y_vec or z_vec. Normal to the plane
+        simplification - Simplification policy, as in jacobian()
     """
     assert plane_axis == x_vec or plane_axis == y_vec or plane_axis == z_vec
     
-    jacobian_matrix = jacobian(base_transforms, joint_types, position_only=False)
+    jacobian_matrix = jacobian(base_transforms, joint_types, position_only=False, simplification=simplification)
     if plane_axis == x_vec:
         keep_rows = [1, 2, 3]
     elif plane_axis == y_vec:
@@ -65,3 +72,50 @@ def jacobian_planar(plane_axis, base_transforms, joint_types, position_only=Fals
         keep_rows = keep_rows[0:2]
 
     return jacobian_matrix[keep_rows, :]
+
+
+@profiled
+def jacobian_derivative(base_transforms, joint_types, variables, position_only=False, simplification=None):
+    """
+    Compute the time derivative of the jacobian, dJ/dt, by differentiating jacobian() with diff_total()
+
+    The expressions grow quickly with the number of joints. For larger arms, or to evaluate many states, use
+    jacobian_derivative_numeric() instead.
+    Args:
+        base_transforms - List of transforms describing frames 1, 2, 3, ..., n where n is the end-effcetor frame.
+        joint_types - List with 'R' or 'P' for each joint depending on the joint type.
+        variables - List of symbols, representing the time-dependent joint variables
+        position_only - If True, only include first 3 rows
+        simplification - Simplification policy, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
+    Return:
+        sympy Matrix in terms of the joint variables and the joint velocities of joint_symbols()
+    """
+    policy = final_simplification(resolve_simplification(simplification))
+    velocities, _ = joint_symbols([0, *joint_types])
+    jacobian_matrix = jacobian(base_transforms, joint_types, position_only=position_only, simplification=simplification)
+
+    with profile_stage('jacobian_derivative', 'diff_total') as record:
+        t = sp.symbols('t')
+        jacobian_rate = diff_total(jacobian_matrix, t, dict(zip(variables, velocities)))
+        record.outputs = jacobian_rate
+    with profile_stage('jacobian_derivative', 'simplify') as record:
+        jacobian_rate, = simplify_all([jacobian_rate], policy=policy)
+        record.outputs = jacobian_rate
+    return jacobian_rate
+
+
+def end_effector_acceleration(base_transforms, joint_types, variables, position_only=False, simplification=None):
+    """
+    Compute the acceleration of the end effector, J * qdd + dJ/dt * qd
+
+    Arguments as in jacobian_derivative()
+    Return:
+        6-vector (or 3-vector if position_only is set) of the linear then angular acceleration, in the base frame,
+        in terms of the joint variables and the joint velocities and accelerations of joint_symbols()
+    """
+    policy = final_simplification(resolve_simplification(simplification))
+    velocities, accelerations = joint_symbols([0, *joint_types])
+    jacobian_matrix = jacobian(base_transforms, joint_types, position_only=position_only, simplification=simplification)
+    jacobian_rate = jacobian_derivative(base_transforms, joint_types, variables, position_only, simplification)
+    acceleration, = simplify_all([jacobian_matrix * sp.Matrix(accelerations) + jacobian_rate * sp.Matrix(velocities)], policy=policy)
+    return acceleration
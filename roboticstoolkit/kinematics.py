@@ -1,6 +1,9 @@
+from collections import OrderedDict
 import sympy as sp
 from roboticstoolkit.transforms import rot_z, rot_y, rot_x, rotation, cross_matrix
 from roboticstoolkit.transforms import dh_transform
+from roboticstoolkit.simplification import simplify_all, simplify_expression, resolve_simplification, final_simplification
+from roboticstoolkit.profiling import profiled, profile_stage
 
 
 # Rotations
@@ -33,20 +36,23 @@ def euler_ZYX_inverse(rotation):
         )
 
 
-def angle_axis(angle, axis):
+def angle_axis(angle, axis, simplification=None):
+    policy = final_simplification(resolve_simplification(simplification))
     axis = axis.normalized()
-    return sp.simplify(axis*axis.T * (1-sp.cos(angle)) + sp.eye(3)*sp.cos(angle) + cross_matrix(axis)*sp.sin(angle))
+    return simplify_all([axis*axis.T * (1-sp.cos(angle)) + sp.eye(3)*sp.cos(angle) + cross_matrix(axis)*sp.sin(angle)], policy=policy)[0]
 
 
-def angle_axis_inverse(rotation):
+def angle_axis_inverse(rotation, simplification=None):
     """
     Args:
         rotation - 3x3 rotation matrix
+        simplification - Simplification policy, one of SIMPLIFICATION_POLICIES. Defaults to the global policy.
     Return:
         2-tuple (angle, axis), with 3-vector axis
     """
+    policy = final_simplification(resolve_simplification(simplification))
     diag = sp.Matrix([rotation[i, i] for i in range(3)])
-    angle = sp.simplify(sp.acos((sum(diag) - 1)/2))
+    angle = simplify_expression(sp.acos((sum(diag) - 1)/2), policy)
     if angle == 0:
         axis = sp.Matrix([1, 0, 0])
     elif angle == sp.pi:
@@ -58,11 +64,63 @@ def angle_axis_inverse(rotation):
             rotation[1, 0] - rotation[0, 1]
         ]) / (2 * sp.sin(angle))
 
-    return angle, sp.simplify(axis)
+    return angle, simplify_all([axis], policy=policy)[0]
 
 
 # Forward kinematics
 
+# Cache of partial products of transform chains, shared by every call of base_transforms().
+# Keyed on the tuple of link transforms making up each prefix of a chain, so chains that start with the same links
+# (e.g. the same arm with a different end effector, or repeated calls on the same chain) reuse each other's products.
+# Off by default: sympy's own cache already makes repeated multiplications cheap, so this mainly pays off for many
+# chains sharing long prefixes. Enable it with set_transform_cache_size().
+_transform_cache = {
+    'entries': OrderedDict(),
+    'max_size': 0,
+    'hits': 0,
+    'misses': 0
+}
+
+
+def transform_cache_info():
+    """
+    Return:
+        Dictionary with the number of partial products found in ('hits') and missing from ('misses') the transform
+        cache, and its current and maximum number of entries ('size', 'max_size')
+    """
+    return {
+        'hits': _transform_cache['hits'],
+        'misses': _transform_cache['misses'],
+        'size': len(_transform_cache['entries']),
+        'max_size': _transform_cache['max_size']
+    }
+
+
+def clear_transform_cache():
+    """
+    Empty the transform cache and reset its statistics
+    """
+    _transform_cache['entries'].clear()
+    _transform_cache['hits'] = 0
+    _transform_cache['misses'] = 0
+
+
+def set_transform_cache_size(max_size):
+    """
+    Set the maximum number of partial products kept by base_transforms(). The least recently used are dropped first.
+
+    The cache is off (max_size 0) by default. It is shared by the whole process and has no lock, so it is not
+    thread-safe: only enable it when base_transforms() is not called from several threads at once.
+
+    Args:
+        max_size - Number of entries, e.g. 64, or 0 to disable the cache
+    """
+    _transform_cache['max_size'] = max_size
+    entries = _transform_cache['entries']
+    while len(entries) > max_size:
+        entries.popitem(last=False)
+
+
 def link_transforms(dh_table):
     """
     Compute incremental frame transform from a DH table
@@ -76,10 +134,15 @@ def link_transforms(dh_table):
     return [dh_transform(*dh_table[i]) for i in range(len(dh_table))]
 
 
+@profiled
 def base_transforms(link_transforms):
     """
     Comput transformations to base frame from each link
 
+    If the transform cache is enabled (see set_transform_cache_size()), partial products are kept, so a chain that
+    starts with the same links as an earlier one is only multiplied out from where the two differ. The cache is not
+    thread-safe.
+
     Args:
         link_transforms - list of incremental frame transforms, each stored as a sympy array
     Return:
@@ -88,11 +151,34 @@ def base_transforms(link_transforms):
 
     num_frames = len(link_transforms)
     base_transforms = [None] * num_frames
+    entries = _transform_cache['entries']
+    use_cache = _transform_cache['max_size'] > 0
 
     current_base_transform = sp.eye(4)
+    prefix = ()
     for i in range(num_frames):
-        current_base_transform = current_base_transform * link_transforms[i]
-        base_transforms[i] = current_base_transform
+        if use_cache:
+            # Immutable matrices hash by structure, so equal links built separately still match
+            prefix = (*prefix, sp.ImmutableMatrix(link_transforms[i]))
+            cached = entries.get(prefix)
+            if cached is not None:
+                _transform_cache['hits'] += 1
+                entries.move_to_end(prefix)
+                current_base_transform = cached
+                base_transforms[i] = sp.Matrix(cached)
+                continue
+            _transform_cache['misses'] += 1
+
+        with profile_stage('base_transforms', 'multiply', link=i) as record:
+            current_base_transform = current_base_transform * link_transforms[i]
+            record.outputs = current_base_transform
+        if use_cache:
+            current_base_transform = sp.ImmutableMatrix(current_base_transform)
+            entries[prefix] = current_base_transform
+            if len(entries) > _transform_cache['max_size']:
+                entries.popitem(last=False)
+        # Hand out mutable copies, so callers can't change the cached products
+        base_transforms[i] = sp.Matrix(current_base_transform)
     return base_transforms
 
 
@@ -0,0 +1,14 @@
+# Numerical part of the toolkit only. Importing this module never imports sympy, which keeps short-lived worker
+# processes and command line tools quick to start:
+#
+#     import roboticstoolkit.numeric as rtn
+#     transforms = rtn.link_transforms_numeric(dh_table, joint_types, q)
+#
+# Link parameters may still be given as sympy objects, in which case sympy is imported by the caller.
+from roboticstoolkit.numeric_kinematics import *
+from roboticstoolkit.numeric_transforms import *
+from roboticstoolkit.numeric_rotations import *
+from roboticstoolkit.numeric_dynamics import *
+from roboticstoolkit.numeric_jacobian import *
+from roboticstoolkit.numeric_inverse_kinematics import *
+from roboticstoolkit.simulation import *
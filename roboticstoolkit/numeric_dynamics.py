@@ -0,0 +1,137 @@
+import numpy as np
+from roboticstoolkit import numeric_propagations as prop
+from roboticstoolkit.numeric_kinematics import link_transforms_numeric
+
+
+def dynamics_newton_euler_numeric(dh_table, pos_coms, masses, inertias, joint_types, gravity, q, qd, qdd,
+                                  f_end_effector=None, n_end_effector=None):
+    """
+    Numerically compute the inverse dynamics of a serial manipulator for a batch of joint states.
+
+    Uses the same outward and inward propagation as dynamics_newton_euler(), but on float arrays, so no symbolic
+    derivation is needed.
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). Include all links and the end effector frame.
+            All entries must be numeric, except the joint variables which may be left symbolic (see link_transforms_numeric()).
+        pos_coms - List of 3-vectors. 0 for the ground frame, then positions of the centre of mass of each link. Measured relative
+            to the asociated link's frame origin, represented in the link's associated frame.
+        masses - List of scalars. 0 for the ground frame then masses of the links.
+        inertias - List of 3x3 tensors. 0 for the ground frame, then inertia of each link, calculated at the centre of mass of
+            each link, and represented in the associated link's frame.
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint depending on the joint type.
+        gravity - 3-vector. Acceleration due to gravity.
+        q, qd, qdd - Arrays of shape (..., dof). Joint positions, velocities and accelerations.
+        f_end_effector - 3-vector. Force applied by end effector to the environment, in frame of end effector. Defaults to 0.
+        n_end_effector - 3-vector. Moment applied by end effector to the environment, in frame of end effector. Defaults to 0.
+    Return:
+        Dictionary of arrays with the same keys and frame indexing as dynamics_newton_euler(). 'tau' has shape (..., frames),
+        so the joint forces are equations['tau'][..., 1:]. Vector entries have shape (..., frames, 3).
+    """
+    # Unpack transformation matrices
+    transforms = link_transforms_numeric(dh_table, joint_types[1:], q)
+    rotations = transforms[..., :3, :3]
+    translations = transforms[..., :3, 3]
+
+    # Get number of frames. Includes base frame, all links, and end effector frame
+    num_frames = len(dh_table) + 1
+    batch_shape = np.broadcast_shapes(np.shape(q)[:-1], np.shape(qd)[:-1], np.shape(qdd)[:-1])
+    vector_shape = (*batch_shape, 3)
+
+    # Convert the link parameters to arrays
+    pos_coms = prop.stack_vectors(pos_coms, 3)
+    masses = np.asarray(masses, dtype=float)
+    inertias = prop.stack_vectors(inertias, (3, 3))
+    gravity = np.asarray(gravity, dtype=float).reshape(3)
+    f_end_effector = np.zeros(3) if f_end_effector is None else np.asarray(f_end_effector, dtype=float).reshape(3)
+    n_end_effector = np.zeros(3) if n_end_effector is None else np.asarray(n_end_effector, dtype=float).reshape(3)
+
+    # Split joint-space values into revolute and prismatic components for all frames
+    theta_vel, d_vel = prop.joint_rates(joint_types, qd, batch_shape)
+    theta_accel, d_accel = prop.joint_rates(joint_types, qdd, batch_shape)
+
+    # Define task-space vectors for all frames
+    zero = np.zeros(vector_shape)
+    omega = [zero] * (num_frames - 1)
+    alpha = [zero] * (num_frames - 1)
+    accel = [zero] * (num_frames - 1)
+    accel_com = [zero] * (num_frames - 1)
+    force_com = [zero] * (num_frames - 1)
+    moment_com = [zero] * (num_frames - 1)
+    force_link = [zero] * num_frames
+    moment_link = [zero] * num_frames
+
+    # Define the output list of joint generalised forces
+    joint_force = [np.zeros(batch_shape)] * (num_frames - 1)
+
+    # Set boundary conditions
+    accel[0] = np.broadcast_to(-gravity, vector_shape)
+    force_link[-1] = np.broadcast_to(f_end_effector, vector_shape)
+    moment_link[-1] = np.broadcast_to(n_end_effector, vector_shape)
+
+    # Outward propagation
+    for i in range(1, num_frames - 1):
+        rot, trans = rotations[..., i-1, :, :], translations[..., i-1, :]
+        omega[i] = prop.omega_next_frame(rot, omega[i-1], theta_vel[i])
+        alpha[i] = prop.alpha_next_frame(rot, alpha[i-1], omega[i-1], theta_vel[i], theta_accel[i])
+        accel[i] = prop.accel_next_frame(rot, accel[i-1], alpha[i-1], omega[i-1], trans, d_vel[i], d_accel[i])
+        accel_com[i] = prop.accel_curr_frame(accel[i], alpha[i], omega[i], pos_coms[i])
+        force_com[i] = prop.force_com_curr_frame(masses[i], accel_com[i])
+        moment_com[i] = prop.moment_com_curr_frame(inertias[i], alpha[i], omega[i])
+
+    # Inward propagation
+    for i in range(num_frames - 2, 0, -1):
+        rot, trans = rotations[..., i, :, :], translations[..., i, :]
+        force_link[i] = prop.force_curr_frame(rot, force_link[i+1], force_com[i])
+        moment_link[i] = prop.moment_curr_frame(rot, moment_link[i+1], moment_com[i], trans, force_link[i+1], pos_coms[i], force_com[i])
+
+        # Get the generalised joint-space force along the joint axis
+        force = moment_link[i] if joint_types[i] == 'R' else force_link[i]
+        joint_force[i] = force[..., 2]
+
+    # Construct dictionary of results, stacking frames along the axis after the batch dimensions
+    stack = lambda values: np.stack(np.broadcast_arrays(*values), axis=len(batch_shape))
+    return {
+        'tau': stack(joint_force),
+        'omega': stack(omega),
+        'alpha': stack(alpha),
+        'a': stack(accel),
+        'a_c': stack(accel_com),
+        'f_c': stack(force_com),
+        'n_c': stack(moment_com),
+        'f': stack(force_link),
+        'n': stack(moment_link)
+    }
+
+
+def mass_matrix_numeric(dh_table, pos_coms, masses, inertias, joint_types, q):
+    """
+    Numerically compute the joint-space mass matrix M(q) for a batch of joint positions.
+
+    Each column is the joint force for a unit acceleration of one joint, with no velocity and no gravity.
+    Arguments as in dynamics_newton_euler_numeric().
+    Return:
+        Array of shape (..., dof, dof)
+    """
+    q = np.asarray(q, dtype=float)
+    num_joints = q.shape[-1]
+    # Evaluate all columns in one batch, with an extra axis for the column
+    joint_force = dynamics_newton_euler_numeric(dh_table, pos_coms, masses, inertias, joint_types, np.zeros(3),
+                                                q[..., None, :], np.zeros(num_joints), np.eye(num_joints))['tau']
+    return np.swapaxes(joint_force[..., 1:], -1, -2)
+
+
+def forward_dynamics_numeric(dh_table, pos_coms, masses, inertias, joint_types, gravity, q, qd, tau):
+    """
+    Numerically compute the joint accelerations from the joint forces, qdd = M^-1 * (tau - h(q, qd)),
+    for a batch of joint states.
+
+    Arguments as in dynamics_newton_euler_numeric(), with tau an array of joint forces of shape (..., dof).
+    Return:
+        Array of joint accelerations with shape (..., dof)
+    """
+    qd = np.asarray(qd, dtype=float)
+    # Velocity and gravity dependent forces are the joint forces with zero acceleration
+    bias = dynamics_newton_euler_numeric(dh_table, pos_coms, masses, inertias, joint_types, gravity,
+                                         q, qd, np.zeros(qd.shape[-1]))['tau'][..., 1:]
+    mass_matrix = mass_matrix_numeric(dh_table, pos_coms, masses, inertias, joint_types, q)
+    return np.linalg.solve(mass_matrix, (tau - bias)[..., None])[..., 0]
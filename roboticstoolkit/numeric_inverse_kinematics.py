@@ -0,0 +1,132 @@
+import numpy as np
+from roboticstoolkit.numeric_kinematics import link_transforms_numeric, base_transforms_numeric
+from roboticstoolkit.numeric_jacobian import jacobian_numeric
+from roboticstoolkit.numeric_rotations import rotation_vector_from_rotation
+
+
+def _pose_error(dh_table, joint_types, joint_columns, q, target, position_only, weights):
+    """
+    Weighted end effector error and the jacobian of the end effector pose for a batch of joint values
+
+    Return:
+        3-tuple (error, jacobian, cost). error has shape (N, 3 or 6), jacobian (N, 3 or 6, dof) and cost (N,)
+    """
+    base_transforms = base_transforms_numeric(link_transforms_numeric(dh_table, joint_types, q))
+    end_transform = base_transforms[..., -1, :, :]
+    jacobian = jacobian_numeric(base_transforms, joint_types, position_only=position_only)[..., joint_columns]
+
+    position_error = target[..., :3, 3] - end_transform[..., :3, 3]
+    if position_only:
+        error = position_error
+    else:
+        # Orientation error as a rotation vector in the base frame, matching the angular rows of the jacobian
+        orientation_error = rotation_vector_from_rotation(target[..., :3, :3] @ np.swapaxes(end_transform[..., :3, :3], -1, -2))
+        error = np.concatenate([position_error, orientation_error], axis=-1)
+
+    error = error * weights
+    jacobian = jacobian * weights[:, None]
+    return error, jacobian, np.sum(error**2, axis=-1)
+
+
+def inverse_kinematics_numeric(dh_table, joint_types, target, q0=None, position_only=False, joint_limits=None,
+                               orientation_weight=1.0, damping=1e-3, tolerance=1e-9, max_iterations=100):
+    """
+    Solve inverse kinematics numerically for a batch of targets, using Levenberg-Marquardt (adaptively damped
+    least squares)
+
+    Every target has its own damping factor, which is decreased after a successful step and increased after a
+    failed one. Targets stop iterating individually once they have converged, so only the unsolved ones cost
+    anything in later iterations.
+
+    Example, warm starting each waypoint of a path from the solution of the previous path:
+
+        q, converged, residual = inverse_kinematics_numeric(dh_table, joint_types, waypoints, q0=q_previous)
+
+    Args:
+        dh_table - List of DH parameters, as for link_transforms_numeric(). The last row is the end effector frame.
+        joint_types - List with 'R' or 'P' for each row of the DH table with a joint, as for link_transforms_numeric()
+        target - Target end effector transforms with shape (..., 4, 4). If position_only is set, target positions
+            with shape (..., 3) can be given instead.
+        q0 - Initial joint values with shape (dof,) or (..., dof), broadcast against the targets. Defaults to the
+            middle of the joint limits, or 0 for unlimited joints.
+        position_only - If True, only solve for the end effector position
+        joint_limits - Array of shape (dof, 2) with lower and upper limits for each joint. Use -np.inf or np.inf for
+            unlimited joints. Every step is clipped to the limits.
+        orientation_weight - Weight of the orientation error (in radians) relative to the position error
+        damping - Initial damping factor
+        tolerance - Convergence threshold on the norm of the weighted error
+        max_iterations - Maximum number of iterations
+    Return:
+        3-tuple (q, converged, residual). q has shape (..., dof), converged is a boolean array with the batch shape,
+        and residual is the norm of the weighted error at the solution
+    """
+    num_frames = len(dh_table)
+    joint_columns = [i for i in range(num_frames - 1) if i < len(joint_types) and joint_types[i] in ('R', 'P')]
+    dof = len(joint_columns)
+
+    target = np.asarray(target, dtype=float)
+    if position_only and target.shape[-2:] != (4, 4):
+        if target.shape[-1:] != (3,):
+            raise ValueError(f'Expected target positions with shape (..., 3) or transforms with shape (..., 4, 4), got {target.shape}')
+        transforms = np.broadcast_to(np.eye(4), (*target.shape[:-1], 4, 4)).copy()
+        transforms[..., :3, 3] = target
+        target = transforms
+    elif target.shape[-2:] != (4, 4):
+        raise ValueError(f'Expected target transforms with shape (..., 4, 4), got {target.shape}')
+
+    if joint_limits is None:
+        lower, upper = np.full(dof, -np.inf), np.full(dof, np.inf)
+    else:
+        joint_limits = np.asarray(joint_limits, dtype=float)
+        if joint_limits.shape != (dof, 2):
+            raise ValueError(f'Expected joint limits with shape ({dof}, 2), got {joint_limits.shape}')
+        lower, upper = joint_limits[:, 0], joint_limits[:, 1]
+
+    if q0 is None:
+        both_finite = np.isfinite(lower) & np.isfinite(upper)
+        q0 = np.where(both_finite, (np.where(both_finite, lower, 0) + np.where(both_finite, upper, 0)) / 2, 0)
+        q0 = np.clip(q0, lower, upper)
+    q0 = np.asarray(q0, dtype=float)
+
+    # Flatten the batch so every target is one row
+    batch_shape = np.broadcast_shapes(target.shape[:-2], q0.shape[:-1])
+    target = np.broadcast_to(target, (*batch_shape, 4, 4)).reshape(-1, 4, 4)
+    q = np.clip(np.broadcast_to(q0, (*batch_shape, dof)).reshape(-1, dof), lower, upper)
+    num_targets = q.shape[0]
+
+    weights = np.ones(3 if position_only else 6)
+    weights[3:] = orientation_weight
+
+    error, jacobian, cost = _pose_error(dh_table, joint_types, joint_columns, q, target, position_only, weights)
+    mu = np.full(num_targets, damping)
+    active = np.flatnonzero(cost > tolerance**2)
+    identity = np.eye(dof)
+
+    for _ in range(max_iterations):
+        if len(active) == 0:
+            break
+
+        # Damped Gauss-Newton step for the unsolved targets
+        jacobian_t = np.swapaxes(jacobian[active], -1, -2)
+        hessian = jacobian_t @ jacobian[active] + mu[active, None, None] * identity
+        gradient = (jacobian_t @ error[active, :, None])[..., 0]
+        step = np.linalg.solve(hessian, gradient[..., None])[..., 0]
+        q_new = np.clip(q[active] + step, lower, upper)
+
+        error_new, jacobian_new, cost_new = _pose_error(dh_table, joint_types, joint_columns, q_new, target[active],
+                                                        position_only, weights)
+
+        # Accept steps that reduce the error and trust the model more, otherwise damp more heavily
+        improved = cost_new < cost[active]
+        accepted = active[improved]
+        q[accepted] = q_new[improved]
+        error[accepted] = error_new[improved]
+        jacobian[accepted] = jacobian_new[improved]
+        cost[accepted] = cost_new[improved]
+        mu[active] = np.where(improved, np.maximum(mu[active] / 3, 1e-12), mu[active] * 4)
+
+        # Stop targets that have converged, or can't make progress any more
+        active = active[(cost[active] > tolerance**2) & (mu[active] < 1e12)]
+
+    converged = cost <= tolerance**2
+    return q.reshape(*batch_shape, dof), converged.reshape(batch_shape), np.sqrt(cost).reshape(batch_shape)
@@ -0,0 +1,157 @@
+import numpy as np
+
+
+def _joint_geometry(base_transforms, joint_types):
+    """
+    Joint axes and moment arms shared by the jacobian and its derivative
+
+    Return:
+        4-tuple (joint_axes, moment_arms, revolute, prismatic). joint_axes and moment_arms (from each joint to the
+        end effector) have shape (..., joints, 3), revolute and prismatic are boolean arrays of shape (joints,)
+    """
+    num_joints = base_transforms.shape[-3] - 1
+    revolute = np.array([joint_types[i] == 'R' for i in range(num_joints)])
+    prismatic = np.array([joint_types[i] == 'P' for i in range(num_joints)])
+    joint_axes = base_transforms[..., :-1, :3, 2]
+    moment_arms = base_transforms[..., -1:, :3, 3] - base_transforms[..., :-1, :3, 3]
+    return joint_axes, moment_arms, revolute, prismatic
+
+
+def _jacobian_rows(base_transforms, joint_types, rows):
+    """
+    Compute selected rows of the jacobian for a batch of configurations, using the Plucker coordinates.
+
+    Args:
+        base_transforms - Array of shape (..., frames, 4, 4). Frames 1, 2, 3, ..., n where n is the end-effector frame.
+        joint_types - List with 'R' or 'P' for each joint depending on the joint type.
+        rows - Indices of the rows to compute. 0-2 are the linear velocity, 3-5 the angular velocity.
+    Return:
+        Array of shape (..., len(rows), joints)
+    """
+    base_transforms = np.asarray(base_transforms, dtype=float)
+    num_joints = base_transforms.shape[-3] - 1
+    joint_axes, moment_arms, revolute, prismatic = _joint_geometry(base_transforms, joint_types)
+
+    jacobian = np.zeros((*base_transforms.shape[:-3], len(rows), num_joints))
+    for k, row in enumerate(rows):
+        if row < 3:
+            # Only the needed component of the cross product joint_axis x moment_arm
+            j, l = (row + 1) % 3, (row + 2) % 3
+            cross = joint_axes[..., j] * moment_arms[..., l] - joint_axes[..., l] * moment_arms[..., j]
+            jacobian[..., k, :] = np.where(revolute, cross, np.where(prismatic, joint_axes[..., row], 0))
+        else:
+            # Prismatic joints have no rotational contribution
+            jacobian[..., k, :] = np.where(revolute, joint_axes[..., row - 3], 0)
+    return jacobian
+
+
+def jacobian_numeric(base_transforms, joint_types, position_only=False):
+    """
+    Numerical equivalent of jacobian() for a batch of configurations.
+
+    Args:
+        base_transforms - Array of shape (..., frames, 4, 4) describing frames 1, 2, 3, ..., n where n is the end-effcetor frame.
+            Can use the output from base_transforms_numeric() directly
+        joint_types - List with 'R' or 'P' for each joint depending on the joint type.
+        position_only - If True, only include first 3 rows in Jacobian as opposed to usual 6.
+    Return:
+        Array of shape (..., 6, joints), or (..., 3, joints) if position_only is set
+    """
+    return _jacobian_rows(base_transforms, joint_types, range(3 if position_only else 6))
+
+
+def jacobian_planar_numeric(plane_axis, base_transforms, joint_types, position_only=False):
+    """
+    Numerical equivalent of jacobian_planar(). Only the in-plane rows are computed.
+
+    Args:
+        plane_axis - Either x_vec, y_vec or z_vec (or an equivalent array). Normal to the plane
+    Return:
+        Array of shape (..., 3, joints), or (..., 2, joints) if position_only is set
+    """
+    plane_axis = tuple(np.asarray(plane_axis, dtype=float).reshape(3))
+    if plane_axis == (1, 0, 0):
+        keep_rows = [1, 2, 3]
+    elif plane_axis == (0, 1, 0):
+        keep_rows = [0, 2, 4]
+    elif plane_axis == (0, 0, 1):
+        keep_rows = [0, 1, 5]
+    else:
+        raise ValueError('Plane axis must be a coordinate axis')
+
+    if position_only:
+        keep_rows = keep_rows[0:2]
+
+    return _jacobian_rows(base_transforms, joint_types, keep_rows)
+
+
+def _jacobian_derivative(base_transforms, joint_types, qd):
+    """
+    Time derivative of the full (6-row) jacobian, for a batch of configurations and joint velocities
+
+    Differentiates each column directly. Joint axes turn with the angular velocity of the link before the joint,
+    and moment arms change with the difference in velocity between the end effector and the joint. Both velocities
+    are accumulated outwards along the chain, so no symbolic differentiation is needed.
+    Return:
+        Array of shape (..., 6, joints)
+    """
+    base_transforms = np.asarray(base_transforms, dtype=float)
+    qd = np.asarray(qd, dtype=float)
+    joint_axes, moment_arms, revolute, prismatic = _joint_geometry(base_transforms, joint_types)
+    positions = base_transforms[..., :3, 3]
+    batch_shape = np.broadcast_shapes(joint_axes.shape[:-2], qd.shape[:-1])
+    joint_axes = np.broadcast_to(joint_axes, (*batch_shape, *joint_axes.shape[-2:]))
+
+    # Angular velocity of each frame, and of the link before each joint (zero for the first joint)
+    omega = np.cumsum(joint_axes * (revolute * qd)[..., None], axis=-2)
+    omega_before = np.concatenate([np.zeros((*batch_shape, 1, 3)), omega[..., :-1, :]], axis=-2)
+
+    # Linear velocity of each frame origin, including the end effector. The base frame origin is fixed at zero.
+    offsets = np.diff(positions, axis=-2, prepend=np.zeros((*positions.shape[:-2], 1, 3)))
+    angular = np.concatenate([omega_before, omega[..., -1:, :]], axis=-2)
+    sliding = np.concatenate([joint_axes * (prismatic * qd)[..., None], np.zeros((*batch_shape, 1, 3))], axis=-2)
+    velocities = np.cumsum(np.cross(angular, offsets) + sliding, axis=-2)
+
+    axis_rates = np.cross(omega_before, joint_axes)
+    relative_velocities = velocities[..., -1:, :] - velocities[..., :-1, :]
+    linear = np.cross(axis_rates, moment_arms) + np.cross(joint_axes, relative_velocities)
+
+    jacobian_derivative = np.zeros((*batch_shape, 6, len(revolute)))
+    jacobian_derivative[..., 0:3, :] = np.swapaxes(np.where(revolute[:, None], linear, np.where(prismatic[:, None], axis_rates, 0)), -1, -2)
+    jacobian_derivative[..., 3:6, :] = np.swapaxes(np.where(revolute[:, None], axis_rates, 0), -1, -2)
+    return jacobian_derivative
+
+
+def jacobian_derivative_numeric(base_transforms, joint_types, qd, position_only=False):
+    """
+    Time derivative of the jacobian, dJ/dt, for a batch of configurations and joint velocities
+
+    Args:
+        base_transforms - Array of shape (..., frames, 4, 4), as in jacobian_numeric()
+        joint_types - List with 'R' or 'P' for each joint depending on the joint type.
+        qd - Array of joint velocities with shape (..., joints)
+        position_only - If True, only include first 3 rows
+    Return:
+        Array of shape (..., 6, joints), or (..., 3, joints) if position_only is set
+    """
+    jacobian_derivative = _jacobian_derivative(base_transforms, joint_types, qd)
+    return jacobian_derivative[..., :3, :] if position_only else jacobian_derivative
+
+
+def end_effector_acceleration_numeric(base_transforms, joint_types, qd, qdd, position_only=False):
+    """
+    Linear and angular acceleration of the end effector, J * qdd + dJ/dt * qd, for a batch of joint states
+
+    Args:
+        base_transforms - Array of shape (..., frames, 4, 4), as in jacobian_numeric()
+        joint_types - List with 'R' or 'P' for each joint depending on the joint type.
+        qd, qdd - Arrays of joint velocities and accelerations with shape (..., joints)
+        position_only - If True, only return the linear acceleration
+    Return:
+        Array of shape (..., 6), or (..., 3) if position_only is set. Represented in the base frame.
+    """
+    rows = range(3 if position_only else 6)
+    jacobian = _jacobian_rows(base_transforms, joint_types, rows)
+    jacobian_derivative = jacobian_derivative_numeric(base_transforms, joint_types, qd, position_only)
+    qd, qdd = np.asarray(qd, dtype=float), np.asarray(qdd, dtype=float)
+    return np.einsum('...ij,...j->...i', jacobian, qdd) + np.einsum('...ij,...j->...i', jacobian_derivative, qd)
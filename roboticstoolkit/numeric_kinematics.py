@@ -0,0 +1,140 @@
+import numpy as np
+
+
+# Numerical counterparts of the symbolic kinematics.
+# These operate on NumPy float arrays, so any number of configurations can be evaluated at once.
+# Leading (batch) dimensions of the joint values are carried through to every output.
+
+def dh_transform_numeric(length, twist, offset, angle):
+    """
+    Numerical equivalent of dh_transform(). Arguments are broadcast against each other.
+
+    Return:
+        Array of shape (..., 4, 4)
+    """
+    length, twist, offset, angle = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (length, twist, offset, angle)))
+    cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+    cos_twist, sin_twist = np.cos(twist), np.sin(twist)
+
+    transform = np.zeros((*length.shape, 4, 4))
+    transform[..., 0, 0] = cos_angle
+    transform[..., 0, 1] = -sin_angle
+    transform[..., 0, 3] = length
+    transform[..., 1, 0] = cos_twist * sin_angle
+    transform[..., 1, 1] = cos_twist * cos_angle
+    transform[..., 1, 2] = -sin_twist
+    transform[..., 1, 3] = -sin_twist * offset
+    transform[..., 2, 0] = sin_twist * sin_angle
+    transform[..., 2, 1] = sin_twist * cos_angle
+    transform[..., 2, 2] = cos_twist
+    transform[..., 2, 3] = cos_twist * offset
+    transform[..., 3, 3] = 1
+    return transform
+
+
+def _joint_offset(value):
+    # The joint variable entry of a DH row may still be symbolic (e.g. theta1 or theta1 + pi/2).
+    # Removing the joint symbol leaves the constant offset that the joint value is added to.
+    free_symbols = getattr(value, 'free_symbols', None)
+    if free_symbols:
+        offset = value - next(iter(free_symbols))
+        if len(free_symbols) > 1 or offset.free_symbols:
+            raise ValueError(f'Joint entry {value} must be the joint symbol plus a numeric constant, '
+                             f'e.g. theta1 + pi/2')
+        value = offset
+    return float(value)
+
+
+def _dh_constants(dh_table, joint_types):
+    """
+    Convert a DH table to a float array
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms()
+        joint_types - List with 'R' or 'P' for each row of the DH table with a joint. Rows without a joint
+            (extra rows at the end, or 0 entries) are fixed.
+    Return:
+        Array of shape (rows, 4). Joint variable entries hold their constant offset.
+    """
+    constants = np.zeros((len(dh_table), 4))
+    for i, row in enumerate(dh_table):
+        joint_type = joint_types[i] if i < len(joint_types) else None
+        joint_column = 3 if joint_type == 'R' else 2 if joint_type == 'P' else None
+        for j, value in enumerate(row):
+            try:
+                constants[i, j] = _joint_offset(value) if j == joint_column else float(value)
+            except TypeError:
+                raise ValueError(f'DH parameter {value} in row {i} is not numeric. Substitute numerical values first')
+            except ValueError as error:
+                raise ValueError(f'{error} (row {i})')
+    return constants
+
+
+def link_transforms_numeric(dh_table, joint_types, q):
+    """
+    Compute incremental frame transforms from a DH table for a batch of joint values
+
+    Args:
+        dh_table - List of DH parameters, as in link_transforms(). All entries must be numeric, except the joint variable
+            entries (theta for 'R', d for 'P'), which may be left symbolic. Any constant part of a joint variable entry
+            is kept as an offset, e.g. theta1 + pi/2 becomes q + pi/2.
+        joint_types - List with 'R' or 'P' for each row of the DH table with a joint. Rows past the end of the list
+            (e.g. the end effector frame) or with 0 entries are fixed.
+        q - Array of joint values with shape (..., dof), one column per 'R' or 'P' joint in order
+    Return:
+        Array of shape (..., rows, 4, 4)
+    """
+    constants = _dh_constants(dh_table, joint_types)
+    q = np.asarray(q, dtype=float)
+
+    # Add the joint values to their entries of the DH table
+    parameters = np.broadcast_to(constants, (*q.shape[:-1], *constants.shape)).copy()
+    column = 0
+    for i, joint_type in enumerate(joint_types):
+        if joint_type == 'R':
+            parameters[..., i, 3] += q[..., column]
+            column += 1
+        elif joint_type == 'P':
+            parameters[..., i, 2] += q[..., column]
+            column += 1
+    if column != q.shape[-1]:
+        raise ValueError(f'Expected {column} joint values, got {q.shape[-1]}')
+
+    return dh_transform_numeric(*np.moveaxis(parameters, -1, 0))
+
+
+def base_transforms_numeric(link_transforms, end_only=False):
+    """
+    Compute transformations to base frame from each link for a batch of configurations
+
+    Args:
+        link_transforms - Array of incremental frame transforms with shape (..., frames, 4, 4),
+            such as the output of link_transforms_numeric()
+        end_only - If True, only compute the transform of the last frame. Saves memory for large batches.
+    Return:
+        Array of base frame transforms with shape (..., frames, 4, 4), or (..., 4, 4) if end_only is set
+    """
+    link_transforms = np.asarray(link_transforms, dtype=float)
+    num_frames = link_transforms.shape[-3]
+
+    if end_only:
+        current_base_transform = link_transforms[..., 0, :, :].copy()
+        for i in range(1, num_frames):
+            current_base_transform = current_base_transform @ link_transforms[..., i, :, :]
+        return current_base_transform
+
+    base_transforms = np.empty_like(link_transforms)
+    base_transforms[..., 0, :, :] = link_transforms[..., 0, :, :]
+    for i in range(1, num_frames):
+        np.matmul(base_transforms[..., i-1, :, :], link_transforms[..., i, :, :], out=base_transforms[..., i, :, :])
+    return base_transforms
+
+
+def end_transform_numeric(dh_table, joint_types, q):
+    """
+    Numerical equivalent of end_transform() for a batch of joint values. Arguments as in link_transforms_numeric().
+
+    Return:
+        Array of shape (..., 4, 4)
+    """
+    return base_transforms_numeric(link_transforms_numeric(dh_table, joint_types, q), end_only=True)
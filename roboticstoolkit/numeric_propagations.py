@@ -0,0 +1,98 @@
+import numpy as np
+
+
+# Batched NumPy versions of the propagation equations in roboticstoolkit.propagations.
+# The conventions are identical; vectors have shape (..., 3), rotations and inertias have shape (..., 3, 3),
+# and joint-space rates have shape (...). Any leading dimensions are treated as a batch.
+
+z_vec = np.array([0., 0., 1.])
+
+
+def _rotate(rotation, vector):
+    return np.einsum('...ij,...j->...i', rotation, vector)
+
+def _rotate_inverse(rotation, vector):
+    return np.einsum('...ji,...j->...i', rotation, vector)
+
+def _along_z(value):
+    return np.asarray(value)[..., None] * z_vec
+
+# Conversion of manipulator parameters and joint states to the arrays used by the propagations
+def stack_vectors(values, shape):
+    """
+    Convert a list of vectors or matrices (sympy or NumPy) to one float array, with a leading axis for the list
+
+    Args:
+        values - List of array-likes, e.g. the pos_coms or inertias of a manipulator. A scalar 0 (as used for the
+            ground frame) stands for a zero vector or matrix.
+        shape - Shape of each entry, e.g. 3 or (3, 3)
+    Return:
+        Array of shape (len(values), *shape)
+    """
+    arrays = []
+    for value in values:
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 0:
+            if value != 0:
+                raise ValueError(f'Expected an array of shape {shape} or a scalar 0, got {value}')
+            value = np.broadcast_to(value, shape)
+        arrays.append(value.reshape(shape))
+    return np.stack(arrays)
+
+def joint_rates(joint_types, values, batch_shape):
+    """
+    Split joint-space rates into per-frame revolute and prismatic components
+
+    Args:
+        joint_types - List with 0 for the ground frame, then 'R' or 'P' for each joint
+        values - Array of shape (..., dof)
+        batch_shape - Shape to broadcast each component to
+    Return:
+        2-tuple (theta, d). Each is a list with one array per frame of joint_types, zero where the joint type differs
+    """
+    values = np.asarray(values, dtype=float)
+    zero = np.zeros(batch_shape)
+    theta = [zero] * len(joint_types)
+    d = [zero] * len(joint_types)
+    column = 0
+    for i in range(1, len(joint_types)):
+        if joint_types[i] == 'R':
+            theta[i] = np.broadcast_to(values[..., column], batch_shape)
+            column += 1
+        elif joint_types[i] == 'P':
+            d[i] = np.broadcast_to(values[..., column], batch_shape)
+            column += 1
+    return theta, d
+
+# Outward kinematics propagations
+def omega_next_frame(rotation, omega, theta_vel_next):
+    return _rotate_inverse(rotation, omega) + _along_z(theta_vel_next)
+
+def vel_curr_frame(vel, omega, translation):
+    return vel + np.cross(omega, translation)
+
+def vel_next_frame(rotation, vel, omega, translation, d_vel_next):
+    return _rotate_inverse(rotation, vel_curr_frame(vel, omega, translation)) + _along_z(d_vel_next)
+
+def alpha_next_frame(rotation, alpha, omega, theta_vel_next, theta_accel_next):
+    return _rotate_inverse(rotation, alpha) + np.cross(_rotate_inverse(rotation, omega), _along_z(theta_vel_next)) + _along_z(theta_accel_next)
+
+def accel_curr_frame(accel, alpha, omega, translation):
+    return accel + np.cross(alpha, translation) + np.cross(omega, np.cross(omega, translation))
+
+def accel_next_frame(rotation, accel, alpha, omega, translation, d_vel_next, d_accel_next):
+    return _rotate_inverse(rotation, accel_curr_frame(accel, alpha, omega, translation)) + 2*np.cross(_rotate_inverse(rotation, omega), _along_z(d_vel_next)) + _along_z(d_accel_next)
+
+# Outwrd dynamics equations
+def force_com_curr_frame(mass, accel_com):
+    return mass * accel_com
+
+def moment_com_curr_frame(inertia, alpha, omega):
+    return _rotate(inertia, alpha) + np.cross(omega, _rotate(inertia, omega))
+
+# Inward propagation equations
+def force_curr_frame(rotation, force_next, force_com):
+    return _rotate(rotation, force_next) + force_com
+
+def moment_curr_frame(rotation, moment_next, moment_com, p_next, force_next, p_com, force_com):
+    return _rotate(rotation, moment_next) + moment_com + np.cross(p_next, _rotate(rotation, force_next)) + np.cross(p_com, force_com)
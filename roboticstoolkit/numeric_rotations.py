@@ -0,0 +1,311 @@
+import numpy as np
+
+
+# Numerical rotation representations and conversions between them.
+# Every function works on batches, with the representation in the last one or two dimensions:
+#   rotation matrix  (..., 3, 3)
+#   quaternion       (..., 4), ordered (w, x, y, z), with w >= 0 where a canonical form is returned
+#   rotation vector  (..., 3), axis * angle with the angle in [0, pi]
+#   ZYX Euler angles (..., 3), ordered (alpha, beta, gamma) as in euler_ZYX()
+#   angle-axis       angle (...,) and unit axis (..., 3), as in angle_axis()
+
+def _skew_part(rotation):
+    # 2 sin(angle) * axis
+    return np.stack([
+        rotation[..., 2, 1] - rotation[..., 1, 2],
+        rotation[..., 0, 2] - rotation[..., 2, 0],
+        rotation[..., 1, 0] - rotation[..., 0, 1]
+    ], axis=-1)
+
+
+def euler_ZYX_numeric(alpha, beta, gamma):
+    """
+    Numerical equivalent of euler_ZYX(). Arguments are broadcast against each other.
+
+    Return:
+        Array of shape (..., 3, 3)
+    """
+    alpha, beta, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (alpha, beta, gamma)))
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    cb, sb = np.cos(beta), np.sin(beta)
+    cg, sg = np.cos(gamma), np.sin(gamma)
+    return np.stack([
+        np.stack([ca*cb, ca*sb*sg - sa*cg, ca*sb*cg + sa*sg], axis=-1),
+        np.stack([sa*cb, sa*sb*sg + ca*cg, sa*sb*cg - ca*sg], axis=-1),
+        np.stack([-sb,   cb*sg,            cb*cg], axis=-1)
+    ], axis=-2)
+
+
+def euler_ZYX_inverse_numeric(rotation, tolerance=1e-12):
+    """
+    Numerical equivalent of euler_ZYX_inverse() for a batch of rotation matrices
+
+    In gimbal lock (r20 = +-1) only alpha - gamma or alpha + gamma is defined, so alpha is set to 0 as in
+    euler_ZYX_inverse(). Unlike euler_ZYX_inverse(), r20 = 1 gives beta = -pi/2 so the result reproduces the rotation.
+
+    Args:
+        rotation - Array of shape (..., 3, 3)
+        tolerance - Distance of |r20| from 1 below which the rotation is treated as gimbal locked
+    Return:
+        Array of shape (..., 3) with (alpha, beta, gamma)
+    """
+    rotation = np.asarray(rotation, dtype=float)
+    r20 = np.clip(rotation[..., 2, 0], -1, 1)
+    locked = np.abs(r20) > 1 - tolerance
+    sign = np.where(r20 < 0, -1.0, 1.0)
+
+    alpha = np.where(locked, 0, np.arctan2(rotation[..., 1, 0], rotation[..., 0, 0]))
+    beta = np.where(locked, -sign * np.pi/2, -np.arcsin(r20))
+    gamma = np.where(locked,
+                     np.arctan2(-sign * rotation[..., 0, 1], rotation[..., 1, 1]),
+                     np.arctan2(rotation[..., 2, 1], rotation[..., 2, 2]))
+    return np.stack([alpha, beta, gamma], axis=-1)
+
+
+def angle_axis_numeric(angle, axis):
+    """
+    Numerical equivalent of angle_axis(). The axis is normalised.
+
+    Args:
+        angle - Array of shape (...)
+        axis - Array of shape (..., 3)
+    Return:
+        Array of shape (..., 3, 3)
+    """
+    angle = np.asarray(angle, dtype=float)
+    axis = np.asarray(axis, dtype=float)
+    axis = axis / np.linalg.norm(axis, axis=-1, keepdims=True)
+    cos_angle, sin_angle = np.cos(angle)[..., None, None], np.sin(angle)[..., None, None]
+    x, y, z = axis[..., 0], axis[..., 1], axis[..., 2]
+    cross = np.zeros((*axis.shape[:-1], 3, 3))
+    cross[..., 0, 1], cross[..., 0, 2] = -z, y
+    cross[..., 1, 0], cross[..., 1, 2] = z, -x
+    cross[..., 2, 0], cross[..., 2, 1] = -y, x
+    outer = axis[..., :, None] * axis[..., None, :]
+    return outer * (1 - cos_angle) + np.eye(3) * cos_angle + cross * sin_angle
+
+
+def angle_axis_inverse_numeric(rotation):
+    """
+    Numerical equivalent of angle_axis_inverse() for a batch of rotation matrices
+
+    The angle is in [0, pi]. A zero angle gives the axis (1, 0, 0), as in angle_axis_inverse(). Close to pi the axis is
+    taken from the symmetric part of the matrix, with its sign recovered from the off-diagonal entries.
+
+    Args:
+        rotation - Array of shape (..., 3, 3)
+    Return:
+        2-tuple (angle, axis), with shapes (...) and (..., 3)
+    """
+    rotation_vector = rotation_vector_from_rotation(rotation)
+    angle = np.linalg.norm(rotation_vector, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        axis = np.where(angle[..., None] > 0, rotation_vector / angle[..., None], [1.0, 0.0, 0.0])
+    return angle, axis
+
+
+def rotation_vector_to_rotation(rotation_vector):
+    """
+    Return:
+        Rotation matrices of shape (..., 3, 3) for rotation vectors of shape (..., 3)
+    """
+    return quaternion_to_rotation(quaternion_from_rotation_vector(rotation_vector))
+
+
+def rotation_vector_from_rotation(rotation):
+    """
+    Rotation vectors (axis * angle) of a batch of rotation matrices
+
+    Args:
+        rotation - Array of shape (..., 3, 3)
+    Return:
+        Array of shape (..., 3), with the angle in [0, pi]
+    """
+    rotation = np.asarray(rotation, dtype=float)
+    skew = _skew_part(rotation)
+    cos_angle = np.clip((np.trace(rotation, axis1=-2, axis2=-1) - 1) / 2, -1, 1)
+    sin_angle = np.linalg.norm(skew, axis=-1) / 2
+    angle = np.arctan2(sin_angle, cos_angle)
+
+    # Away from angle = pi the axis is the skew-symmetric part divided by 2 sin(angle).
+    # The ratio angle / sin(angle) tends to 1 for small angles.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(sin_angle > 1e-8, angle / (2 * sin_angle), 0.5)
+    rotation_vector = skew * scale[..., None]
+
+    # Close to angle = pi the skew-symmetric part vanishes, so take the axis from the symmetric part
+    # (R + R^T) / 2 = cos(angle) I + (1 - cos(angle)) axis axis^T instead, with the sign of the skew part
+    near_pi = cos_angle < -0.99
+    if np.any(near_pi):
+        cos_near_pi = cos_angle[near_pi][:, None, None]
+        symmetric = ((rotation[near_pi] + np.swapaxes(rotation[near_pi], -1, -2)) / 2 - cos_near_pi * np.eye(3)) / (1 - cos_near_pi)
+        column = np.argmax(np.diagonal(symmetric, axis1=-2, axis2=-1), axis=-1)
+        axis = np.take_along_axis(symmetric, column[:, None, None], axis=-1)[..., 0]
+        axis /= np.linalg.norm(axis, axis=-1, keepdims=True)
+        sign = np.where(np.sum(axis * skew[near_pi], axis=-1) < 0, -1.0, 1.0)
+        rotation_vector[near_pi] = axis * (sign * angle[near_pi])[..., None]
+    return rotation_vector
+
+
+def quaternion_to_rotation(quaternion):
+    """
+    Return:
+        Rotation matrices of shape (..., 3, 3) for quaternions of shape (..., 4). Quaternions are normalised first.
+    """
+    quaternion = np.asarray(quaternion, dtype=float)
+    quaternion = quaternion / np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    w, x, y, z = (quaternion[..., i] for i in range(4))
+    return np.stack([
+        np.stack([1 - 2*(y*y + z*z), 2*(x*y - w*z),     2*(x*z + w*y)], axis=-1),
+        np.stack([2*(x*y + w*z),     1 - 2*(x*x + z*z), 2*(y*z - w*x)], axis=-1),
+        np.stack([2*(x*z - w*y),     2*(y*z + w*x),     1 - 2*(x*x + y*y)], axis=-1)
+    ], axis=-2)
+
+
+def quaternion_from_rotation(rotation):
+    """
+    Unit quaternions of a batch of rotation matrices, using Shepperd's method
+
+    Args:
+        rotation - Array of shape (..., 3, 3)
+    Return:
+        Array of shape (..., 4) with w >= 0
+    """
+    rotation = np.asarray(rotation, dtype=float)
+    r = rotation
+    trace = np.trace(r, axis1=-2, axis2=-1)
+
+    # Four formulas proportional to the quaternion. Use the one whose largest component (w, x, y or z) is biggest
+    candidates = np.stack([
+        np.stack([1 + trace, r[..., 2, 1] - r[..., 1, 2], r[..., 0, 2] - r[..., 2, 0], r[..., 1, 0] - r[..., 0, 1]], axis=-1),
+        np.stack([r[..., 2, 1] - r[..., 1, 2], 1 + 2*r[..., 0, 0] - trace, r[..., 0, 1] + r[..., 1, 0], r[..., 0, 2] + r[..., 2, 0]], axis=-1),
+        np.stack([r[..., 0, 2] - r[..., 2, 0], r[..., 0, 1] + r[..., 1, 0], 1 + 2*r[..., 1, 1] - trace, r[..., 1, 2] + r[..., 2, 1]], axis=-1),
+        np.stack([r[..., 1, 0] - r[..., 0, 1], r[..., 0, 2] + r[..., 2, 0], r[..., 1, 2] + r[..., 2, 1], 1 + 2*r[..., 2, 2] - trace], axis=-1)
+    ], axis=-2)
+    choice = np.argmax(np.stack([trace, r[..., 0, 0], r[..., 1, 1], r[..., 2, 2]], axis=-1), axis=-1)
+    quaternion = np.take_along_axis(candidates, choice[..., None, None], axis=-2)[..., 0, :]
+    quaternion /= np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    return np.where(quaternion[..., :1] < 0, -quaternion, quaternion)
+
+
+def quaternion_from_rotation_vector(rotation_vector):
+    """
+    Return:
+        Unit quaternions of shape (..., 4) for rotation vectors of shape (..., 3)
+    """
+    rotation_vector = np.asarray(rotation_vector, dtype=float)
+    angle = np.linalg.norm(rotation_vector, axis=-1)
+
+    # sin(angle/2) / angle, with its Taylor series for small angles
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(angle > 1e-6, np.sin(angle / 2) / angle, 0.5 - angle**2 / 48)
+    return np.concatenate([np.cos(angle / 2)[..., None], rotation_vector * scale[..., None]], axis=-1)
+
+
+def quaternion_to_rotation_vector(quaternion):
+    """
+    Return:
+        Rotation vectors of shape (..., 3), with the angle in [0, pi], for quaternions of shape (..., 4)
+    """
+    quaternion = np.asarray(quaternion, dtype=float)
+    quaternion = quaternion / np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    quaternion = np.where(quaternion[..., :1] < 0, -quaternion, quaternion)
+    vector_norm = np.linalg.norm(quaternion[..., 1:], axis=-1)
+    angle = 2 * np.arctan2(vector_norm, quaternion[..., 0])
+
+    # angle / sin(angle/2), which tends to 2 for small angles
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(vector_norm > 1e-12, angle / vector_norm, 2 / quaternion[..., 0])
+    return quaternion[..., 1:] * scale[..., None]
+
+
+def quaternion_from_euler_ZYX(alpha, beta, gamma):
+    """
+    Unit quaternions of ZYX Euler angles, as in euler_ZYX(). Arguments are broadcast against each other.
+
+    Return:
+        Array of shape (..., 4) with w >= 0
+    """
+    alpha, beta, gamma = np.broadcast_arrays(*(np.asarray(x, dtype=float) / 2 for x in (alpha, beta, gamma)))
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    cb, sb = np.cos(beta), np.sin(beta)
+    cg, sg = np.cos(gamma), np.sin(gamma)
+    quaternion = np.stack([
+        ca*cb*cg + sa*sb*sg,
+        ca*cb*sg - sa*sb*cg,
+        ca*sb*cg + sa*cb*sg,
+        sa*cb*cg - ca*sb*sg
+    ], axis=-1)
+    return np.where(quaternion[..., :1] < 0, -quaternion, quaternion)
+
+
+def quaternion_to_euler_ZYX(quaternion, tolerance=1e-12):
+    """
+    ZYX Euler angles of quaternions, with gimbal lock handled as in euler_ZYX_inverse_numeric()
+
+    Return:
+        Array of shape (..., 3) with (alpha, beta, gamma)
+    """
+    return euler_ZYX_inverse_numeric(quaternion_to_rotation(quaternion), tolerance=tolerance)
+
+
+def quaternion_multiply(first, second):
+    """
+    Hamilton product of two batches of quaternions, broadcast against each other. The result rotates by second,
+    then first, like first * second for rotation matrices.
+
+    Return:
+        Array of shape (..., 4)
+    """
+    first, second = np.asarray(first, dtype=float), np.asarray(second, dtype=float)
+    w1, x1, y1, z1 = (first[..., i] for i in range(4))
+    w2, x2, y2, z2 = (second[..., i] for i in range(4))
+    return np.stack([
+        w1*w2 - x1*x2 - y1*y2 - z1*z2,
+        w1*x2 + x1*w2 + y1*z2 - z1*y2,
+        w1*y2 - x1*z2 + y1*w2 + z1*x2,
+        w1*z2 + x1*y2 - y1*x2 + z1*w2
+    ], axis=-1)
+
+
+def quaternion_conjugate(quaternion):
+    """
+    Conjugate of quaternions, which is the inverse rotation for unit quaternions
+
+    Return:
+        Array of shape (..., 4)
+    """
+    quaternion = np.asarray(quaternion, dtype=float)
+    return quaternion * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def slerp(start, end, fraction):
+    """
+    Spherical linear interpolation between two batches of unit quaternions, along the shortest path
+
+    Args:
+        start - Array of shape (..., 4)
+        end - Array of shape (..., 4)
+        fraction - Interpolation parameter, 0 at start and 1 at end, with shape (...). Broadcast against the batch,
+            so e.g. an array of shape (N,) with quaternions of shape (4,) gives N points along one path.
+    Return:
+        Array of shape (..., 4)
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    fraction = np.asarray(fraction, dtype=float)[..., None]
+
+    # q and -q are the same rotation. Flip end so the interpolation takes the shorter way round.
+    dot = np.sum(start * end, axis=-1, keepdims=True)
+    end = np.where(dot < 0, -end, end)
+    dot = np.clip(np.abs(dot), -1, 1)
+
+    # Fall back to normalised linear interpolation when the quaternions are almost equal
+    angle = np.arccos(dot)
+    sin_angle = np.sin(angle)
+    close = sin_angle < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        start_weight = np.where(close, 1 - fraction, np.sin((1 - fraction) * angle) / sin_angle)
+        end_weight = np.where(close, fraction, np.sin(fraction * angle) / sin_angle)
+    result = start_weight * start + end_weight * end
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
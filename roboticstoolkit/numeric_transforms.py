@@ -0,0 +1,330 @@
+import numpy as np
+from roboticstoolkit.numeric_kinematics import dh_transform_numeric
+
+
+# Lightweight numerical rotations and rigid transforms.
+# Both classes wrap a single contiguous float64 array, (..., 3, 3) for SO3 and (..., 4, 4) for SE3, so one object
+# can hold a single element or a whole batch. Constructors and properties mirror roboticstoolkit.transforms.
+
+def _rotation_matrices(axis, angle):
+    # Batch of rotation matrices about a coordinate axis (0, 1 or 2)
+    angle = np.asarray(angle, dtype=float)
+    cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    matrix = np.zeros((*angle.shape, 3, 3))
+    matrix[..., axis, axis] = 1
+    matrix[..., i, i] = cos_angle
+    matrix[..., i, j] = -sin_angle
+    matrix[..., j, i] = sin_angle
+    matrix[..., j, j] = cos_angle
+    return matrix
+
+
+def _to_sympy(array):
+    # Nested lists of sympy matrices for batched arrays
+    import sympy as sp
+    if array.ndim == 2:
+        return sp.Matrix(array)
+    return [_to_sympy(element) for element in array]
+
+
+def _from_sympy(matrices):
+    # Accepts a sympy Matrix or a (nested) list of them
+    if isinstance(matrices, (list, tuple)):
+        return np.stack([_from_sympy(matrix) for matrix in matrices])
+    return np.array(matrices.tolist(), dtype=float)
+
+
+def cross_matrix_numeric(vector):
+    """
+    Numerical equivalent of cross_matrix() for a batch of vectors
+
+    Args:
+        vector - Array of shape (..., 3)
+    Return:
+        Array of shape (..., 3, 3)
+    """
+    vector = np.asarray(vector, dtype=float)
+    x, y, z = vector[..., 0], vector[..., 1], vector[..., 2]
+    matrix = np.zeros((*vector.shape[:-1], 3, 3))
+    matrix[..., 0, 1] = -z
+    matrix[..., 0, 2] = y
+    matrix[..., 1, 0] = z
+    matrix[..., 1, 2] = -x
+    matrix[..., 2, 0] = -y
+    matrix[..., 2, 1] = x
+    return matrix
+
+
+class SO3:
+    """
+    Numerical rotation, or batch of rotations, backed by a float64 array of shape (..., 3, 3)
+
+    Example:
+
+        rotation = SO3.rot_z(angles) @ SO3.rot_x(np.pi/2)
+        rotated = rotation.apply(points)
+    """
+    __slots__ = ('matrix',)
+
+    def __init__(self, matrix):
+        """
+        Args:
+            matrix - Array of rotation matrices with shape (..., 3, 3)
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=float)
+        if matrix.shape[-2:] != (3, 3):
+            raise ValueError(f'Expected rotation matrices with shape (..., 3, 3), got {matrix.shape}')
+        self.matrix = matrix
+
+    @classmethod
+    def identity(cls, shape=()):
+        return cls(np.broadcast_to(np.eye(3), (*shape, 3, 3)))
+
+    @classmethod
+    def rot_x(cls, angle):
+        return cls(_rotation_matrices(0, angle))
+
+    @classmethod
+    def rot_y(cls, angle):
+        return cls(_rotation_matrices(1, angle))
+
+    @classmethod
+    def rot_z(cls, angle):
+        return cls(_rotation_matrices(2, angle))
+
+    @classmethod
+    def from_sympy(cls, matrix):
+        """
+        Args:
+            matrix - sympy rotation Matrix or transform Matrix, or a (nested) list of them
+        """
+        matrix = _from_sympy(matrix)
+        return cls(matrix[..., :3, :3])
+
+    def to_sympy(self):
+        """
+        Return:
+            sympy Matrix, or a nested list of them for a batch
+        """
+        return _to_sympy(self.matrix)
+
+    @property
+    def shape(self):
+        """
+        Batch shape
+        """
+        return self.matrix.shape[:-2]
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def __getitem__(self, index):
+        matrix = self.matrix[index]
+        if matrix.ndim < 2 or matrix.shape[-2:] != (3, 3):
+            raise IndexError('Only the batch dimensions can be indexed')
+        return SO3(matrix)
+
+    def __repr__(self):
+        return f'SO3(shape={self.shape})' if self.shape else f'SO3({self.matrix.tolist()})'
+
+    def __matmul__(self, other):
+        if not isinstance(other, SO3):
+            return NotImplemented
+        return SO3(self.matrix @ other.matrix)
+
+    def inverse(self):
+        """
+        Inverse rotation, using the transpose
+        """
+        return SO3(np.swapaxes(self.matrix, -1, -2))
+
+    def apply(self, points):
+        """
+        Rotate points (or vectors)
+
+        Args:
+            points - Array of shape (..., 3), broadcast against the batch
+        Return:
+            Array of shape (..., 3)
+        """
+        points = np.asarray(points, dtype=float)
+        return np.einsum('...ij,...j->...i', self.matrix, points)
+
+    @property
+    def axis_x(self):
+        return self.matrix[..., :, 0]
+
+    @property
+    def axis_y(self):
+        return self.matrix[..., :, 1]
+
+    @property
+    def axis_z(self):
+        return self.matrix[..., :, 2]
+
+
+class SE3:
+    """
+    Numerical rigid transform, or batch of transforms, backed by a float64 array of shape (..., 4, 4)
+
+    Composition and inversion work on the rotation and translation blocks directly, so the bottom row is never
+    multiplied out.
+
+    Example:
+
+        transforms = [SE3.dh_transform(*row) for row in numeric_dh_table]
+        end = transforms[0]
+        for transform in transforms[1:]:
+            end = end @ transform
+        point_in_base = end.apply(point_in_end_effector)
+    """
+    __slots__ = ('matrix',)
+
+    def __init__(self, matrix):
+        """
+        Args:
+            matrix - Array of homogeneous transforms with shape (..., 4, 4)
+        """
+        matrix = np.ascontiguousarray(matrix, dtype=float)
+        if matrix.shape[-2:] != (4, 4):
+            raise ValueError(f'Expected transforms with shape (..., 4, 4), got {matrix.shape}')
+        self.matrix = matrix
+
+    @classmethod
+    def from_rotation_translation(cls, rotation=None, translation=None):
+        """
+        Args:
+            rotation - SO3 or array of shape (..., 3, 3). Defaults to the identity
+            translation - Array of shape (..., 3). Defaults to zero
+        """
+        if isinstance(rotation, SO3):
+            rotation = rotation.matrix
+        rotation = np.eye(3) if rotation is None else np.asarray(rotation, dtype=float)
+        translation = np.zeros(3) if translation is None else np.asarray(translation, dtype=float)
+        shape = np.broadcast_shapes(rotation.shape[:-2], translation.shape[:-1])
+        matrix = np.zeros((*shape, 4, 4))
+        matrix[..., :3, :3] = rotation
+        matrix[..., :3, 3] = translation
+        matrix[..., 3, 3] = 1
+        return cls(matrix)
+
+    @classmethod
+    def identity(cls, shape=()):
+        return cls(np.broadcast_to(np.eye(4), (*shape, 4, 4)))
+
+    @classmethod
+    def rot_x(cls, angle):
+        return cls.from_rotation_translation(_rotation_matrices(0, angle))
+
+    @classmethod
+    def rot_y(cls, angle):
+        return cls.from_rotation_translation(_rotation_matrices(1, angle))
+
+    @classmethod
+    def rot_z(cls, angle):
+        return cls.from_rotation_translation(_rotation_matrices(2, angle))
+
+    @classmethod
+    def trans(cls, x, y, z):
+        return cls.from_rotation_translation(translation=np.stack(np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (x, y, z))), axis=-1))
+
+    @classmethod
+    def screw_x(cls, offset, angle):
+        return cls.trans(offset, 0, 0) @ cls.rot_x(angle)
+
+    @classmethod
+    def screw_y(cls, offset, angle):
+        return cls.trans(0, offset, 0) @ cls.rot_y(angle)
+
+    @classmethod
+    def screw_z(cls, offset, angle):
+        return cls.trans(0, 0, offset) @ cls.rot_z(angle)
+
+    @classmethod
+    def dh_transform(cls, length, twist, offset, angle):
+        """
+        Numerical equivalent of dh_transform(). Arguments are broadcast against each other.
+        """
+        return cls(dh_transform_numeric(length, twist, offset, angle))
+
+    @classmethod
+    def from_sympy(cls, matrix):
+        """
+        Args:
+            matrix - sympy transform Matrix, or a (nested) list of them
+        """
+        return cls(_from_sympy(matrix))
+
+    def to_sympy(self):
+        """
+        Return:
+            sympy Matrix, or a nested list of them for a batch
+        """
+        return _to_sympy(self.matrix)
+
+    @property
+    def shape(self):
+        """
+        Batch shape
+        """
+        return self.matrix.shape[:-2]
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def __getitem__(self, index):
+        matrix = self.matrix[index]
+        if matrix.ndim < 2 or matrix.shape[-2:] != (4, 4):
+            raise IndexError('Only the batch dimensions can be indexed')
+        return SE3(matrix)
+
+    def __repr__(self):
+        return f'SE3(shape={self.shape})' if self.shape else f'SE3({self.matrix.tolist()})'
+
+    def __matmul__(self, other):
+        if not isinstance(other, SE3):
+            return NotImplemented
+        rotation, translation = self.matrix[..., :3, :3], self.matrix[..., :3, 3]
+        other_rotation, other_translation = other.matrix[..., :3, :3], other.matrix[..., :3, 3]
+        return SE3.from_rotation_translation(rotation @ other_rotation,
+                                             np.einsum('...ij,...j->...i', rotation, other_translation) + translation)
+
+    def inverse(self):
+        """
+        Numerical equivalent of inverse_transform(), using the transpose of the rotation
+        """
+        rotation_t = np.swapaxes(self.matrix[..., :3, :3], -1, -2)
+        return SE3.from_rotation_translation(rotation_t, -np.einsum('...ij,...j->...i', rotation_t, self.matrix[..., :3, 3]))
+
+    def apply(self, points):
+        """
+        Transform points
+
+        Args:
+            points - Array of shape (..., 3), broadcast against the batch
+        Return:
+            Array of shape (..., 3)
+        """
+        points = np.asarray(points, dtype=float)
+        return np.einsum('...ij,...j->...i', self.matrix[..., :3, :3], points) + self.matrix[..., :3, 3]
+
+    @property
+    def rotation(self):
+        return SO3(self.matrix[..., :3, :3])
+
+    @property
+    def translation(self):
+        return self.matrix[..., :3, 3]
+
+    @property
+    def axis_x(self):
+        return self.matrix[..., :3, 0]
+
+    @property
+    def axis_y(self):
+        return self.matrix[..., :3, 1]
+
+    @property
+    def axis_z(self):
+        return self.matrix[..., :3, 2]
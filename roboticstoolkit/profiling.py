@@ -0,0 +1,209 @@
+import contextlib
+import functools
+import json
+import os
+import time
+from roboticstoolkit.simplification import expression_size
+
+
+# Profilers currently collecting events. Stages are only timed and measured while this is non-empty,
+# so instrumented code costs almost nothing otherwise.
+_settings = {
+    'profilers': [],
+    'overhead': 0.0
+}
+
+
+class Profiler:
+    """
+    Collects the timings and expression sizes of instrumented stages
+
+    Every event is a dictionary with entries:
+        'function' - Name of the instrumented function, e.g. 'dynamics_lagrange'
+        'stage' - Name of the step within the function, or 'total' for the whole call
+        'link' - Index of the link the stage works on, or None if it covers all links
+        'start' - Start time in seconds, relative to the creation of the profiler
+        'duration' - Wall time in seconds, excluding time spent measuring the sizes of nested stages
+        'size' - Number of operations (sp.count_ops) in the stage's output, or None if sizes are not measured
+    """
+
+    def __init__(self, callback=None, sizes=True):
+        """
+        Args:
+            callback - Function called with each event as it is recorded
+            sizes - If True, measure the size of the output of each stage. Counting operations takes time of its own
+                (not included in the stage durations), so turn this off to profile long derivations faster.
+        """
+        self.callback = callback
+        self.sizes = sizes
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def record(self, event):
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def summary(self):
+        """
+        Total time, call count and output size of each stage, summed over links and calls
+
+        Return:
+            Dictionary mapping (function, stage) to a dictionary with entries 'calls', 'time' and 'size'
+        """
+        totals = dict()
+        for event in self.events:
+            total = totals.setdefault((event['function'], event['stage']), {'calls': 0, 'time': 0.0, 'size': 0})
+            total['calls'] += 1
+            total['time'] += event['duration']
+            total['size'] += event['size'] or 0
+        return totals
+
+    def report(self):
+        """
+        Return:
+            Table of summary() as a string, slowest stages first
+        """
+        lines = [f'{"function":<24}{"stage":<28}{"calls":>7}{"time (s)":>12}{"ops":>12}']
+        for (function, stage), total in sorted(self.summary().items(), key=lambda item: -item[1]['time']):
+            lines.append(f'{function:<24}{stage:<28}{total["calls"]:>7}{total["time"]:>12.4f}{total["size"]:>12}')
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """
+        Convert the events to the Chrome trace event format, viewable in chrome://tracing or Perfetto
+
+        Return:
+            Dictionary that can be saved with json.dump
+        """
+        trace_events = []
+        for event in self.events:
+            name = event['stage'] if event['link'] is None else f'{event["stage"]} [link {event["link"]}]'
+            trace_events.append({
+                'name': name,
+                'cat': event['function'],
+                'ph': 'X',
+                'ts': event['start'] * 1e6,
+                'dur': event['duration'] * 1e6,
+                'pid': os.getpid(),
+                'tid': 0,
+                'args': {'link': event['link'], 'size': event['size']}
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        """
+        Save the events as a Chrome trace JSON file
+        """
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
+
+
+@contextlib.contextmanager
+def profile(callback=None, sizes=True):
+    """
+    Context manager profiling every instrumented function called inside it
+
+    Example:
+
+        with profile() as profiler:
+            dynamics_lagrange(...)
+        print(profiler.report())
+        profiler.save_chrome_trace('lagrange.json')
+
+    Args:
+        callback - Function called with each event as it is recorded, e.g. print for live progress
+        sizes - If True, measure the size of the output of each stage
+    Yield:
+        Profiler, updated as stages finish
+    """
+    profiler = Profiler(callback, sizes)
+    _settings['profilers'].append(profiler)
+    try:
+        yield profiler
+    finally:
+        _settings['profilers'].remove(profiler)
+
+
+class _Stage:
+    # Times a stage and reports it to the active profilers. Set outputs inside the with block to record their size.
+    __slots__ = ('function', 'stage', 'link', 'outputs', 'start', 'overhead')
+
+    def __init__(self, function, stage, link):
+        self.function = function
+        self.stage = stage
+        self.link = link
+        self.outputs = None
+
+    def __enter__(self):
+        self.overhead = _settings['overhead']
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        # Leave out the time spent measuring the sizes of nested stages
+        duration = end - self.start - (_settings['overhead'] - self.overhead)
+        for profiler in _settings['profilers']:
+            profiler.record({
+                'function': self.function,
+                'stage': self.stage,
+                'link': self.link,
+                'start': self.start - profiler.origin,
+                'duration': duration,
+                'size': expression_size(self.outputs) if profiler.sizes else None
+            })
+        _settings['overhead'] += time.perf_counter() - end
+        return False
+
+
+class _NullStage:
+    # Stand-in for _Stage when nothing is being profiled. Ignores outputs, so it holds no references.
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def profile_stage(function, stage, link=None):
+    """
+    Context manager timing one stage of an instrumented function
+
+    Example:
+
+        with profile_stage('dynamics_newton_euler', 'outward', link=i) as record:
+            omega[i] = ...
+            record.outputs = omega[i]
+
+    Args:
+        function - Name of the instrumented function
+        stage - Name of the stage
+        link - Index of the link the stage works on, if any
+    Return:
+        Context manager yielding an object whose outputs attribute can be set to the stage's results
+    """
+    if not _settings['profilers']:
+        return _NULL_STAGE
+    return _Stage(function, stage, link)
+
+
+def profiled(func):
+    """
+    Decorator recording every call of a function as a stage named 'total', with the size of its return value
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_stage(func.__name__, 'total') as record:
+            result = func(*args, **kwargs)
+            record.outputs = result
+        return result
+    return wrapper
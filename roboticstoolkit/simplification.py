@@ -0,0 +1,379 @@
+import contextlib
+import functools
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+import sympy as sp
+
+
+# Simplification policies, from cheapest to most thorough:
+#   'none'  - leave expressions as they are
+#   'trig'  - sp.trigsimp only
+#   'cheap' - sp.expand_trig followed by sp.cancel
+#   'full'  - sp.simplify
+#   'final' - skip simplification of intermediate quantities, fully simplify the final result only
+SIMPLIFICATION_POLICIES = ('none', 'trig', 'cheap', 'full', 'final')
+
+# Global settings. The policy is used whenever a function is called without one.
+_settings = {
+    'policy': 'full',
+    'report': None
+}
+
+
+def expression_size(expr):
+    """
+    Count the operations in an expression, a matrix, or a list or dict of either
+
+    Return:
+        Total number of operations, as counted by sp.count_ops
+    """
+    if isinstance(expr, LazyEquationsDict):
+        # Only count entries that have been evaluated, rather than forcing the rest
+        return sum(expression_size(expr[key]) for key in expr if expr.is_evaluated(key))
+    if isinstance(expr, dict):
+        return sum(expression_size(e) for e in expr.values())
+    if isinstance(expr, (list, tuple)):
+        return sum(expression_size(e) for e in expr)
+    if isinstance(expr, sp.MatrixBase):
+        return sum(sp.count_ops(e) for e in expr)
+    return sp.count_ops(expr)
+
+
+class SimplificationReport:
+    """
+    Running totals of expression sizes (sp.count_ops) before and after simplification
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.ops_before = 0
+        self.ops_after = 0
+
+    def record(self, before, after):
+        self.calls += 1
+        self.ops_before += expression_size(before)
+        self.ops_after += expression_size(after)
+
+    def __repr__(self):
+        return f'SimplificationReport(calls={self.calls}, ops_before={self.ops_before}, ops_after={self.ops_after})'
+
+
+@contextlib.contextmanager
+def simplification_report():
+    """
+    Context manager recording the size of every expression simplified inside it
+
+    Example:
+
+        with simplification_report() as report:
+            dynamics_lagrange(...)
+        print(report.ops_before, report.ops_after)
+
+    Yield:
+        SimplificationReport, updated as expressions are simplified
+    """
+    report = SimplificationReport()
+    previous_report = _settings['report']
+    _settings['report'] = report
+    try:
+        yield report
+    finally:
+        _settings['report'] = previous_report
+
+
+def set_simplification(policy):
+    """
+    Set the global simplification policy, used when a function is called without one
+
+    Args:
+        policy - One of SIMPLIFICATION_POLICIES
+    """
+    _settings['policy'] = resolve_simplification(policy)
+
+
+def get_simplification():
+    """
+    Return:
+        The global simplification policy
+    """
+    return _settings['policy']
+
+
+def resolve_simplification(policy=None):
+    """
+    Check a simplification policy, falling back to the global policy
+
+    Args:
+        policy - One of SIMPLIFICATION_POLICIES, or None for the global policy
+    Return:
+        The policy to use
+    """
+    if policy is None:
+        return _settings['policy']
+    if policy not in SIMPLIFICATION_POLICIES:
+        raise ValueError(f"Unknown simplification policy '{policy}'. Use one of {SIMPLIFICATION_POLICIES}")
+    return policy
+
+
+def intermediate_simplification(policy):
+    """
+    Return:
+        The policy to apply to intermediate quantities of a derivation under the given policy
+    """
+    return 'none' if policy == 'final' else policy
+
+
+def final_simplification(policy):
+    """
+    Return:
+        The policy to apply to the final result of a derivation under the given policy
+    """
+    return 'full' if policy == 'final' else policy
+
+
+def simplify_expression(expr, policy='full'):
+    """
+    Simplify a scalar expression according to a simplification policy
+
+    Args:
+        expr - sympy expression
+        policy - One of SIMPLIFICATION_POLICIES. 'final' is treated as 'full'
+    Return:
+        The simplified expression
+    """
+    if policy == 'none':
+        return expr
+    elif policy == 'trig':
+        return sp.trigsimp(expr)
+    elif policy == 'cheap':
+        return sp.cancel(sp.expand_trig(expr))
+    elif policy in ('full', 'final'):
+        return sp.simplify(expr)
+    raise ValueError(f"Unknown simplification policy '{policy}'. Use one of {SIMPLIFICATION_POLICIES}")
+
+
+def parallel_executor(workers=None):
+    """
+    Get a context manager providing an executor for independent symbolic operations
+
+    Args:
+        workers - Number of worker processes. If None or 1, everything runs in the calling process.
+    Return:
+        Context manager yielding a ProcessPoolExecutor, or None for serial execution
+    """
+    if workers is None or workers == 1:
+        return contextlib.nullcontext(None)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def map_parallel(func, items, executor=None):
+    """
+    Apply a function to each item, in the executor's worker processes if one is given
+
+    Args:
+        func - Function to apply. Must be picklable (a module-level function or a functools.partial of one)
+        items - List of arguments
+        executor - Executor from parallel_executor(), or None to run serially
+    Return:
+        List of results, in the same order as items
+    """
+    if executor is None:
+        return [func(item) for item in items]
+    return list(executor.map(func, items))
+
+
+def map_expressions(func, expressions, executor=None):
+    """
+    Apply a function to each scalar expression in a list of expressions and matrices
+
+    Matrices are split into their elements, so every element can be processed by a different worker.
+    Atoms (numbers and symbols) are passed through unchanged.
+
+    Args:
+        func - Function taking and returning a scalar expression. Must be picklable
+        expressions - List of scalar expressions and sympy matrices
+        executor - Executor from parallel_executor(), or None to run serially
+    Return:
+        List with the same structure as expressions
+    """
+    # Flatten all expressions into one list of elements
+    elements = []
+    for expr in expressions:
+        elements.extend(expr if isinstance(expr, sp.MatrixBase) else [expr])
+    elements = [sp.sympify(element) for element in elements]
+    indices = [i for i, element in enumerate(elements) if not element.is_Atom]
+    results = map_parallel(func, [elements[i] for i in indices], executor)
+    for i, result in zip(indices, results):
+        elements[i] = result
+
+    # Rebuild the original structure
+    output = []
+    position = 0
+    for expr in expressions:
+        if isinstance(expr, sp.MatrixBase):
+            output.append(sp.Matrix(*expr.shape, elements[position:position + len(expr)]))
+            position += len(expr)
+        else:
+            output.append(elements[position])
+            position += 1
+    return output
+
+
+def simplify_all(expressions, executor=None, policy='full'):
+    """
+    Simplify each of a list of expressions and matrices
+
+    Args:
+        expressions - List of scalar expressions and sympy matrices
+        executor - Executor from parallel_executor(), or None to run serially
+        policy - One of SIMPLIFICATION_POLICIES. 'final' is treated as 'full'
+    Return:
+        List of simplified expressions, with the same structure as expressions
+    """
+    if policy == 'none':
+        return list(expressions)
+    simplified = map_expressions(functools.partial(simplify_expression, policy=policy), expressions, executor)
+
+    # Record expression sizes in the parent process, so it works with any executor
+    report = _settings['report']
+    if report is not None:
+        for before, after in zip(expressions, simplified):
+            report.record(before, after)
+    return simplified
+
+
+def _simplify_entry(equations, policy, workers=None):
+    # Simplify one entry of an equations dict: a single expression or matrix, or a list of them
+    if policy == 'none':
+        return equations
+    with parallel_executor(workers) as executor:
+        if isinstance(equations, list):
+            return simplify_all(equations, executor, policy)
+        return simplify_all([equations], executor, policy)[0]
+
+
+class LazyEquationsDict(MutableMapping):
+    """
+    Equations dict that simplifies each entry the first time it is read
+
+    Behaves like the dicts returned by the dynamics functions, and works with func_equations_dict(),
+    print_equations_dict(), substitute_equations_dict(), flatten_equations_dict() etc. Entries are stored
+    unsimplified, and simplified (and memoised) on first access, so reading only a few entries skips the work of
+    simplifying the rest. Entries can also be deferred entirely, as a function computing the final value.
+
+    Example:
+
+        equations = dynamics_newton_euler(..., lazy=True)
+        print_equations_dict(equations, ['tau'])  # Only the joint forces are simplified
+    """
+
+    def __init__(self, equations=None, simplification=None, workers=None):
+        """
+        Args:
+            equations - Dictionary of unsimplified equations. Each entry can be a single expression or a list of
+                expressions.
+            simplification - Simplification policy applied to each entry on first access, one of
+                SIMPLIFICATION_POLICIES. Defaults to the global policy at construction time.
+            workers - Number of worker processes to simplify the components of an entry in
+        """
+        self.simplification = resolve_simplification(simplification)
+        self.workers = workers
+        # Keys in insertion order, with the entries in one of three states
+        self._keys = dict()
+        self._unsimplified = dict()
+        self._deferred = dict()
+        self._values = dict()
+        for key, value in (equations or dict()).items():
+            self.set_unsimplified(key, value)
+
+    def set_unsimplified(self, key, value):
+        """
+        Add an entry that is simplified on first access
+        """
+        self._discard(key)
+        self._keys[key] = None
+        self._unsimplified[key] = value
+
+    def defer(self, key, func):
+        """
+        Add an entry computed on first access
+
+        Args:
+            key - Name of the entry
+            func - Function of no arguments returning the final value of the entry. It is not simplified further.
+                Use a module-level function or a functools.partial of one to keep the dict picklable.
+        """
+        self._discard(key)
+        self._keys[key] = None
+        self._deferred[key] = func
+
+    def is_evaluated(self, key):
+        """
+        Return:
+            True if the entry has already been computed and simplified
+        """
+        return key in self._values
+
+    def unsimplified(self, key):
+        """
+        Read an entry without simplifying it. Deferred entries are computed (and memoised).
+        """
+        if key in self._unsimplified:
+            return self._unsimplified[key]
+        return self[key]
+
+    def __copy__(self):
+        # New dict sharing the (immutable in practice) entries, but not the bookkeeping
+        equations = LazyEquationsDict(simplification=self.simplification, workers=self.workers)
+        equations._keys = dict(self._keys)
+        equations._unsimplified = dict(self._unsimplified)
+        equations._deferred = dict(self._deferred)
+        equations._values = dict(self._values)
+        return equations
+
+    def copy(self):
+        return self.__copy__()
+
+    def _discard(self, key):
+        # Forget the current value of an entry. Its position in the key order is kept.
+        self._unsimplified.pop(key, None)
+        self._deferred.pop(key, None)
+        self._values.pop(key, None)
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        # Only drop the pending entry once its value is stored, so it survives an error or interrupt while computing
+        if key in self._deferred:
+            value = self._deferred[key]()
+            self._values[key] = value
+            del self._deferred[key]
+        else:
+            value = _simplify_entry(self._unsimplified[key], self.simplification, self.workers)
+            self._values[key] = value
+            del self._unsimplified[key]
+        return value
+
+    def __setitem__(self, key, value):
+        # Values set directly are taken as final
+        self._discard(key)
+        self._keys[key] = None
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        del self._keys[key]
+        self._discard(key)
+
+    def __contains__(self, key):
+        # Don't go through __getitem__, which would evaluate the entry
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        entries = ', '.join(f'{key!r}: {self._values[key]!r}' if key in self._values else f'{key!r}: <lazy>' for key in self._keys)
+        return f'LazyEquationsDict({{{entries}}})'
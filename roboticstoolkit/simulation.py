@@ -0,0 +1,148 @@
+import numpy as np
+
+
+# Butcher tableau of the Dormand-Prince 5(4) method
+_DOPRI_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+_DOPRI_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+_DOPRI_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+_DOPRI_B_LOW = np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])
+
+
+def forward_dynamics_compiled(compiled_matrices):
+    """
+    Build a forward dynamics function from compiled M, C, G matrices
+
+    Args:
+        compiled_matrices - Function compiled with compile_equations_dict() from the output of dynamics_matrix_form(),
+            taking (q, qd) and returning 'M', 'C' and 'G'. Any other parameters must already be substituted.
+    Return:
+        Function forward_dynamics(q, qd, tau) returning the joint accelerations, qdd = M^-1 * (tau - C*qd - G)
+    """
+    def forward_dynamics(q, qd, tau):
+        matrices = compiled_matrices(q, qd)
+        bias = np.einsum('...ij,...j->...i', matrices['C'], qd) + matrices['G'][..., 0]
+        return np.linalg.solve(matrices['M'], (tau - bias)[..., None])[..., 0]
+    return forward_dynamics
+
+
+def _torque_function(torque):
+    # Convert the torque argument of the simulator to a function of (t, q, qd)
+    if torque is None:
+        return lambda t, q, qd: np.zeros_like(qd)
+    if callable(torque):
+        return torque
+    torque = np.asarray(torque, dtype=float)
+    return lambda t, q, qd: torque
+
+
+def simulate_iter(forward_dynamics, q0, qd0, times, torque=None, method='rk4', substeps=1, rtol=1e-6, atol=1e-9, max_steps=100000):
+    """
+    Simulate a manipulator forward in time, yielding the state at each output time
+
+    All initial conditions are integrated together as one batch. The adaptive method picks a single step size
+    for the whole batch, limited by the sample with the largest error.
+
+    Args:
+        forward_dynamics - Function forward_dynamics(q, qd, tau) returning joint accelerations, such as forward_dynamics_numeric()
+            with the manipulator parameters bound, or the output of forward_dynamics_compiled()
+        q0, qd0 - Initial joint positions and velocities, with shape (..., dof)
+        times - Increasing sequence of output times. The first is the time of the initial conditions.
+        torque - Joint forces. Either None for no forces, an array broadcastable to (..., dof), or a function torque(t, q, qd)
+        method - 'rk4' for fixed-step 4th order Runge-Kutta, or 'rk45' for adaptive Dormand-Prince
+        substeps - For 'rk4', the number of steps to take between consecutive output times
+        rtol, atol - For 'rk45', relative and absolute error tolerances
+        max_steps - For 'rk45', the maximum number of attempted steps between consecutive output times
+    Yield:
+        3-tuple (t, q, qd) for each time in times
+    """
+    if method not in ('rk4', 'rk45'):
+        raise ValueError(f"Unknown integration method '{method}'. Use 'rk4' or 'rk45'")
+    torque = _torque_function(torque)
+
+    # Integrate the state y = [q, qd] stacked along the last axis
+    q0 = np.asarray(q0, dtype=float)
+    qd0 = np.asarray(qd0, dtype=float)
+    q0, qd0 = np.broadcast_arrays(q0, qd0)
+    num_joints = q0.shape[-1]
+    y = np.concatenate([q0, qd0], axis=-1)
+
+    def derivative(t, y):
+        q, qd = y[..., :num_joints], y[..., num_joints:]
+        return np.concatenate([qd, forward_dynamics(q, qd, torque(t, q, qd))], axis=-1)
+
+    def rk4_step(t, y, h):
+        k1 = derivative(t, y)
+        k2 = derivative(t + h/2, y + h/2 * k1)
+        k3 = derivative(t + h/2, y + h/2 * k2)
+        k4 = derivative(t + h, y + h * k3)
+        return y + h/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+    def dopri_step(t, y, h):
+        # Return the 5th order solution and the error estimate from the embedded 4th order solution
+        k = []
+        for c, a in zip(_DOPRI_C, _DOPRI_A):
+            y_stage = y + h * sum(a_j * k_j for a_j, k_j in zip(a, k)) if a else y
+            k.append(derivative(t + c*h, y_stage))
+        y_new = y + h * sum(b * k_j for b, k_j in zip(_DOPRI_B, k))
+        error = h * sum((b - b_low) * k_j for b, b_low, k_j in zip(_DOPRI_B, _DOPRI_B_LOW, k))
+        return y_new, error
+
+    times = np.asarray(times, dtype=float)
+    t = times[0]
+    yield t, y[..., :num_joints], y[..., num_joints:]
+
+    step = None
+    for t_next in times[1:]:
+        if method == 'rk4':
+            h = (t_next - t) / substeps
+            for i in range(substeps):
+                y = rk4_step(t + i*h, y, h)
+        else:
+            if step is None:
+                step = t_next - t
+            num_steps = 0
+            while t < t_next:
+                if num_steps == max_steps:
+                    raise RuntimeError(f'Adaptive integration did not reach t={t_next} within {max_steps} steps')
+                num_steps += 1
+                last_step = step >= t_next - t
+                h = t_next - t if last_step else step
+                y_new, error = dopri_step(t, y, h)
+                scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+                error_norm = np.max(np.sqrt(np.mean((error / scale)**2, axis=-1)))
+                if error_norm <= 1:
+                    t = t_next if last_step else t + h
+                    y = y_new
+                # Standard step size controller, with the growth factor bounded
+                factor = 5 if error_norm == 0 else min(5, max(0.2, 0.9 * error_norm**(-1/5)))
+                if not (last_step and error_norm <= 1):
+                    step = h * factor
+        t = t_next
+        yield t, y[..., :num_joints], y[..., num_joints:]
+
+
+def simulate(forward_dynamics, q0, qd0, times, **kwargs):
+    """
+    Simulate a manipulator forward in time. Arguments as in simulate_iter().
+
+    Return:
+        2-tuple (q, qd) of arrays with shape (len(times), ..., dof)
+    """
+    times = np.asarray(times, dtype=float)
+    q_trajectory = None
+    for i, (_, q, qd) in enumerate(simulate_iter(forward_dynamics, q0, qd0, times, **kwargs)):
+        if q_trajectory is None:
+            # Preallocate the whole trajectory once the batch shape is known
+            q_trajectory = np.empty((len(times), *q.shape))
+            qd_trajectory = np.empty((len(times), *qd.shape))
+        q_trajectory[i] = q
+        qd_trajectory[i] = qd
+    return q_trajectory, qd_trajectory
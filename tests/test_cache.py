@@ -0,0 +1,39 @@
+import sympy as sp
+import roboticstoolkit.dynamics
+from roboticstoolkit.cache import DynamicsCache
+from roboticstoolkit.dynamics import dynamics_newton_euler
+from benchmarks.manipulators import rr_manipulator
+
+
+def _arguments():
+    manipulator = rr_manipulator()
+    return (manipulator['transforms'], manipulator['pos_coms'], manipulator['masses'], manipulator['inertias'],
+            manipulator['joint_types'], manipulator['gravity'], sp.zeros(3, 1), sp.zeros(3, 1))
+
+
+def test_cache_round_trip(tmp_path):
+    cache = DynamicsCache(str(tmp_path))
+    equations = cache.dynamics_newton_euler(*_arguments(), simplification='none')
+    loaded = DynamicsCache(str(tmp_path)).dynamics_newton_euler(*_arguments(), simplification='none')
+    assert loaded['tau'] == equations['tau']
+
+
+def test_cache_lazy_equations_are_not_derived_again(tmp_path, monkeypatch):
+    calls = []
+
+    def derive(*args, **kwargs):
+        calls.append(args)
+        return dynamics_newton_euler(*args, **kwargs)
+
+    cache = DynamicsCache(str(tmp_path))
+    equations = cache.cached('newton_euler', derive, *_arguments(), simplification='none', lazy=True)
+    tau = equations['tau']
+
+    # Loading must neither call the derivation nor compute the deferred joint forces
+    def fail(*args, **kwargs):
+        raise AssertionError('Joint forces derived again')
+    monkeypatch.setattr(roboticstoolkit.dynamics, '_joint_forces', fail)
+    loaded = DynamicsCache(str(tmp_path)).cached('newton_euler', derive, *_arguments(), simplification='none', lazy=True)
+    assert len(calls) == 1
+    assert loaded.is_evaluated('tau')
+    assert loaded['tau'] == tau
@@ -0,0 +1,40 @@
+import numpy as np
+import sympy as sp
+from roboticstoolkit.codegen import compile_equations_dict_c
+
+
+x, y = sp.symbols('x y')
+
+
+def test_compile_c_scalar_arguments():
+    compiled = compile_equations_dict_c({'a': x + y, 'b': sp.Matrix([x, x * y])}, [x, y])
+    outputs = compiled(1., 2.)
+    assert outputs['a'].shape == ()
+    assert outputs['a'] == 3.
+    np.testing.assert_allclose(outputs['b'], [[1.], [2.]])
+
+
+def test_compile_c_batched_arguments():
+    compiled = compile_equations_dict_c({'a': x * y}, [[x, y]])
+    np.testing.assert_allclose(compiled(np.array([[1., 2.], [3., 4.]]))['a'], [2., 12.])
+
+
+def test_compile_c_same_directory(tmp_path):
+    add = compile_equations_dict_c(x + y, [x, y], directory=str(tmp_path))
+    multiply = compile_equations_dict_c(x * y, [x, y], directory=str(tmp_path))
+    assert add(3., 2.)['out'] == 5.
+    assert multiply(3., 2.)['out'] == 6.
+    # Compiling the same equations again reuses the library
+    again = compile_equations_dict_c(x * y, [x, y], directory=str(tmp_path))
+    assert again(3., 2.)['out'] == 6.
+    assert len(list(tmp_path.glob('*.so'))) == 2
+
+
+def test_compile_c_symbol_names():
+    # Symbol names that match C keywords or names used in the generated code
+    n, i, out, cse0, keyword = sp.symbols('n i out cse0 int')
+    compiled = compile_equations_dict_c({'a': n * i + out - cse0 * keyword, 'b': sp.sin(n) * sp.sin(n) + i},
+                                        [n, [i, out], cse0, keyword])
+    outputs = compiled(2., np.array([[3., 4.], [5., 6.]]), 1., 0.5)
+    np.testing.assert_allclose(outputs['a'], [9.5, 15.5])
+    np.testing.assert_allclose(outputs['b'], np.sin(2.)**2 + np.array([3., 5.]))
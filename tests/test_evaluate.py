@@ -0,0 +1,36 @@
+import numpy as np
+import sympy as sp
+from roboticstoolkit.evaluate import compile_equations_dict, evaluate_equations_dict
+
+
+x, y = sp.symbols('x y')
+
+
+def test_compile_scalar_arguments():
+    compiled = compile_equations_dict({'a': x + y, 'b': sp.Matrix([x, x * y])}, [x, y])
+    outputs = compiled(1., 2.)
+    assert outputs['a'].shape == ()
+    assert outputs['a'] == 3.
+    assert outputs['b'].shape == (2, 1)
+    np.testing.assert_allclose(outputs['b'], [[1.], [2.]])
+
+
+def test_compile_batched_arguments():
+    compiled = compile_equations_dict({'a': x + y, 'b': [sp.Matrix([x, y]), sp.Matrix([y, x])]}, [[x, y]])
+    outputs = compiled(np.array([[1., 2.], [3., 4.], [5., 6.]]))
+    np.testing.assert_allclose(outputs['a'], [3., 7., 11.])
+    assert outputs['b'].shape == (3, 2, 2, 1)
+    np.testing.assert_allclose(outputs['b'][1, 1, :, 0], [4., 3.])
+
+
+def test_evaluate_scalar_parameters():
+    values = evaluate_equations_dict({'a': x * y, 'b': sp.Matrix([x + y])}, {x: 3., 'y': 2.})
+    assert values['a'].shape == ()
+    assert values['a'] == 6.
+    assert values['b'].shape == (1, 1)
+    assert values['b'][0, 0] == 5.
+
+
+def test_evaluate_parameter_variants():
+    values = evaluate_equations_dict({'a': x * y}, {x: [1., 2., 3.], y: 2.})
+    np.testing.assert_allclose(values['a'], [2., 4., 6.])
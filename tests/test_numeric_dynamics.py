@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+import sympy as sp
+from roboticstoolkit.numeric_dynamics import dynamics_newton_euler_numeric
+from roboticstoolkit.numeric_propagations import stack_vectors
+
+
+def test_stack_vectors_scalar_zero():
+    stacked = stack_vectors([0, sp.S(0), sp.Matrix([1, 2, 3]), np.ones((3, 1))], 3)
+    np.testing.assert_array_equal(stacked, [[0, 0, 0], [0, 0, 0], [1, 2, 3], [1, 1, 1]])
+    assert stack_vectors([0, np.eye(3)], (3, 3)).shape == (2, 3, 3)
+    with pytest.raises(ValueError):
+        stack_vectors([1], 3)
+
+
+def test_newton_euler_numeric_ground_frame_zeros():
+    # Single revolute link of length 1 with its centre of mass at the tip, held horizontal against gravity
+    dh_table = [[0, 0, 0, 0], [1, 0, 0, 0]]
+    pos_coms = [0, [1, 0, 0]]
+    inertias = [0, np.zeros((3, 3))]
+    equations = dynamics_newton_euler_numeric(dh_table, pos_coms, [0, 2.], inertias, [0, 'R'], [0, -9.81, 0],
+                                              np.zeros(1), np.zeros(1), np.zeros(1))
+    np.testing.assert_allclose(equations['tau'][..., 1], 2. * 9.81)
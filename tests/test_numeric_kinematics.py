@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+import sympy as sp
+from roboticstoolkit.numeric_kinematics import link_transforms_numeric
+
+
+theta1, L1 = sp.symbols('theta1 L1')
+
+
+def test_joint_offset():
+    transforms = link_transforms_numeric([[0, 0, 0, theta1 + sp.pi / 2]], ['R'], np.array([0.25]))
+    expected = link_transforms_numeric([[0, 0, 0, 0]], ['R'], np.array([0.25 + np.pi / 2]))
+    np.testing.assert_allclose(transforms, expected)
+
+
+@pytest.mark.parametrize('entry', [2 * theta1, theta1 + L1, theta1 * L1])
+def test_joint_offset_rejects_other_expressions(entry):
+    with pytest.raises(ValueError, match='joint symbol plus a numeric constant'):
+        link_transforms_numeric([[0, 0, 0, entry]], ['R'], np.array([0.25]))
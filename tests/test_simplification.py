@@ -0,0 +1,37 @@
+import pytest
+import sympy as sp
+import roboticstoolkit.simplification
+from roboticstoolkit.simplification import LazyEquationsDict
+
+
+x = sp.Symbol('x')
+
+
+def test_lazy_entry_survives_failed_simplification(monkeypatch):
+    equations = LazyEquationsDict({'a': sp.sin(x)**2 + sp.cos(x)**2}, simplification='full')
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(roboticstoolkit.simplification, '_simplify_entry', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            equations['a']
+    assert not equations.is_evaluated('a')
+    assert equations['a'] == 1
+
+
+def test_lazy_deferred_entry_survives_error():
+    attempts = []
+
+    def compute():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise RuntimeError('worker failed')
+        return x
+    equations = LazyEquationsDict()
+    equations.defer('a', compute)
+    with pytest.raises(RuntimeError):
+        equations['a']
+    assert equations['a'] == x
+    assert equations['a'] == x
+    assert len(attempts) == 2